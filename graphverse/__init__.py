@@ -1,3 +1,4 @@
 from . import graph
 from . import data
-from . import llm
\ No newline at end of file
+from . import llm
+from . import pipeline
\ No newline at end of file
@@ -0,0 +1,302 @@
+"""
+Benchmarks for the graph, walk, rule, training and decoding hot paths.
+
+Run ``python -m graphverse.benchmark --output results.json`` to time the
+fixed case matrix, and add ``--baseline baseline.json`` to fail (exit code
+1) when any case is slower than the baseline by more than its threshold.
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import sys
+import time
+import numpy as np
+import torch
+
+from .graph.graph_generation import generate_random_graph, generate_random_csr_graph
+from .graph.batch_walk import generate_walk_batch
+from .graph.reachability import generate_planned_walks
+from .graph.rules import AscenderRule, DescenderRule, EvenRule, OddRule, RepeaterRule, EdgeExistenceRule
+from .graph.walk import generate_multiple_walks
+from .data.preparation import encode_walk_batch
+from .data.vocabulary import WalkVocabulary
+from .llm.evaluation import evaluate_model, evaluate_model_batched
+from .llm.model import WalkTransformer
+from .llm.training import train_model
+
+DEFAULT_THRESHOLD = 0.2
+
+
+class BenchmarkCase:
+    """
+    A named piece of work. ``setup(scale)`` prepares the inputs once and
+    ``run(inputs)`` does the timed work, returning how many units (walks,
+    tokens, ...) it processed.
+    """
+    def __init__(self, name, unit, setup, run, params=None):
+        self.name = name
+        self.unit = unit
+        self.setup = setup
+        self.run = run
+        self.params = params or {}
+
+
+def _rules_for(n, seed=0):
+    rng = random.Random(seed)
+    vertices = rng.sample(range(n), n // 5)
+    quarter = len(vertices) // 4
+    mid = n // 2
+    return (AscenderRule({v for v in vertices[:quarter] if v >= mid}),
+            DescenderRule({v for v in vertices[:quarter] if v < mid}),
+            EvenRule({v for v in vertices[quarter:2 * quarter] if v % 2 == 0}),
+            OddRule({v for v in vertices[2 * quarter:3 * quarter] if v % 2 == 1}),
+            RepeaterRule({v: rng.randint(3, 8) for v in vertices[3 * quarter:3 * quarter + 3]}))
+
+
+def _graph_case(n, degree):
+    return BenchmarkCase(
+        f'graph_csr_n{n}_d{degree}', 'edges',
+        lambda scale: max(int(n * scale), 100),
+        lambda size: generate_random_csr_graph(size, degree, degree, seed=0).number_of_edges(),
+        {'n': n, 'degree': degree})
+
+
+def _legacy_graph_case(n, degree):
+    def run(size):
+        random.seed(0)
+        return generate_random_graph(size, degree, degree).number_of_edges()
+    return BenchmarkCase(f'graph_networkx_n{n}_d{degree}', 'edges',
+                         lambda scale: max(int(n * scale), 50), run, {'n': n, 'degree': degree})
+
+
+def _walk_setup(n, num_walks, degree=5):
+    def setup(scale):
+        graph = generate_random_csr_graph(n, degree, degree, seed=0)
+        return graph, _rules_for(n), max(int(num_walks * scale), 10)
+    return setup
+
+
+def _batch_walk_run(inputs):
+    graph, rules, num_walks = inputs
+    walks, lengths = generate_walk_batch(graph, num_walks, 10, 50, rules, seed=0)
+    return len(walks)
+
+
+def _planned_walk_run(inputs):
+    graph, rules, num_walks = inputs
+    return len(generate_planned_walks(graph, num_walks, 10, 50, rules, rng=random.Random(0)))
+
+
+def _legacy_walk_run(inputs):
+    graph, rules, num_walks = inputs
+    return len(generate_multiple_walks(graph, num_walks, 10, 50, rules, rng=random.Random(0)))
+
+
+def _rule_setup(num_walks):
+    def setup(scale):
+        n = 1000
+        rng = np.random.default_rng(0)
+        rows = max(int(num_walks * scale), 100)
+        walks = rng.integers(0, n, size=(rows, 50))
+        lengths = rng.integers(10, 51, size=rows)
+        return _rules_for(n), walks, lengths
+    return setup
+
+
+def _rule_batch_run(inputs):
+    rules, walks, lengths = inputs
+    for rule in rules:
+        rule.check_batch(None, walks, lengths)
+    return len(walks)
+
+
+def _rule_apply_run(inputs):
+    rules, walks, lengths = inputs
+    walks = walks[:max(len(walks) // 100, 10)]
+    for walk, length in zip(walks, lengths):
+        walk = walk[:length].tolist()
+        for rule in rules:
+            rule.apply(None, walk)
+    return len(walks)
+
+
+def _training_setup(scale):
+    graph = generate_random_csr_graph(200, 5, 5, seed=0)
+    walks, lengths = generate_walk_batch(graph, max(int(128 * scale), 32), 10, 50, (), seed=0)
+    vocab = WalkVocabulary.from_vertices(range(200))
+    return encode_walk_batch(walks, lengths, vocab), vocab
+
+
+def _training_run(inputs):
+    data, vocab = inputs
+    torch.manual_seed(0)
+    # train_model prints the loss of every epoch
+    with contextlib.redirect_stdout(io.StringIO()):
+        train_model(data, vocab, epochs=1, batch_size=32, learning_rate=0.001, device='cpu')
+    return int((data != vocab.pad_idx).sum())
+
+
+def _decoding_setup(scale):
+    torch.manual_seed(0)
+    model = WalkTransformer(203, d_model=128, nhead=4, num_layers=2, dim_feedforward=256, causal=True).eval()
+    prompts = torch.randint(3, 203, (max(int(64 * scale), 4), 8))
+    return model, prompts, 32
+
+
+def _decoding_run(inputs):
+    model, prompts, steps = inputs
+    with torch.no_grad():
+        logits, cache = model.forward_incremental(prompts)
+        for _ in range(steps):
+            logits, cache = model.forward_incremental(logits[:, -1:].argmax(dim=-1), cache)
+    return len(prompts) * steps
+
+
+def _evaluation_setup(scale):
+    """
+    A small model trained briefly on walks of a fixed graph, so greedy
+    decoding mostly follows edges instead of stopping at once. Only edges
+    are checked, since prompts for other rules can take unbounded retries.
+    """
+    graph = generate_random_csr_graph(200, 5, 5, seed=0)
+    rules = (EdgeExistenceRule(),)
+    vocab = WalkVocabulary.from_vertices(range(200))
+    walks, lengths = generate_walk_batch(graph, 512, 10, 50, rules, seed=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = train_model(encode_walk_batch(walks, lengths, vocab), vocab, epochs=3, batch_size=32,
+                            learning_rate=0.003, device='cpu', d_model=64, nhead=4, num_layers=2,
+                            dim_feedforward=128, seed=0)
+    return model, graph, vocab, rules, max(int(64 * scale), 4)
+
+
+def _evaluation_run(inputs):
+    model, graph, vocab, rules, num_samples = inputs
+    random.seed(0)
+    return len(evaluate_model(model, graph, vocab, num_samples, 5, 10, rules, max_new_tokens=32))
+
+
+def _batched_evaluation_run(inputs):
+    model, graph, vocab, rules, num_samples = inputs
+    return len(evaluate_model_batched(model, graph, vocab, num_samples, 5, 10, rules, batch_size=16,
+                                      max_new_tokens=32, seed=0))
+
+
+def default_cases():
+    """
+    The fixed benchmark matrix.
+    """
+    cases = [_graph_case(n, degree) for n, degree in ((1_000, 5), (10_000, 5), (100_000, 5), (10_000, 20))]
+    cases.append(_legacy_graph_case(200, 10))
+    cases += [
+        BenchmarkCase('walks_batch', 'walks', _walk_setup(1000, 2000), _batch_walk_run),
+        BenchmarkCase('walks_planned', 'walks', _walk_setup(1000, 500), _planned_walk_run),
+        BenchmarkCase('walks_sequential', 'walks', _walk_setup(1000, 200, degree=20), _legacy_walk_run),
+        BenchmarkCase('rules_check_batch', 'walks', _rule_setup(100_000), _rule_batch_run),
+        BenchmarkCase('rules_apply', 'walks', _rule_setup(100_000), _rule_apply_run),
+        BenchmarkCase('training', 'tokens', _training_setup, _training_run),
+        BenchmarkCase('decoding_kv_cache', 'tokens', _decoding_setup, _decoding_run),
+        BenchmarkCase('evaluation', 'samples', _evaluation_setup, _evaluation_run),
+        BenchmarkCase('evaluation_batched', 'samples', _evaluation_setup, _batched_evaluation_run),
+    ]
+    return cases
+
+
+def run_benchmarks(cases=None, repeat=3, scale=1.0, pattern=None):
+    """
+    Time every case ``repeat`` times after setup and keep the fastest run.
+
+    :param pattern: only run cases whose name contains this substring
+    :return: dict of case name -> {seconds, units, unit, rate, params}
+    """
+    results = {}
+    for case in cases if cases is not None else default_cases():
+        if pattern and pattern not in case.name:
+            continue
+        inputs = case.setup(scale)
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            units = case.run(inputs)
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best[0]:
+                best = (elapsed, units)
+        seconds, units = best
+        results[case.name] = {
+            'seconds': seconds,
+            'units': units,
+            'unit': case.unit,
+            'rate': units / seconds if seconds > 0 else float('inf'),
+            'params': case.params,
+        }
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD, thresholds=None):
+    """
+    Cases whose rate dropped below ``baseline_rate * (1 - threshold)``.
+
+    :param thresholds: optional per-case overrides of threshold
+    :return: list of (name, rate, baseline_rate, allowed_drop)
+    """
+    thresholds = thresholds or {}
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        allowed = thresholds.get(name, threshold)
+        baseline_rate = baseline[name]['rate']
+        if result['rate'] < baseline_rate * (1 - allowed):
+            regressions.append((name, result['rate'], baseline_rate, allowed))
+    return regressions
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'torch': torch.__version__,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed relative slowdown before a case counts as a regression')
+    parser.add_argument('--case-threshold', action='append', default=[], metavar='NAME=FRACTION',
+                        help='threshold for a single case (repeatable)')
+    parser.add_argument('--filter', help='only run cases whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply every case size by this factor')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(repeat=args.repeat, scale=args.scale, pattern=args.filter)
+    for name, result in results.items():
+        print(f"{name:32s} {result['rate']:14.1f} {result['unit']}/s  ({result['seconds']:.3f}s)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'scale': args.scale, 'results': results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        thresholds = {}
+        for item in args.case_threshold:
+            name, value = item.split('=', 1)
+            thresholds[name] = float(value)
+        regressions = compare(results, baseline, args.threshold, thresholds)
+        for name, rate, baseline_rate, allowed in regressions:
+            print(f"REGRESSION {name}: {rate:.1f} vs baseline {baseline_rate:.1f} "
+                  f"(allowed drop {allowed:.0%})")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1 +1,5 @@
-from .preparation import WalkVocabulary, prepare_training_data
\ No newline at end of file
+from .vocabulary import WalkVocabulary
+from .preparation import prepare_training_data, encode_walk_batch
+from .corpus import CorpusWriter, WalkCorpus, WalkCollator
+from .batching import LengthBucketSampler, ShardedBatchSampler, PackedWalkCollator, packed_attention_mask, walk_lengths
+from .streaming import WalkStream
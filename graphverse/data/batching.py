@@ -0,0 +1,154 @@
+import numpy as np
+import torch
+from torch.utils.data import Sampler
+
+
+def walk_lengths(dataset, pad_idx):
+    """
+    Number of non-padding tokens of every walk in a padded token tensor,
+    TensorDataset, WalkCorpus or other dataset of token tensors.
+    """
+    if hasattr(dataset, 'lengths'):
+        return np.asarray(dataset.lengths)
+    if isinstance(dataset, torch.utils.data.TensorDataset):
+        dataset = dataset.tensors[0]
+    if isinstance(dataset, torch.Tensor):
+        return (dataset != pad_idx).sum(dim=1).numpy()
+    return np.array([len(_strip_padding(dataset[i], pad_idx)) for i in range(len(dataset))])
+
+
+class LengthBucketSampler(Sampler):
+    """
+    Batch sampler that groups walks of similar length.
+
+    Indices are shuffled, cut into buckets of ``bucket_size`` walks, sorted by
+    length inside each bucket and split into batches; the batch order is then
+    shuffled again. Each batch therefore only needs padding up to its own
+    longest walk while the data order stays random across buckets.
+    """
+    def __init__(self, lengths, batch_size, bucket_size=None, shuffle=True, drop_last=False, seed=None):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.bucket_size = bucket_size or batch_size * 100
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def batches(self):
+        rng = np.random.default_rng(None if self.seed is None else (self.seed, self.epoch))
+        order = rng.permutation(len(self.lengths)) if self.shuffle else np.arange(len(self.lengths))
+
+        batches = []
+        for start in range(0, len(order), self.bucket_size):
+            bucket = order[start:start + self.bucket_size]
+            bucket = bucket[np.argsort(self.lengths[bucket], kind='stable')]
+            for i in range(0, len(bucket), self.batch_size):
+                batch = bucket[i:i + self.batch_size]
+                if len(batch) == self.batch_size or not self.drop_last:
+                    batches.append(batch.tolist())
+
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        return batches
+
+    def __iter__(self):
+        batches = self.batches()
+        self.epoch += 1
+        return iter(batches)
+
+    def __len__(self):
+        total = len(self.lengths)
+        sizes = [min(self.bucket_size, total - start) for start in range(0, total, self.bucket_size)]
+        if self.drop_last:
+            return sum(size // self.batch_size for size in sizes)
+        return sum(-(-size // self.batch_size) for size in sizes)
+
+
+class ShardedBatchSampler(Sampler):
+    """
+    Split every batch of a batch sampler between ``world_size`` ranks.
+
+    All ranks must iterate identically seeded copies of the wrapped sampler,
+    so they agree on the global batches; each rank then keeps its own
+    contiguous slice of every batch. Slices may be empty when a batch has
+    fewer items than there are ranks.
+    """
+    def __init__(self, batch_sampler, rank, world_size):
+        self.batch_sampler = batch_sampler
+        self.rank = rank
+        self.world_size = world_size
+
+    def set_epoch(self, epoch):
+        if hasattr(self.batch_sampler, 'set_epoch'):
+            self.batch_sampler.set_epoch(epoch)
+
+    def __iter__(self):
+        for batch in self.batch_sampler:
+            yield np.array_split(np.asarray(batch), self.world_size)[self.rank].tolist()
+
+    def __len__(self):
+        return len(self.batch_sampler)
+
+
+class PackedWalkCollator:
+    """
+    Collate walks into packed rows of at most ``pack_length`` tokens.
+
+    Walks are placed first-fit by decreasing length. Alongside the tokens it
+    returns per-token segment ids (-1 for padding) and positions that restart
+    at every walk, from which packed_attention_mask builds the block mask
+    that keeps walks from attending to each other.
+    """
+    def __init__(self, pad_idx, pack_length):
+        self.pad_idx = pad_idx
+        self.pack_length = pack_length
+
+    def __call__(self, items):
+        if not items:
+            empty = torch.zeros((0, 0), dtype=torch.long)
+            return empty, empty, empty
+        items = [_strip_padding(item, self.pad_idx) for item in items]
+        rows = []
+        used = []
+        for item in sorted(items, key=len, reverse=True):
+            for i, size in enumerate(used):
+                if size + len(item) <= self.pack_length:
+                    rows[i].append(item)
+                    used[i] += len(item)
+                    break
+            else:
+                rows.append([item])
+                used.append(len(item))
+
+        width = max(used)
+        tokens = torch.full((len(rows), width), self.pad_idx, dtype=torch.long)
+        segments = torch.full((len(rows), width), -1, dtype=torch.long)
+        positions = torch.zeros((len(rows), width), dtype=torch.long)
+        for r, row in enumerate(rows):
+            offset = 0
+            for s, item in enumerate(row):
+                tokens[r, offset:offset + len(item)] = item
+                segments[r, offset:offset + len(item)] = s
+                positions[r, offset:offset + len(item)] = torch.arange(len(item))
+                offset += len(item)
+        return tokens, segments, positions
+
+
+def packed_attention_mask(segments):
+    """
+    Boolean (batch, seq, seq) mask that is True where attention is blocked:
+    between different walks of a packed row. Padding only attends to padding.
+    """
+    return segments.unsqueeze(2) != segments.unsqueeze(1)
+
+
+def _strip_padding(item, pad_idx):
+    if isinstance(item, (tuple, list)):
+        item = item[0]
+    used = (item != pad_idx).nonzero()
+    keep = int(used.max()) + 1 if len(used) else 0
+    return item[:keep].long()
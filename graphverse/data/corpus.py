@@ -0,0 +1,179 @@
+import json
+import os
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+from .vocabulary import WalkVocabulary
+
+TOKENS_FILE = 'tokens.bin'
+OFFSETS_FILE = 'offsets.bin'
+META_FILE = 'meta.json'
+FORMAT_VERSION = 2
+# Version 1 stored the vocabulary as a string-keyed token -> index mapping
+READABLE_VERSIONS = (1, 2)
+
+
+class CorpusWriter:
+    """
+    Append-only writer for an on-disk walk corpus.
+
+    A corpus is a directory holding a flat int32 array of token ids for all
+    walks (each encoded as <START> ... <END>), an int64 array with the start
+    offset of every walk plus a final end offset, and a JSON metadata file
+    with the counts and the vocabulary. Walks are buffered and appended to
+    disk every ``chunk_tokens`` tokens. The metadata file is only written by
+    a successful ``close``, so WalkCorpus refuses a corpus whose writer was
+    interrupted.
+    """
+    def __init__(self, path, vocab, chunk_tokens=1 << 20):
+        os.makedirs(path, exist_ok=True)
+        # Drop the metadata of a corpus being overwritten until this one is complete
+        if os.path.exists(os.path.join(path, META_FILE)):
+            os.remove(os.path.join(path, META_FILE))
+        self.path = path
+        self.vocab = vocab
+        self.chunk_tokens = chunk_tokens
+        self.num_walks = 0
+        self.num_tokens = 0
+        self.max_length = 0
+        self._pending = []
+        self._pending_tokens = 0
+        self._tokens = open(os.path.join(path, TOKENS_FILE), 'wb')
+        self._offsets = open(os.path.join(path, OFFSETS_FILE), 'wb')
+        self._offsets.write(np.zeros(1, dtype=np.int64).tobytes())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def add(self, walk):
+        """
+        Encode and append a single walk of vertices.
+        """
+        self.add_walks([walk])
+
+    def add_walks(self, walks):
+        """
+        Encode and append a batch of walks with one vocabulary lookup.
+        """
+        if not len(walks):
+            return
+        lengths = np.array([len(walk) for walk in walks], dtype=np.int64) + 2
+        ends = np.cumsum(lengths)
+        starts = ends - lengths
+        tokens = np.empty(int(ends[-1]), dtype=np.int32)
+        inner = np.ones(len(tokens), dtype=bool)
+        inner[starts] = inner[ends - 1] = False
+        tokens[starts] = self.vocab.start_idx
+        tokens[ends - 1] = self.vocab.end_idx
+        tokens[inner] = self.vocab.encode(np.concatenate([np.asarray(walk, dtype=np.int64) for walk in walks]))
+        self._pending.append((tokens, lengths))
+        self._pending_tokens += len(tokens)
+        if self._pending_tokens >= self.chunk_tokens:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        lengths = np.concatenate([chunk_lengths for _, chunk_lengths in self._pending])
+        self._tokens.write(np.concatenate([tokens for tokens, _ in self._pending]).tobytes())
+        self._offsets.write((self.num_tokens + np.cumsum(lengths)).tobytes())
+        self.num_walks += len(lengths)
+        self.num_tokens += int(lengths.sum())
+        self.max_length = max(self.max_length, int(lengths.max()))
+        self._pending = []
+        self._pending_tokens = 0
+
+    def abort(self):
+        """
+        Close the data files without writing the metadata, leaving an
+        incomplete corpus that WalkCorpus does not open.
+        """
+        self._pending = []
+        self._pending_tokens = 0
+        self._tokens.close()
+        self._offsets.close()
+
+    def close(self):
+        if self._tokens.closed:
+            return
+        self.flush()
+        self._tokens.close()
+        self._offsets.close()
+        meta = {
+            'format_version': FORMAT_VERSION,
+            'num_walks': self.num_walks,
+            'num_tokens': self.num_tokens,
+            'max_length': self.max_length,
+            'vocab': self.vocab.to_dict(),
+        }
+        with open(os.path.join(self.path, META_FILE), 'w') as f:
+            json.dump(meta, f)
+
+
+class WalkCorpus(Dataset):
+    """
+    Memory-mapped view of a corpus written by CorpusWriter.
+
+    Items are int32 token tensors that share memory with the mapped file,
+    so indexing a walk copies nothing.
+    """
+    def __init__(self, path):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        if meta['format_version'] not in READABLE_VERSIONS:
+            raise ValueError(f"Unsupported corpus format version {meta['format_version']}")
+
+        self.path = path
+        self.max_length = meta['max_length']
+        self.vocab = WalkVocabulary.from_dict(meta['vocab'])
+        self.offsets = np.fromfile(os.path.join(path, OFFSETS_FILE), dtype=np.int64)
+        if meta['num_tokens']:
+            # Copy-on-write mapping: slices are writable views, so torch can
+            # wrap them without copying and nothing is ever written back.
+            self.tokens = np.memmap(os.path.join(path, TOKENS_FILE), dtype=np.int32, mode='c',
+                                    shape=(meta['num_tokens'],))
+        else:
+            self.tokens = np.zeros(0, dtype=np.int32)
+
+    def __getstate__(self):
+        # Worker processes reopen the mapping instead of receiving a copy
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        return torch.from_numpy(self.tokens[self.offsets[idx]:self.offsets[idx + 1]])
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+
+class WalkCollator:
+    """
+    Collate token tensors (or TensorDataset rows) into a right-padded int64
+    batch that is only as wide as its longest walk. Returns a 1-tuple so
+    batches look like those of a TensorDataset.
+    """
+    def __init__(self, pad_idx):
+        self.pad_idx = pad_idx
+
+    def __call__(self, items):
+        if not items:
+            return (torch.zeros((0, 0), dtype=torch.long),)
+        items = [item[0] if isinstance(item, (tuple, list)) else item for item in items]
+        batch = torch.nn.utils.rnn.pad_sequence(items, batch_first=True, padding_value=self.pad_idx)
+        # Rows cut from a pre-padded tensor still carry the corpus-wide padding
+        used = (batch != self.pad_idx).any(dim=0).nonzero()
+        width = int(used.max()) + 1 if len(used) else 0
+        return (batch[:, :width].long(),)
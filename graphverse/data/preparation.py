@@ -1,51 +1,116 @@
+import logging
+import numpy as np
 import torch
-from ..graph.walk import generate_multiple_walks
-from ..graph.walk import generate_valid_walk
+from ..graph.walk import generate_multiple_walks, iter_multiple_walk_chunks
+from ..graph.walk import generate_per_node_walks, iter_per_node_walk_chunks
+from ..graph.parallel import spawn_seeds
+from ..graph.batch_walk import generate_walk_batch
+from .vocabulary import WalkVocabulary
+from .corpus import CorpusWriter, WalkCorpus
+from ..metrics import timed
 
-class WalkVocabulary:
-    """
-    Vocabulary for walks.
-    """
-    def __init__(self, walks):
-        self.token2idx = {'<PAD>': 0, '<START>': 1, '<END>': 2}
-        self.idx2token = {0: '<PAD>', 1: '<START>', 2: '<END>'}
-        self.build_vocab(walks)
-
-    def build_vocab(self, walks):
-        for walk in walks:
-            for token in walk:
-                if str(token) not in self.token2idx:
-                    idx = len(self.token2idx)
-                    self.token2idx[str(token)] = idx
-                    self.idx2token[idx] = str(token)
-
-    def __len__(self):
-        return len(self.token2idx)
-
-def prepare_training_data(graph, num_samples, min_length, max_length, rules):
+logger = logging.getLogger(__name__)
+
+def prepare_training_data(graph, num_samples, min_length, max_length, rules, batched=False, seed=None, workers=None,
+                          corpus_path=None, metrics=None):
     """
     Prepare training data for the model.
+
+    With ``batched=True`` the walks are produced by the vectorized
+    ``generate_walk_batch`` generator (reproducible for a given ``seed``)
+    instead of one at a time. Otherwise ``workers`` spreads both walk passes
+    over a process pool; the corpus then depends only on ``seed``.
+
+    With ``corpus_path`` the walks are streamed to an on-disk corpus as they
+    are generated and a memory-mapped WalkCorpus is returned in place of the
+    padded tensor.
+
+    ``metrics`` (a WalkMetrics) collects walk counters and the time spent in
+    each stage ('per_node_walks', 'walks', 'encode').
     """
-    print(f"Generating a walk starting from each node in the graph...")
-    per_node_walks = []
-    for node in graph.nodes:
-        print(f"Generating a walk starting from node {node}")
-        valid_walk = generate_valid_walk(graph, node, min_length, max_length, rules)
-        if valid_walk:
-            per_node_walks.append(valid_walk)
-        print()  # Print a new line after each iteration
-    
+    if corpus_path is not None:
+        return _write_training_corpus(graph, num_samples, min_length, max_length, rules, corpus_path,
+                                      seed, 1 if workers is None else workers, metrics)
+    if batched:
+        return _prepare_batched_training_data(graph, num_samples, min_length, max_length, rules, seed, metrics)
+
+    per_node_seed, walks_seed = spawn_seeds(seed, 2) if workers is not None else (None, None)
+
+    logger.info("Generating a walk starting from each node in the graph...")
+    with timed(metrics, 'per_node_walks'):
+        per_node_walks = generate_per_node_walks(graph, min_length, max_length, rules,
+                                                 workers=workers, seed=per_node_seed, metrics=metrics)
+
     # Generate walks
-    walks = generate_multiple_walks(graph, num_samples, min_length, max_length, rules)
+    logger.info("Generating %d walks...", num_samples)
+    with timed(metrics, 'walks'):
+        walks = generate_multiple_walks(graph, num_samples, min_length, max_length, rules,
+                                        workers=workers, seed=walks_seed, metrics=metrics)
 
     walks = walks + per_node_walks
 
-    # Create vocabulary
-    vocab = WalkVocabulary(walks)
-    
-    tensor_data = []
-    for walk in walks:
-        tensor_walk = [vocab.token2idx['<START>']] + [vocab.token2idx[str(node)] for node in walk] + [vocab.token2idx['<END>']]
-        tensor_data.append(torch.tensor(tensor_walk))
-    
-    return torch.nn.utils.rnn.pad_sequence(tensor_data, batch_first=True, padding_value=vocab.token2idx['<PAD>']), vocab
\ No newline at end of file
+    with timed(metrics, 'encode'):
+        vocab = WalkVocabulary.from_vertices(graph.nodes)
+        lengths = np.array([len(walk) for walk in walks], dtype=np.int64)
+        padded = np.full((len(walks), int(lengths.max()) if len(walks) else 0), -1, dtype=np.int64)
+        padded[np.arange(padded.shape[1]) < lengths[:, None]] = np.concatenate(walks) if walks else []
+        return encode_walk_batch(padded, lengths, vocab), vocab
+
+
+def _write_training_corpus(graph, num_samples, min_length, max_length, rules, corpus_path, seed, workers, metrics):
+    per_node_seed, walks_seed = spawn_seeds(seed, 2)
+    vocab = WalkVocabulary.from_vertices(graph.nodes)
+
+    with CorpusWriter(corpus_path, vocab) as writer:
+        stages = (
+            ('walks', iter_multiple_walk_chunks(graph, num_samples, min_length, max_length, rules, workers,
+                                                walks_seed)),
+            ('per_node_walks', iter_per_node_walk_chunks(graph, min_length, max_length, rules, workers,
+                                                         per_node_seed)),
+        )
+        for stage, chunks in stages:
+            with timed(metrics, stage):
+                for chunk in chunks:
+                    if metrics is not None:
+                        metrics.record_walks(chunk)
+                    writer.add_walks(chunk)
+
+    return WalkCorpus(corpus_path), vocab
+
+
+def _prepare_batched_training_data(graph, num_samples, min_length, max_length, rules, seed, metrics):
+    rng = np.random.default_rng(seed)
+    with timed(metrics, 'walks'):
+        walks, lengths = generate_walk_batch(graph, num_samples, min_length, max_length, rules, seed=rng)
+    with timed(metrics, 'per_node_walks'):
+        per_node_walks, per_node_lengths = generate_walk_batch(
+            graph, None, min_length, max_length, rules, seed=rng, start_vertices=list(graph.nodes))
+
+    walks = np.concatenate([walks, per_node_walks])
+    lengths = np.concatenate([lengths, per_node_lengths])
+    if metrics is not None:
+        metrics.count('walks', len(lengths))
+        metrics.walk_lengths.update(lengths.tolist())
+
+    with timed(metrics, 'encode'):
+        vocab = WalkVocabulary.from_vertices(graph.nodes)
+        return encode_walk_batch(walks, lengths, vocab), vocab
+
+
+def encode_walk_batch(walks, lengths, vocab):
+    """
+    Encode a padded (num_walks, max_length) vertex array, as returned by
+    ``generate_walk_batch``, into the same <START> ... <END> padded token
+    tensor that ``prepare_training_data`` produces.
+    """
+    walks = np.asarray(walks, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    num_walks = len(walks)
+    longest = int(lengths.max()) if num_walks else 0
+
+    valid = np.arange(longest) < lengths[:, None]
+    tokens = np.full((num_walks, longest + 2), vocab.pad_idx, dtype=np.int64)
+    tokens[:, 0] = vocab.start_idx
+    tokens[:, 1:longest + 1][valid] = vocab.encode(walks[:, :longest][valid])
+    tokens[np.arange(num_walks), lengths + 1] = vocab.end_idx
+    return torch.from_numpy(tokens)
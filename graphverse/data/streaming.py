@@ -0,0 +1,176 @@
+import collections
+import multiprocessing
+import queue
+import random
+import numpy as np
+import torch
+from torch.utils.data import IterableDataset
+from ..graph.csr import as_csr
+from ..graph.walk import generate_multiple_walks, WALK_CHUNK_SIZE
+from ..graph.batch_walk import generate_walk_batch
+from ..graph.parallel import MappedGraph, load_mapped_graph, spawn_seeds
+from ..graph.rule_index import RuleIndex
+from .preparation import encode_walk_batch
+
+# Seconds between checks of the stop event and of producer liveness
+_POLL_INTERVAL = 0.1
+
+
+class WalkStream(IterableDataset):
+    """
+    Endless stream of freshly sampled, rule-compliant walks for training.
+
+    ``workers`` producer processes keep generating walks in chunks of
+    ``chunk_size``, encoding them as <START> ... <END> token tensors and
+    putting them on a queue of at most ``queue_size`` chunks. A full queue
+    blocks the producers until training catches up. With ``workers=0`` the
+    chunks are generated in the consuming process instead.
+
+    Every iteration is one epoch of ``tokens_per_epoch`` tokens (counting
+    <START> and <END>); the epoch ends with the walk that reaches the budget
+    and walks left over from the last chunk start the next epoch.
+    ``batched`` generates the walks with generate_walk_batch instead of
+    generate_multiple_walks. The rules are turned into a RuleIndex once, when
+    they all have a vectorized form, and that is what producers receive.
+    Call ``close`` (or use the stream as a context manager) to stop the
+    producers.
+    """
+    def __init__(self, graph, rules, vocab, min_length, max_length, tokens_per_epoch, workers=1, queue_size=16,
+                 chunk_size=WALK_CHUNK_SIZE, batched=False, seed=None):
+        self.graph = as_csr(graph)
+        try:
+            self.rules = (RuleIndex.from_rules(rules, self.graph.number_of_nodes()),)
+        except ValueError:
+            # Rules without a vectorized form are checked one by one
+            self.rules = tuple(rules)
+        self.vocab = vocab
+        self.min_length = min_length
+        self.max_length = max_length
+        self.tokens_per_epoch = tokens_per_epoch
+        self.workers = workers
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+        self.batched = batched
+        self.seed = seed
+        self._buffer = collections.deque()
+        self._producers = []
+        self._queue = None
+        self._stop = None
+        self._mapped = None
+        self._rng = None
+
+    @property
+    def max_tokens(self):
+        """
+        Tokens in the longest walk the stream can yield.
+        """
+        return self.max_length + 2
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        budget = self.tokens_per_epoch
+        while budget > 0:
+            if not self._buffer:
+                tokens, lengths = self._next_chunk()
+                self._buffer.extend(torch.from_numpy(row[:length + 2]) for row, length in zip(tokens, lengths))
+                continue
+            walk = self._buffer.popleft()
+            budget -= len(walk)
+            yield walk
+
+    def _next_chunk(self):
+        if self.workers == 0:
+            if self._rng is None:
+                self._rng = _chunk_rng(self.seed, self.batched)
+            return _walk_chunk(self.graph, self.rules, self.vocab, self.min_length, self.max_length,
+                               self.chunk_size, self.batched, self._rng)
+        if not self._producers:
+            self.start()
+        while True:
+            try:
+                return self._queue.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                if not any(process.is_alive() for process in self._producers):
+                    raise RuntimeError("All walk producers exited")
+
+    def start(self):
+        """
+        Start the producer processes; iterating starts them on demand.
+        """
+        if self._producers or self.workers == 0:
+            return
+        context = multiprocessing.get_context()
+        self._mapped = MappedGraph(self.graph)
+        path = self._mapped.__enter__()
+        self._queue = context.Queue(maxsize=self.queue_size)
+        self._stop = context.Event()
+        for seed in spawn_seeds(self.seed, self.workers):
+            process = context.Process(target=_produce, daemon=True,
+                                      args=(path, self.rules, self.vocab, self.min_length, self.max_length,
+                                            self.chunk_size, self.batched, seed, self._queue, self._stop))
+            process.start()
+            self._producers.append(process)
+
+    def close(self):
+        """
+        Stop and join the producer processes.
+        """
+        if not self._producers:
+            return
+        self._stop.set()
+        for process in self._producers:
+            # Drain the queue so producers blocked on a full queue can exit
+            while process.is_alive():
+                try:
+                    self._queue.get(timeout=_POLL_INTERVAL)
+                except queue.Empty:
+                    pass
+                process.join(timeout=_POLL_INTERVAL)
+        self._queue.close()
+        self._mapped.__exit__(None, None, None)
+        self._producers = []
+        self._queue = self._stop = self._mapped = None
+
+    def __getstate__(self):
+        # Producers and queues belong to the process that started them
+        state = self.__dict__.copy()
+        state.update(_buffer=collections.deque(), _producers=[], _queue=None, _stop=None, _mapped=None, _rng=None)
+        return state
+
+
+def _chunk_rng(seed, batched):
+    return np.random.default_rng(seed) if batched else random.Random(seed)
+
+
+def _walk_chunk(graph, rules, vocab, min_length, max_length, chunk_size, batched, rng):
+    """
+    Generate chunk_size walks and encode them as a padded token array plus
+    the walk lengths.
+    """
+    if batched:
+        walks, lengths = generate_walk_batch(graph, chunk_size, min_length, max_length, rules, seed=rng)
+    else:
+        walk_list = generate_multiple_walks(graph, chunk_size, min_length, max_length, rules, rng=rng)
+        lengths = np.array([len(walk) for walk in walk_list], dtype=np.int64)
+        walks = np.full((len(walk_list), int(lengths.max())), -1, dtype=np.int64)
+        walks[np.arange(walks.shape[1]) < lengths[:, None]] = np.concatenate(walk_list)
+    return encode_walk_batch(walks, lengths, vocab).numpy(), np.asarray(lengths)
+
+
+def _produce(path, rules, vocab, min_length, max_length, chunk_size, batched, seed, walks, stop):
+    graph = load_mapped_graph(path)
+    rng = _chunk_rng(seed, batched)
+    while not stop.is_set():
+        chunk = _walk_chunk(graph, rules, vocab, min_length, max_length, chunk_size, batched, rng)
+        while not stop.is_set():
+            try:
+                walks.put(chunk, timeout=_POLL_INTERVAL)
+                break
+            except queue.Full:
+                pass
+    walks.cancel_join_thread()
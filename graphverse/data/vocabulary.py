@@ -0,0 +1,175 @@
+import numpy as np
+import torch
+
+SPECIAL_TOKENS = ('<PAD>', '<START>', '<END>')
+
+
+class WalkVocabulary:
+    """
+    Vocabulary for walks.
+
+    Token ids 0-2 are <PAD>, <START> and <END>; every vertex gets the next
+    free id in order of first appearance. The mapping is held in two integer
+    arrays, so ``encode`` and ``decode`` work on whole NumPy arrays or torch
+    tensors at once. ``token2idx`` and ``idx2token`` remain available as
+    string-keyed dicts.
+    """
+    pad_idx = 0
+    start_idx = 1
+    end_idx = 2
+
+    def __init__(self, walks):
+        self._vertex_of = np.full(len(SPECIAL_TOKENS), -1, dtype=np.int64)
+        self._reset_lookup()
+        self.build_vocab(walks)
+
+    @classmethod
+    def from_vertices(cls, vertices):
+        """
+        Vocabulary of the given vertex ids, e.g. ``graph.nodes``, in order.
+        """
+        vocab = cls([])
+        vocab.add_vertices(vertices)
+        return vocab
+
+    @classmethod
+    def from_token2idx(cls, token2idx):
+        """
+        Rebuild a vocabulary from a saved string-keyed token -> index mapping.
+        """
+        vocab = cls([])
+        vertex_of = np.full(len(token2idx), -1, dtype=np.int64)
+        for token, idx in token2idx.items():
+            token = str(token)
+            if token in SPECIAL_TOKENS:
+                if int(idx) != SPECIAL_TOKENS.index(token):
+                    raise ValueError(f"{token} must have index {SPECIAL_TOKENS.index(token)}, not {idx}")
+            else:
+                vertex_of[int(idx)] = int(token)
+        vocab._vertex_of = vertex_of
+        vocab._reset_lookup()
+        return vocab
+
+    @classmethod
+    def from_dict(cls, state):
+        """
+        Load what ``to_dict`` wrote, or an older string-keyed token2idx.
+        """
+        if 'vertices' not in state:
+            return cls.from_token2idx(state)
+        return cls.from_vertices(state['vertices'])
+
+    def to_dict(self):
+        """
+        JSON-serializable form: the vertex of every non-special token id.
+        """
+        return {'vertices': self.vertices.tolist()}
+
+    def build_vocab(self, walks):
+        """
+        Add the vertices of ``walks`` (lists or arrays of vertex ids) that
+        are not in the vocabulary yet.
+        """
+        walks = [np.asarray(walk, dtype=np.int64).ravel() for walk in walks]
+        if walks:
+            flat = np.concatenate(walks)
+            unique, first = np.unique(flat, return_index=True)
+            self.add_vertices(unique[np.argsort(first)])
+
+    def add_vertices(self, vertices):
+        if not isinstance(vertices, np.ndarray):
+            vertices = list(vertices)
+        vertices = np.asarray(vertices, dtype=np.int64).ravel()
+        _, first = np.unique(vertices, return_index=True)
+        vertices = vertices[np.sort(first)]
+        new = vertices[self.encode(vertices, missing=-1) < 0]
+        if len(new):
+            self._vertex_of = np.concatenate([self._vertex_of, new])
+            self._reset_lookup()
+
+    def _reset_lookup(self):
+        vertices = self.vertices
+        self._base = int(vertices.min()) if len(vertices) else 0
+        size = int(vertices.max()) - self._base + 1 if len(vertices) else 0
+        self._lookup = np.full(size, -1, dtype=np.int64)
+        self._lookup[vertices - self._base] = np.arange(len(SPECIAL_TOKENS), len(self._vertex_of))
+        self._tensors = {}
+        self._token2idx = None
+        self._idx2token = None
+
+    @property
+    def vertices(self):
+        """
+        Vertex ids in token id order (token id ``i + 3`` is ``vertices[i]``).
+        """
+        return self._vertex_of[len(SPECIAL_TOKENS):]
+
+    def __len__(self):
+        return len(self._vertex_of)
+
+    def _arrays(self, device):
+        if device not in self._tensors:
+            self._tensors[device] = (torch.as_tensor(self._lookup, device=device),
+                                     torch.as_tensor(self._vertex_of, device=device))
+        return self._tensors[device]
+
+    def encode(self, vertices, missing=None):
+        """
+        Token ids of an int, array or tensor of vertex ids, of the same shape
+        and kind. Unknown vertices raise KeyError unless ``missing`` is given,
+        which is then used as their id.
+        """
+        scalar = not isinstance(vertices, torch.Tensor) and np.ndim(vertices) == 0
+        if isinstance(vertices, torch.Tensor):
+            lookup = self._arrays(vertices.device)[0]
+            index = vertices.long() - self._base
+        else:
+            lookup = self._lookup
+            index = np.atleast_1d(np.asarray(vertices, dtype=np.int64)) - self._base
+        inside = (index >= 0) & (index < len(lookup))
+        if len(lookup):
+            tokens = lookup[index * inside]
+            tokens[~inside] = -1
+        else:
+            tokens = index * 0 - 1
+        unknown = tokens < 0
+        if unknown.any():
+            if missing is None:
+                raise KeyError(f"Vertices not in the vocabulary: {(index[unknown][:10] + self._base).tolist()}")
+            tokens[unknown] = missing
+        return int(tokens[0]) if scalar else tokens
+
+    def decode(self, tokens):
+        """
+        Vertex ids of an int, array or tensor of token ids, with -1 for the
+        special tokens.
+        """
+        if isinstance(tokens, torch.Tensor):
+            return self._arrays(tokens.device)[1][tokens.long()]
+        vertices = self._vertex_of[np.asarray(tokens, dtype=np.int64)]
+        return int(vertices) if np.ndim(tokens) == 0 else vertices
+
+    @property
+    def token2idx(self):
+        if self._token2idx is None:
+            token2idx = {token: idx for idx, token in enumerate(SPECIAL_TOKENS)}
+            token2idx.update((str(vertex), idx)
+                             for idx, vertex in enumerate(self.vertices.tolist(), len(SPECIAL_TOKENS)))
+            self._token2idx = token2idx
+        return self._token2idx
+
+    @property
+    def idx2token(self):
+        if self._idx2token is None:
+            self._idx2token = {idx: token for token, idx in self.token2idx.items()}
+        return self._idx2token
+
+    def __getstate__(self):
+        return {'vertex_of': self._vertex_of}
+
+    def __setstate__(self, state):
+        if 'token2idx' in state:
+            # Pickled by the older dict-based vocabulary
+            state = {'vertex_of': WalkVocabulary.from_token2idx(state['token2idx'])._vertex_of}
+        self._vertex_of = state['vertex_of']
+        self._reset_lookup()
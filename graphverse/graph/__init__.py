@@ -1,3 +1,7 @@
-from .graph_generation import generate_random_graph, calculate_edge_density
-from .rules import define_ascenders, define_descenders, define_evens_odds, check_rule_compliance, AscenderRule, DescenderRule, EvenRule, OddRule
-from .walk import generate_valid_walk, generate_multiple_walks
\ No newline at end of file
+from .csr import CSRGraph, as_csr
+from .graph_generation import generate_random_graph, generate_random_csr_graph, calculate_edge_density, save_graph, load_graph
+from .rules import define_ascenders, define_descenders, define_evens_odds, check_rule_compliance, AscenderRule, DescenderRule, EvenRule, OddRule, RepeaterRule, RuleChecker, ViolationProfiler, violation_profile
+from .walk import generate_valid_walk, generate_multiple_walks, generate_per_node_walks
+from .rule_index import RuleIndex, assign_rules
+from .batch_walk import generate_walk_batch
+from .reachability import ReachabilityIndex, generate_planned_walk, generate_planned_walks
\ No newline at end of file
@@ -0,0 +1,180 @@
+import numpy as np
+from .csr import as_csr
+from .rule_index import RuleIndex, ASCENDER, DESCENDER, EVEN, ODD, REPEATER
+
+# Parity lock codes used while stepping a batch
+NO_PARITY = 2
+PARITY_CONFLICT = 3
+
+
+class _BatchState:
+    """
+    Vectorized constraint state for a block of walks advanced in lockstep.
+    """
+    def __init__(self, num_rows, num_nodes, num_repeaters):
+        self.lower = np.full(num_rows, -1, dtype=np.int64)
+        self.upper = np.full(num_rows, num_nodes, dtype=np.int64)
+        self.parity = np.full(num_rows, NO_PARITY, dtype=np.int8)
+        self.due = np.full((num_rows, max(num_repeaters, 1)), -1, dtype=np.int64)
+
+    def reset(self, rows, num_nodes):
+        self.lower[rows] = -1
+        self.upper[rows] = num_nodes
+        self.parity[rows] = NO_PARITY
+        self.due[rows] = -1
+
+    def advance(self, rows, vertices, positions, index, repeater_slot):
+        """
+        Record the constraints placed by ``vertices`` appended at ``positions``.
+        """
+        flags = index.rule_type[vertices]
+
+        asc = (flags & ASCENDER) != 0
+        self.lower[rows[asc]] = np.maximum(self.lower[rows[asc]], vertices[asc])
+        desc = (flags & DESCENDER) != 0
+        self.upper[rows[desc]] = np.minimum(self.upper[rows[desc]], vertices[desc])
+
+        for flag, parity in ((EVEN, 0), (ODD, 1)):
+            locked = rows[(flags & flag) != 0]
+            current = self.parity[locked]
+            self.parity[locked] = np.where(
+                current == NO_PARITY, parity,
+                np.where(current == parity, parity, PARITY_CONFLICT))
+
+        rep = (flags & REPEATER) != 0
+        self.due[rows[rep], repeater_slot[vertices[rep]]] = positions[rep] + index.rule_param[vertices[rep]]
+
+    def admits(self, rows, candidates, positions, repeater_slot):
+        """
+        Mask of candidate vertices (one row per walk) that may be appended next.
+        """
+        parity = self.parity[rows, None]
+        mask = (candidates >= self.lower[rows, None]) & (candidates <= self.upper[rows, None])
+        mask &= (parity == NO_PARITY) | ((candidates & 1) == parity)
+
+        r, c = np.nonzero(repeater_slot[candidates] >= 0)
+        due = self.due[rows[r], repeater_slot[candidates[r, c]]]
+        mask[r, c] &= (due < 0) | (due == positions[r])
+        return mask
+
+
+def generate_walk_batch(graph, num_walks, min_length, max_length, rules, seed=None,
+                        start_vertices=None, batch_size=1024, max_restarts=10, pad_value=-1):
+    """
+    Generate many rule-compliant walks at once, advancing a whole block of
+    walks one step at a time with NumPy.
+
+    Next vertices are sampled from the edge ``probability`` arrays, restricted
+    to the candidates the rules allow for each row. Walks that dead-end after
+    reaching ``min_length`` are kept as they are; shorter ones restart from a
+    new random vertex (or their own start vertex when ``start_vertices`` is
+    given) up to ``max_restarts`` times before being dropped.
+
+    :param graph: networkx graph or CSRGraph
+    :param start_vertices: optional start vertex per walk; overrides num_walks
+        and may return fewer walks when some start vertices never succeed
+    :return: (walks, lengths) where walks is an int32 array of shape
+        (num_walks, max_length) padded with pad_value
+    """
+    graph = as_csr(graph)
+    n = graph.number_of_nodes()
+    index = RuleIndex.from_rules(rules, n)
+    rng = np.random.default_rng(seed)
+
+    repeater_vertices = index.vertices(REPEATER)
+    repeater_slot = np.full(n, -1, dtype=np.int64)
+    repeater_slot[repeater_vertices] = np.arange(len(repeater_vertices))
+
+    fixed_starts = start_vertices is not None
+    if fixed_starts:
+        start_vertices = np.asarray(start_vertices, dtype=np.int64)
+        num_walks = len(start_vertices)
+
+    walks = []
+    lengths = []
+    produced = 0
+    offset = 0
+    while produced < num_walks and (not fixed_starts or offset < num_walks):
+        rows = min(batch_size, num_walks - (offset if fixed_starts else produced))
+        starts = start_vertices[offset:offset + rows] if fixed_starts else None
+        block, block_lengths = _walk_block(graph, index, repeater_slot, rng, rows, min_length,
+                                           max_length, starts, max_restarts, pad_value)
+        offset += rows
+        if len(block) == 0 and not fixed_starts:
+            raise RuntimeError(f"No walk of at least {min_length} vertices could be generated")
+        walks.append(block)
+        lengths.append(block_lengths)
+        produced += len(block)
+
+    if not walks:
+        return np.full((0, max_length), pad_value, dtype=np.int32), np.zeros(0, dtype=np.int64)
+    return np.concatenate(walks), np.concatenate(lengths)
+
+
+def _walk_block(graph, index, repeater_slot, rng, rows, min_length, max_length,
+                start_vertices, max_restarts, pad_value):
+    n = graph.number_of_nodes()
+    indptr = graph.indptr.astype(np.int64)
+
+    walks = np.full((rows, max_length), pad_value, dtype=np.int32)
+    lengths = np.ones(rows, dtype=np.int64)
+    targets = rng.integers(min_length, max_length + 1, size=rows)
+    restarts = np.zeros(rows, dtype=np.int64)
+    failed = np.zeros(rows, dtype=bool)
+    state = _BatchState(rows, n, int(np.count_nonzero(repeater_slot >= 0)))
+
+    all_rows = np.arange(rows)
+    starts = start_vertices if start_vertices is not None else rng.integers(0, n, size=rows)
+    walks[:, 0] = starts
+    state.advance(all_rows, starts, np.zeros(rows, dtype=np.int64), index, repeater_slot)
+    active = all_rows[lengths < targets]
+
+    while len(active):
+        current = walks[active, lengths[active] - 1].astype(np.int64)
+        degrees = indptr[current + 1] - indptr[current]
+        width = np.arange(max(int(degrees.max()), 1))
+        in_range = width < degrees[:, None]
+        slots = np.where(in_range, indptr[current, None] + width, 0)
+        candidates = graph.indices[slots].astype(np.int64)
+
+        mask = in_range & state.admits(active, candidates, lengths[active], repeater_slot)
+        weights = np.where(mask, graph.probability[slots], 0.0)
+        # Rows whose permitted edges all carry zero probability pick uniformly
+        unweighted = (weights.sum(axis=1) <= 0) & mask.any(axis=1)
+        weights[unweighted] = mask[unweighted]
+
+        cumulative = np.cumsum(weights, axis=1)
+        total = cumulative[:, -1]
+        alive = total > 0
+
+        stepping = active[alive]
+        draws = rng.random(len(stepping)) * total[alive]
+        choice = np.argmax(cumulative[alive] > draws[:, None], axis=1)
+        chosen = candidates[alive, choice]
+        walks[stepping, lengths[stepping]] = chosen
+        state.advance(stepping, chosen, lengths[stepping], index, repeater_slot)
+        lengths[stepping] += 1
+
+        # Dead ends shorter than min_length start over; longer ones are kept
+        dead = active[~alive]
+        restart = dead[lengths[dead] < min_length]
+        restarts[restart] += 1
+        failed[restart[restarts[restart] > max_restarts]] = True
+        restart = restart[restarts[restart] <= max_restarts]
+        if len(restart):
+            walks[restart] = pad_value
+            lengths[restart] = 1
+            if start_vertices is None:
+                walks[restart, 0] = rng.integers(0, n, size=len(restart))
+            else:
+                walks[restart, 0] = start_vertices[restart]
+            state.reset(restart, n)
+            state.advance(restart, walks[restart, 0].astype(np.int64),
+                          np.zeros(len(restart), dtype=np.int64), index, repeater_slot)
+
+        keep = np.concatenate([stepping, restart])
+        keep.sort()
+        active = keep[lengths[keep] < targets[keep]]
+
+    ok = ~failed
+    return walks[ok], lengths[ok]
@@ -0,0 +1,312 @@
+import networkx as nx
+import numpy as np
+from .sampling import AliasTable
+
+
+class CSRGraph:
+    """
+    Compact directed graph stored in compressed sparse row form.
+
+    Vertices are the integers ``0..n-1``. The out-neighbours of vertex ``v``
+    are ``indices[indptr[v]:indptr[v+1]]`` (sorted ascending) and the matching
+    slice of ``probability`` holds the edge transition probabilities.
+
+    The class mirrors the small part of the networkx ``DiGraph`` API used by
+    walks, rules and evaluation: ``nodes`` (as an attribute or a call),
+    ``neighbors``/``successors``, ``has_edge``, ``out_degree``,
+    ``number_of_nodes``, ``number_of_edges``, ``len`` and ``in``. Edge views,
+    edge attribute access (``G[u][v]``) and networkx algorithms or drawing
+    need ``to_networkx()``.
+    """
+    def __init__(self, indptr, indices, probability=None):
+        self.indptr = np.ascontiguousarray(indptr, dtype=np.int32)
+        self.indices = np.ascontiguousarray(indices, dtype=np.int32)
+        if probability is None:
+            probability = uniform_probabilities(self.indptr)
+        self.probability = np.ascontiguousarray(probability, dtype=np.float32)
+        self._alias_table = None
+        self._edge_keys = None
+
+        if self.indptr.ndim != 1 or len(self.indptr) == 0:
+            raise ValueError("indptr must be a non-empty 1-d array")
+        if len(self.indices) != self.indptr[-1] or len(self.probability) != len(self.indices):
+            raise ValueError("indices and probability must have indptr[-1] entries")
+
+    @classmethod
+    def from_edges(cls, n, sources, targets, probability=None):
+        """
+        Build a graph with ``n`` vertices from parallel source/target arrays.
+        Duplicate edges are kept only once (the first occurrence wins).
+        """
+        keys = np.asarray(sources, dtype=np.int64) * n + np.asarray(targets, dtype=np.int64)
+        if probability is not None:
+            order = np.argsort(keys, kind='stable')
+            keys = keys[order]
+            probability = np.asarray(probability, dtype=np.float32)[order]
+        else:
+            keys = np.sort(keys)
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        keys = keys[first]
+        if probability is not None:
+            probability = probability[first]
+        sources = keys // n
+        targets = keys % n
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+        return cls(indptr, targets, probability)
+
+    @classmethod
+    def from_networkx(cls, G):
+        """
+        Convert a networkx (Di)Graph with integer-like node labels.
+        Edges without a ``probability`` attribute share the remaining
+        probability mass of their source vertex uniformly.
+        """
+        nodes = [int(v) for v in G.nodes]
+        n = max(nodes) + 1 if nodes else 0
+        m = G.number_of_edges() * (1 if G.is_directed() else 2)
+
+        sources = np.empty(m, dtype=np.int64)
+        targets = np.empty(m, dtype=np.int64)
+        probability = np.full(m, np.nan, dtype=np.float64)
+        i = 0
+        for u, nbrs in G.adjacency():
+            for v, data in nbrs.items():
+                sources[i] = int(u)
+                targets[i] = int(v)
+                probability[i] = data.get('probability', np.nan)
+                i += 1
+
+        graph = cls.from_edges(n, sources[:i], targets[:i], probability[:i])
+        graph._fill_missing_probabilities()
+        return graph
+
+    def to_networkx(self):
+        """
+        Convert back to a networkx ``DiGraph`` with ``probability`` edge attributes.
+        """
+        G = nx.DiGraph()
+        G.add_nodes_from(range(self.number_of_nodes()))
+        G.add_edges_from(
+            (int(u), int(v), {'probability': float(p)})
+            for u, v, p in zip(self.edge_sources(), self.indices, self.probability)
+        )
+        return G
+
+    def _fill_missing_probabilities(self):
+        missing = np.isnan(self.probability)
+        if not missing.any():
+            return
+        n = self.number_of_nodes()
+        degrees = np.diff(self.indptr)
+        sources = self.edge_sources()
+        known = np.where(missing, 0.0, self.probability)
+        remaining = 1.0 - np.bincount(sources, weights=known, minlength=n)
+        counts = np.bincount(sources, weights=missing, minlength=n)
+        # Vertices whose known edges already use up all of the mass fall back
+        # to a uniform share so the unlabelled edges stay reachable.
+        share = np.where(remaining > 0, remaining / np.maximum(counts, 1), 1.0 / np.maximum(degrees, 1))
+        self.probability[missing] = share[sources[missing]]
+
+    @property
+    def nodes(self):
+        return NodeRange(self.number_of_nodes())
+
+    def number_of_nodes(self):
+        return len(self.indptr) - 1
+
+    def number_of_edges(self):
+        return len(self.indices)
+
+    def is_directed(self):
+        return True
+
+    def __len__(self):
+        return self.number_of_nodes()
+
+    def __contains__(self, v):
+        return 0 <= v < self.number_of_nodes()
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def out_degree(self, v):
+        return int(self.indptr[v + 1] - self.indptr[v])
+
+    def neighbors(self, v):
+        """
+        Out-neighbours of ``v`` as an int32 array view (no copy).
+        """
+        return self.indices[self.indptr[v]:self.indptr[v + 1]]
+
+    successors = neighbors
+
+    def edge_probabilities(self, v):
+        """
+        Transition probabilities of the out-edges of ``v``, aligned with ``neighbors(v)``.
+        """
+        return self.probability[self.indptr[v]:self.indptr[v + 1]]
+
+    def edge_sources(self):
+        """
+        Source vertex of every edge, aligned with ``indices``.
+        """
+        return np.repeat(np.arange(self.number_of_nodes(), dtype=np.int32), np.diff(self.indptr))
+
+    def transpose(self):
+        """
+        Graph with every edge reversed, keeping its probability.
+        """
+        return CSRGraph.from_edges(self.number_of_nodes(), self.indices, self.edge_sources(), self.probability)
+
+    def neighbors_of(self, vertices):
+        """
+        Concatenated out-neighbours of every vertex in ``vertices``.
+        """
+        vertices = np.asarray(vertices, dtype=np.int64)
+        starts = self.indptr[vertices].astype(np.int64)
+        counts = self.indptr[vertices + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        return self.indices[offsets + np.arange(offsets.size)]
+
+    def has_edge(self, u, v):
+        if not (0 <= u < self.number_of_nodes()):
+            return False
+        start, end = self.indptr[u], self.indptr[u + 1]
+        i = start + np.searchsorted(self.indices[start:end], v)
+        return bool(i < end and self.indices[i] == v)
+
+    def add_edges(self, sources, targets):
+        """
+        Add edges in place. A new edge gets the average weight of its source's
+        existing out-edges (1 for vertices without any) and the out-edge
+        probabilities of every source are then renormalized to sum to 1.
+        Edges that already exist keep their probability.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        if not len(sources):
+            return
+        n = self.number_of_nodes()
+        degrees = np.diff(self.indptr)
+        weights = 1.0 / np.maximum(degrees[sources], 1)
+        graph = CSRGraph.from_edges(n, np.concatenate([self.edge_sources(), sources]),
+                                    np.concatenate([self.indices, targets]),
+                                    np.concatenate([self.probability, weights]))
+        edge_sources = graph.edge_sources()
+        touched = np.zeros(n, dtype=bool)
+        touched[sources] = True
+        totals = np.bincount(edge_sources, weights=graph.probability, minlength=n)
+        renormalize = touched[edge_sources]
+        graph.probability[renormalize] /= totals[edge_sources[renormalize]]
+
+        self.indptr, self.indices, self.probability = graph.indptr, graph.indices, graph.probability
+        self._alias_table = None
+        self._edge_keys = None
+
+    def alias_table(self):
+        """
+        AliasTable over the edge probabilities, built on first use and kept
+        for the lifetime of the graph.
+        """
+        if self._alias_table is None:
+            self._alias_table = AliasTable(self.indptr, self.indices, self.probability)
+        return self._alias_table
+
+    def edge_keys(self):
+        """
+        Sorted int64 key ``u * n + v`` of every edge (u, v), aligned with
+        ``indices``; built on first use like the alias table.
+        """
+        if self._edge_keys is None:
+            # Rows are stored in order with sorted targets, so the keys are sorted
+            self._edge_keys = self.edge_sources().astype(np.int64) * self.number_of_nodes() + self.indices
+        return self._edge_keys
+
+    def has_edges(self, sources, targets):
+        """
+        Vectorized has_edge: boolean array telling for every (source, target)
+        pair whether the edge exists.
+        """
+        n = self.number_of_nodes()
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        inside = (sources >= 0) & (sources < n) & (targets >= 0) & (targets < n)
+        edge_keys = self.edge_keys()
+        if not len(edge_keys):
+            return np.zeros(inside.shape, dtype=bool)
+        keys = np.where(inside, sources * n + targets, -1)
+        i = np.minimum(np.searchsorted(edge_keys, keys), len(edge_keys) - 1)
+        return inside & (edge_keys[i] == keys)
+
+
+class NodeRange:
+    """
+    The vertices ``0..n-1`` of a CSRGraph. Like a networkx NodeView it works
+    both as ``graph.nodes`` and as ``graph.nodes()``.
+    """
+    def __init__(self, n):
+        self._range = range(n)
+
+    def __call__(self):
+        return self
+
+    def __iter__(self):
+        return iter(self._range)
+
+    def __len__(self):
+        return len(self._range)
+
+    def __contains__(self, v):
+        return v in self._range
+
+    def __getitem__(self, i):
+        return self._range[i]
+
+    def __repr__(self):
+        return f"NodeRange({len(self._range)})"
+
+
+def uniform_probabilities(indptr):
+    """
+    Uniform transition probabilities for every out-edge of a CSR layout.
+    """
+    degrees = np.diff(indptr)
+    return np.repeat(1.0 / np.maximum(degrees, 1), degrees).astype(np.float32)
+
+
+def add_edges(graph, sources, targets):
+    """
+    Add edges to a CSRGraph or networkx DiGraph with the renormalization of
+    CSRGraph.add_edges. On networkx graphs the probabilities of a source are
+    only touched when all of its existing out-edges carry one.
+    """
+    if isinstance(graph, CSRGraph):
+        graph.add_edges(sources, targets)
+        return
+    touched = set()
+    for u, v in zip(sources, targets):
+        u, v = int(u), int(v)
+        if graph.has_edge(u, v):
+            continue
+        out = graph[u] if u in graph else {}
+        if all('probability' in data for data in out.values()):
+            graph.add_edge(u, v, probability=1.0 / max(len(out), 1))
+            touched.add(u)
+        else:
+            graph.add_edge(u, v)
+    for u in touched:
+        total = sum(data['probability'] for data in graph[u].values())
+        for data in graph[u].values():
+            data['probability'] /= total
+
+
+def as_csr(graph):
+    """
+    Return ``graph`` as a CSRGraph, converting from networkx if necessary.
+    """
+    if isinstance(graph, CSRGraph):
+        return graph
+    return CSRGraph.from_networkx(graph)
@@ -1,6 +1,14 @@
+import os
 import networkx as nx
+import numpy as np
 import math
 import random
+from .csr import CSRGraph
+from .storage import write_graph_file, read_graph_file, read_gml_graph, is_graph_file
+
+GRAPH_PATH = 'my_graph.gvg'
+# Default of the GML format used before the binary graph files
+LEGACY_GRAPH_PATH = 'my_graph.gml'
 
 
 def generate_random_graph(n, num_in_edges, num_out_edges):
@@ -49,6 +57,125 @@ def generate_random_graph(n, num_in_edges, num_out_edges):
     return G
 
 
+def generate_random_csr_graph(n, num_in_edges, num_out_edges, seed=None):
+    """
+    Vectorized counterpart of generate_random_graph that scales to millions
+    of vertices and returns a CSRGraph.
+
+    Every vertex gets num_out_edges distinct out-neighbours and num_in_edges
+    distinct in-neighbours (no self loops), sampled per row without
+    replacement. Strong connectivity comes from a single SCC pass followed by
+    a ring of edges through the source and sink components of the
+    condensation. Out-edge probabilities are random and normalized per vertex.
+    """
+    rng = np.random.default_rng(seed)
+    vertices = np.arange(n, dtype=np.int64)
+
+    sources = np.concatenate([
+        np.repeat(vertices, num_out_edges),
+        _sample_distinct_neighbors(rng, n, num_in_edges).ravel(),
+    ])
+    targets = np.concatenate([
+        _sample_distinct_neighbors(rng, n, num_out_edges).ravel(),
+        np.repeat(vertices, num_in_edges),
+    ])
+    graph = CSRGraph.from_edges(n, sources, targets)
+
+    extra_sources, extra_targets = _strong_connectivity_edges(graph)
+    if len(extra_sources):
+        sources = np.concatenate([graph.edge_sources(), extra_sources])
+        targets = np.concatenate([graph.indices, extra_targets])
+        graph = CSRGraph.from_edges(n, sources, targets)
+
+    weights = rng.random(graph.number_of_edges())
+    edge_sources = graph.edge_sources()
+    totals = np.bincount(edge_sources, weights=weights, minlength=n)
+    graph.probability = (weights / totals[edge_sources]).astype(np.float32)
+    return graph
+
+
+def _sample_distinct_neighbors(rng, n, k):
+    """
+    Row v holds k distinct vertices other than v, for every vertex v.
+    """
+    if k > n - 1:
+        raise ValueError(f"Cannot pick {k} distinct neighbours in a graph with {n} vertices")
+    if 2 * k > n - 1:
+        picks = np.argpartition(rng.random((n, n - 1)), k - 1, axis=1)[:, :k]
+    else:
+        picks = rng.integers(0, n - 1, size=(n, k))
+        while True:
+            picks.sort(axis=1)
+            duplicates = np.zeros(picks.shape, dtype=bool)
+            duplicates[:, 1:] = picks[:, 1:] == picks[:, :-1]
+            if not duplicates.any():
+                break
+            picks[duplicates] = rng.integers(0, n - 1, size=int(duplicates.sum()))
+    # Shift values at or above the row's own vertex to skip self loops
+    return picks + (picks >= np.arange(n)[:, None])
+
+
+def _reachable(graph, start, allowed):
+    """
+    Boolean mask of vertices reachable from start while staying inside allowed.
+    """
+    visited = np.zeros(graph.number_of_nodes(), dtype=bool)
+    visited[start] = True
+    frontier = np.array([start])
+    while len(frontier):
+        reached = graph.neighbors_of(frontier)
+        reached = reached[allowed[reached] & ~visited[reached]]
+        frontier_mask = np.zeros_like(visited)
+        frontier_mask[reached] = True
+        frontier = np.flatnonzero(frontier_mask)
+        visited |= frontier_mask
+    return visited
+
+
+def strongly_connected_labels(graph):
+    """
+    Label each vertex of a CSRGraph with its strongly connected component
+    using forward/backward reachability, one frontier at a time.
+    """
+    n = graph.number_of_nodes()
+    reverse = graph.transpose()
+    labels = np.full(n, -1, dtype=np.int64)
+    remaining = np.ones(n, dtype=bool)
+    component = 0
+    while remaining.any():
+        pivot = int(np.argmax(remaining))
+        scc = _reachable(graph, pivot, remaining) & _reachable(reverse, pivot, remaining)
+        labels[scc] = component
+        remaining &= ~scc
+        component += 1
+    return labels
+
+
+def _strong_connectivity_edges(graph):
+    """
+    Edges that make the graph strongly connected: a ring through one vertex
+    of every source or sink component of the condensation. Every component
+    is reachable from a source and reaches a sink, so the ring joins them all.
+    """
+    labels = strongly_connected_labels(graph)
+    num_components = int(labels.max()) + 1 if len(labels) else 0
+    if num_components <= 1:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    from_component = labels[graph.edge_sources()]
+    to_component = labels[graph.indices]
+    between = from_component != to_component
+    has_in = np.zeros(num_components, dtype=bool)
+    has_out = np.zeros(num_components, dtype=bool)
+    has_in[to_component[between]] = True
+    has_out[from_component[between]] = True
+
+    representative = np.zeros(num_components, dtype=np.int64)
+    representative[labels] = np.arange(len(labels))
+    ring = representative[np.flatnonzero(~has_in | ~has_out)]
+    return ring, np.roll(ring, -1)
+
+
 def calculate_edge_density(G):
     """
     Calculate the actual edge density of the graph.
@@ -58,17 +185,30 @@ def calculate_edge_density(G):
     return 2 * m / (n * (n - 1))
 
 
-def save_graph(G, path='my_graph.gml'):
+def save_graph(G, path=GRAPH_PATH, rules=()):
     """
-    Save the graph to disk.
+    Save the graph, and optionally its rules, to disk in the binary graph
+    format of storage.write_graph_file.
     """
-    nx.write_gml(G, path)
+    write_graph_file(path, G, rules)
     return True
 
 
-def load_graph(path='my_graph.gml'):
+def load_graph(path=None, mmap=False, with_rules=False, as_networkx=False):
     """
-    Load the Graph from disk.
+    Load a graph saved by save_graph as a CSRGraph with integer vertices.
+    With ``mmap`` the arrays are memory-mapped instead of read, and with
+    ``with_rules`` a (graph, rules) tuple is returned. Files in the old GML
+    format are loaded as a networkx DiGraph, as before, and carry no rules;
+    ``as_networkx`` returns a DiGraph for binary files too. Without a path,
+    my_graph.gvg is loaded, or my_graph.gml when there is no such file.
     """
-    G = nx.read_gml(path)
-    return G
+    if path is None:
+        path = GRAPH_PATH if os.path.exists(GRAPH_PATH) else LEGACY_GRAPH_PATH
+    if is_graph_file(path):
+        G, rules = read_graph_file(path, mmap=mmap)
+        if as_networkx:
+            G = G.to_networkx()
+    else:
+        G, rules = read_gml_graph(path), ()
+    return (G, rules) if with_rules else G
@@ -0,0 +1,74 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .csr import CSRGraph, as_csr
+
+_CSR_ARRAYS = ('indptr', 'indices', 'probability')
+
+# Graph and rules loaded once per worker process by _init_worker
+_worker_state = {}
+
+
+class MappedGraph:
+    """
+    Context manager that writes a CSRGraph's arrays to a temporary directory
+    so worker processes can memory-map them instead of unpickling the graph
+    for every task. Entering returns the directory path.
+    """
+    def __init__(self, graph):
+        self.graph = as_csr(graph)
+        self._tmp = None
+
+    def __enter__(self):
+        self._tmp = tempfile.TemporaryDirectory(prefix='graphverse-')
+        for name in _CSR_ARRAYS:
+            np.save(os.path.join(self._tmp.name, f'{name}.npy'), getattr(self.graph, name))
+        return self._tmp.name
+
+    def __exit__(self, *exc):
+        self._tmp.cleanup()
+        self._tmp = None
+
+
+def load_mapped_graph(path):
+    """
+    Open a graph written by MappedGraph without copying its arrays.
+    """
+    arrays = [np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in _CSR_ARRAYS]
+    return CSRGraph(*arrays)
+
+
+def spawn_seeds(seed, count):
+    """
+    Derive ``count`` independent integer seeds from one root seed.
+    """
+    return [int(s.generate_state(1, np.uint64)[0]) for s in np.random.SeedSequence(seed).spawn(count)]
+
+
+def _init_worker(path, rules):
+    _worker_state['graph'] = load_mapped_graph(path)
+    _worker_state['rules'] = rules
+
+
+def _run_task(job):
+    fn, task = job
+    return fn(_worker_state['graph'], _worker_state['rules'], task)
+
+
+def map_walk_tasks(graph, rules, fn, tasks, workers):
+    """
+    Run ``fn(graph, rules, task)`` for every task and yield the results in
+    task order as they become available. With more than one worker the tasks
+    run in a process pool whose workers memory-map the graph and receive the
+    rules once.
+    """
+    graph = as_csr(graph)
+    if workers <= 1:
+        for task in tasks:
+            yield fn(graph, rules, task)
+        return
+
+    with MappedGraph(graph) as path:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path, rules)) as pool:
+            yield from pool.map(_run_task, [(fn, task) for task in tasks])
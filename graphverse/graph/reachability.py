@@ -0,0 +1,171 @@
+import random
+import numpy as np
+from .csr import as_csr
+from .rules import RuleChecker
+from .rule_index import RuleIndex, ASCENDER, DESCENDER, EVEN, ODD, REPEATER
+from .batch_walk import NO_PARITY, PARITY_CONFLICT
+from .sampling import choose_weighted
+
+
+class ReachabilityIndex:
+    """
+    Lazily computed table of how far a walk can still be extended.
+
+    A constraint state is the triple (lower bound, upper bound, parity lock)
+    left behind by the ascenders, descenders, evens and odds visited so far.
+    For every state that is reached, ``reach(state)[v]`` is the number of
+    vertices that can still be appended after ``v`` (capped at
+    ``max_length - 1``) without leaving the state: continuations only use
+    vertices the state admits, that tighten nothing and that are not
+    repeaters. Such a continuation can never break a rule, so a walk that
+    only steps to vertices with enough reach left never has to backtrack.
+    """
+    def __init__(self, graph, rules, max_length):
+        self.graph = as_csr(graph)
+        self.index = RuleIndex.from_rules(rules, self.graph.number_of_nodes())
+        self.cap = max(max_length - 1, 0)
+        self._targets = self.graph.indices.astype(np.int64)
+        self._tables = {}
+
+    def state_of(self, walk_state):
+        """
+        Constraint state of a WalkState as a hashable key.
+        """
+        lower = -1 if walk_state.lower is None else walk_state.lower
+        upper = self.graph.number_of_nodes() if walk_state.upper is None else walk_state.upper
+        parity = {None: NO_PARITY, -1: PARITY_CONFLICT}.get(walk_state.parity, walk_state.parity)
+        return lower, upper, parity
+
+    def step(self, state, vertex):
+        """
+        State after appending ``vertex`` to a walk in ``state``.
+        """
+        lower, upper, parity = state
+        flags = int(self.index.rule_type[vertex])
+        if flags & ASCENDER:
+            lower = max(lower, vertex)
+        if flags & DESCENDER:
+            upper = min(upper, vertex)
+        for flag, locked in ((EVEN, 0), (ODD, 1)):
+            if flags & flag:
+                parity = locked if parity in (NO_PARITY, locked) else PARITY_CONFLICT
+        return lower, upper, parity
+
+    def reach(self, state):
+        """
+        Array with the capped number of vertices that can follow each vertex
+        in the given state.
+        """
+        table = self._tables.get(state)
+        if table is None:
+            table = self._tables[state] = self._compute(state)
+        return table
+
+    def _compute(self, state):
+        lower, upper, parity = state
+        n = self.graph.number_of_nodes()
+        vertices = np.arange(n)
+        flags = self.index.rule_type
+
+        if parity == PARITY_CONFLICT:
+            return np.zeros(n, dtype=np.int64)
+        usable = (vertices >= lower) & (vertices <= upper)
+        if parity != NO_PARITY:
+            usable &= (vertices & 1) == parity
+        # Vertices that would change the state or start a repeater cycle
+        usable &= (flags & REPEATER) == 0
+        usable &= ((flags & ASCENDER) == 0) | (vertices == lower)
+        usable &= ((flags & DESCENDER) == 0) | (vertices == upper)
+        usable &= ((flags & EVEN) == 0) | (parity == 0)
+        usable &= ((flags & ODD) == 0) | (parity == 1)
+
+        indptr = self.graph.indptr.astype(np.int64)
+        has_edges = indptr[1:] > indptr[:-1]
+        # reduceat only over vertices with out-edges: their offsets are
+        # strictly increasing and all inside the edge array
+        starts = indptr[:-1][has_edges]
+        edge_usable = usable[self._targets]
+
+        # Longest usable walk from every vertex, found by relaxing one more
+        # step per round; cycles simply run into the cap.
+        reach = np.zeros(n, dtype=np.int64)
+        for _ in range(self.cap):
+            if not len(self._targets):
+                break
+            extended = np.where(edge_usable, reach[self._targets] + 1, 0)
+            updated = np.zeros(n, dtype=np.int64)
+            updated[has_edges] = np.maximum.reduceat(extended, starts)
+            np.minimum(updated, self.cap, out=updated)
+            if np.array_equal(updated, reach):
+                break
+            reach = updated
+        return reach
+
+
+def generate_planned_walk(graph, start_vertex, min_length, max_length, rules, rng=None, index=None):
+    """
+    Generate a walk that satisfies all rules without ever backtracking.
+
+    Every step only considers neighbours from which the rest of the target
+    length is known to be reachable (see ReachabilityIndex) and picks one
+    by edge probability, renormalized over those neighbours. The cost of
+    a walk is bounded by its length. When the index shows that the start
+    vertex cannot reach the drawn target length, the walk is shortened to
+    what is reachable, and None is returned if that is below min_length.
+
+    :param index: ReachabilityIndex to reuse across walks on the same graph
+    """
+    rng = random if rng is None else rng
+    if index is None:
+        index = ReachabilityIndex(graph, rules, max_length)
+    graph = index.graph
+
+    target_length = rng.randint(min_length, max_length)
+    checker = RuleChecker(rules, [start_vertex], graph=graph)
+    state = index.state_of(checker.state)
+    target_length = min(target_length, int(index.reach(state)[start_vertex]) + 1)
+    if target_length < min_length:
+        return None
+
+    while len(checker) < target_length:
+        needed = target_length - len(checker) - 1
+        current = checker.walk[-1]
+        options = []
+        weights = []
+        for neighbor, probability in zip(graph.neighbors(current).tolist(), graph.edge_probabilities(current)):
+            if checker.allows(neighbor):
+                next_state = index.step(state, neighbor)
+                if index.reach(next_state)[neighbor] >= needed:
+                    options.append((neighbor, next_state))
+                    weights.append(probability)
+        next_vertex, state = choose_weighted(options, weights, rng)
+        checker.push(next_vertex)
+
+    return list(checker.walk)
+
+
+def generate_planned_walks(graph, num_walks, min_length, max_length, rules, rng=None, max_failures=None):
+    """
+    Generate num_walks walks with generate_planned_walk from random start
+    vertices, sharing one ReachabilityIndex.
+
+    :param max_failures: number of start vertices allowed to fail before
+        giving up with a RuntimeError (default: 10 * num_walks)
+    """
+    rng = random if rng is None else rng
+    index = ReachabilityIndex(graph, rules, max_length)
+    nodes = list(index.graph.nodes)
+    max_failures = 10 * num_walks if max_failures is None else max_failures
+
+    walks = []
+    failures = 0
+    while len(walks) < num_walks:
+        walk = generate_planned_walk(graph, rng.choice(nodes), min_length, max_length, rules, rng=rng,
+                                     index=index)
+        if walk is not None:
+            walks.append(walk)
+            continue
+        failures += 1
+        if failures > max_failures:
+            raise RuntimeError(f"No walk of at least {min_length} vertices could be generated")
+    return walks
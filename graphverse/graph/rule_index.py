@@ -0,0 +1,200 @@
+import numpy as np
+from .csr import add_edges
+from .rules import (Rule, AscenderRule, DescenderRule, EvenRule, OddRule, RepeaterRule, EdgeExistenceRule,
+                    _lookup, _ascender_violations, _descender_violations, _parity_violations,
+                    _repeater_violations)
+
+# Rule type flags stored per vertex in RuleIndex.rule_type
+ASCENDER = 1
+DESCENDER = 2
+EVEN = 4
+ODD = 8
+REPEATER = 16
+
+
+class RuleIndex(Rule):
+    """
+    Per-vertex rule lookup table for vectorized walk code.
+
+    ``rule_type[v]`` is a bitmask of the rule flags above and
+    ``rule_param[v]`` holds the repeater period (0 for other vertices).
+
+    The index is itself a rule equivalent to the ascender, descender, even,
+    odd and repeater rules it was built from, so a RuleChecker given
+    ``(index,)`` does one array lookup per vertex instead of a membership
+    test per rule.
+    """
+    def __init__(self, rule_type, rule_param):
+        self.rule_type = np.asarray(rule_type, dtype=np.uint8)
+        self.rule_param = np.asarray(rule_param, dtype=np.int32)
+
+    @classmethod
+    def from_rules(cls, rules, num_nodes):
+        """
+        Build the index from a tuple of rule objects. Edge existence rules are
+        ignored since walks only ever follow existing edges, and RuleIndex
+        rules are merged in. A single RuleIndex covering exactly
+        ``num_nodes`` vertices is returned as is, without copying.
+        """
+        indexes = [rule for rule in rules if isinstance(rule, RuleIndex)]
+        if (len(indexes) == 1 and len(indexes[0]) == num_nodes
+                and all(isinstance(rule, (RuleIndex, EdgeExistenceRule)) for rule in rules)):
+            return indexes[0]
+        rule_type = np.zeros(num_nodes, dtype=np.uint8)
+        rule_param = np.zeros(num_nodes, dtype=np.int32)
+
+        def mark(vertices, flag):
+            vertices = np.fromiter((int(v) for v in vertices), dtype=np.int64)
+            rule_type[vertices] |= flag
+
+        for rule in rules:
+            if isinstance(rule, RuleIndex):
+                size = min(len(rule), num_nodes)
+                rule_type[:size] |= rule.rule_type[:size]
+                repeats = np.flatnonzero(rule.rule_type[:size] & REPEATER)
+                rule_param[repeats] = rule.rule_param[repeats]
+            elif isinstance(rule, AscenderRule):
+                mark(rule.ascenders, ASCENDER)
+            elif isinstance(rule, DescenderRule):
+                mark(rule.descenders, DESCENDER)
+            elif isinstance(rule, EvenRule):
+                mark(rule.evens, EVEN)
+            elif isinstance(rule, OddRule):
+                mark(rule.odds, ODD)
+            elif isinstance(rule, RepeaterRule):
+                mark(rule.repeaters, REPEATER)
+                for v, k in rule.repeaters.items():
+                    rule_param[int(v)] = k
+            elif not isinstance(rule, EdgeExistenceRule):
+                raise ValueError(f"{type(rule).__name__} has no vectorized form")
+
+        return cls(rule_type, rule_param)
+
+    def __len__(self):
+        return len(self.rule_type)
+
+    def vertices(self, flag):
+        """
+        All vertices carrying the given rule flag.
+        """
+        return np.flatnonzero(self.rule_type & flag)
+
+    def lookup(self, vertex):
+        """
+        (rule flags, repeater period) of a vertex; (0, 0) for vertices
+        outside the index.
+        """
+        if 0 <= vertex < len(self.rule_type):
+            return int(self.rule_type[vertex]), int(self.rule_param[vertex])
+        return 0, 0
+
+    def rule_sets(self):
+        """
+        The rule vertices as (ascenders, descenders, evens, odds, repeaters)
+        sets, with repeaters a vertex -> period dict as define_all_rules
+        returns them.
+        """
+        repeaters = self.vertices(REPEATER)
+        return (set(self.vertices(ASCENDER).tolist()), set(self.vertices(DESCENDER).tolist()),
+                set(self.vertices(EVEN).tolist()), set(self.vertices(ODD).tolist()),
+                dict(zip(repeaters.tolist(), self.rule_param[repeaters].tolist())))
+
+    def to_rules(self):
+        """
+        The equivalent tuple of separate rule objects.
+        """
+        ascenders, descenders, evens, odds, repeaters = self.rule_sets()
+        return (AscenderRule(ascenders), DescenderRule(descenders), EvenRule(evens), OddRule(odds),
+                RepeaterRule(repeaters))
+
+    def apply(self, graph, walk):
+        walk = np.asarray([[int(v) for v in walk]], dtype=np.int64).reshape(1, -1)
+        return not self.violation_mask(graph, walk, np.ones(walk.shape, dtype=bool)).any()
+
+    def admits(self, state, vertex):
+        return ((state.lower is None or vertex >= state.lower)
+                and (state.upper is None or vertex <= state.upper)
+                and (state.parity is None or vertex % 2 == state.parity)
+                and state.due.get(vertex, state.length) == state.length)
+
+    def advance(self, state, vertex):
+        flags, period = self.lookup(vertex)
+        if not flags:
+            return
+        if flags & ASCENDER:
+            state.raise_lower(vertex)
+        if flags & DESCENDER:
+            state.reduce_upper(vertex)
+        if flags & EVEN:
+            state.lock_parity(0)
+        if flags & ODD:
+            state.lock_parity(1)
+        if flags & REPEATER:
+            state.set_due(vertex, state.length + period)
+
+    def violation_mask(self, graph, walks, valid):
+        flags = _lookup(self.rule_type, walks, valid)
+        periods = np.where(flags & REPEATER, _lookup(self.rule_param, walks, valid), 0)
+        return (_ascender_violations(walks, valid, (flags & ASCENDER) != 0)
+                | _descender_violations(walks, valid, (flags & DESCENDER) != 0)
+                | _parity_violations(walks, valid, (flags & EVEN) != 0, 0)
+                | _parity_violations(walks, valid, (flags & ODD) != 0, 1)
+                | _repeater_violations(walks, periods))
+
+
+def assign_rules(graph, n, num_repeaters, min_steps, max_steps, seed=None):
+    """
+    Assign rules to the vertices of a networkx or CSR graph and return them
+    as a RuleIndex; every vertex gets at most one rule.
+
+    As in define_all_rules, a fifth of the vertices within 10% of ``n // 2``
+    become ascenders, then a fifth of the rest descenders, and up to
+    ``n // 10`` even and odd vertices each are drawn from the remainder.
+    ``num_repeaters`` further vertices become repeaters with a period k in
+    ``[min_steps, max_steps]``, and a loop of k edges through k-1 vertices
+    without a rule is added for each, renormalizing the out-edge
+    probabilities of the loop vertices. Everything is vectorized over the
+    vertex arrays, so million-vertex graphs are fine.
+    """
+    rng = np.random.default_rng(seed)
+    nodes = np.fromiter((int(v) for v in graph.nodes), dtype=np.int64)
+    size = int(nodes.max()) + 1 if len(nodes) else 0
+    vertex_ids = np.arange(size)
+    available = np.zeros(size, dtype=bool)
+    available[nodes] = True
+    rule_type = np.zeros(size, dtype=np.uint8)
+    rule_param = np.zeros(size, dtype=np.int32)
+
+    def take(candidates, k, flag):
+        chosen = rng.choice(np.flatnonzero(candidates), size=k, replace=False)
+        rule_type[chosen] = flag
+        available[chosen] = False
+        return chosen
+
+    mid = n // 2
+    in_range = (vertex_ids >= int(mid * 0.9)) & (vertex_ids <= int(mid * 1.1))
+    for flag in (ASCENDER, DESCENDER):
+        candidates = available & in_range
+        take(candidates, int(candidates.sum()) // 5, flag)
+    evens = available & (vertex_ids % 2 == 0)
+    odds = available & (vertex_ids % 2 == 1)
+    take(evens, min(n // 10, int(evens.sum())), EVEN)
+    take(odds, min(n // 10, int(odds.sum())), ODD)
+
+    repeaters = take(available, min(num_repeaters, int(available.sum())), REPEATER)
+    periods = rng.integers(min_steps, max_steps + 1, size=len(repeaters))
+    rule_param[repeaters] = periods
+
+    pool = np.flatnonzero(available)
+    sources = []
+    targets = []
+    for vertex, steps in zip(repeaters.tolist(), periods.tolist()):
+        if steps - 1 > len(pool):
+            raise ValueError(f"Not enough vertices without a rule for a loop of {steps} steps")
+        loop = np.concatenate([[vertex], rng.choice(pool, size=steps - 1, replace=False), [vertex]])
+        sources.append(loop[:-1])
+        targets.append(loop[1:])
+    if sources:
+        add_edges(graph, np.concatenate(sources), np.concatenate(targets))
+
+    return RuleIndex(rule_type, rule_param)
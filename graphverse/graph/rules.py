@@ -1,29 +1,20 @@
 from abc import ABC, abstractmethod
 import random
+import numpy as np
+from .csr import as_csr, add_edges
 
 def define_all_rules(graph, n, num_repeaters, repeater_min_steps, repeater_max_steps):
     """
     Define all rule vertices while ensuring each vertex is assigned at most one rule.
-    """
-    rule_vertices = set()
-
-    # Define ascenders
-    ascenders = define_ascenders(graph, n, rule_vertices)
-    rule_vertices.update(ascenders)
-
-    # Define descenders
-    descenders = define_descenders(graph, n, rule_vertices)
-    rule_vertices.update(descenders)
-
-    # Define evens and odds
-    evens, odds = define_evens_odds(graph, n, rule_vertices)
-    rule_vertices.update(evens)
-    rule_vertices.update(odds)
 
-    # Define repeaters
-    repeaters = define_repeaters(graph, num_repeaters, repeater_min_steps, repeater_max_steps, rule_vertices)
-
-    return ascenders, descenders, evens, odds, repeaters
+    The assignment is done by ``rule_index.assign_rules`` (seeded from the
+    random module) and returned as (ascenders, descenders, evens, odds,
+    repeaters) sets plus the repeater step dict.
+    """
+    from .rule_index import assign_rules
+    index = assign_rules(graph, n, num_repeaters, repeater_min_steps, repeater_max_steps,
+                         seed=random.getrandbits(64))
+    return index.rule_sets()
 
 def define_ascenders(graph, n, existing_rule_vertices):
     """
@@ -52,32 +43,37 @@ def define_evens_odds(graph, n, existing_rule_vertices):
     Randomly select even and odd vertices that are not already assigned to another rule.
     """
     available_vertices = set(graph.nodes()) - existing_rule_vertices
-    evens = set(random.sample([v for v in available_vertices if v % 2 == 0], k=min(n//10, len(available_vertices))))
-    odds = set(random.sample([v for v in available_vertices if v % 2 != 0], k=min(n//10, len(available_vertices))))
+    even_candidates = [v for v in available_vertices if v % 2 == 0]
+    odd_candidates = [v for v in available_vertices if v % 2 != 0]
+    evens = set(random.sample(even_candidates, k=min(n//10, len(even_candidates))))
+    odds = set(random.sample(odd_candidates, k=min(n//10, len(odd_candidates))))
     return evens, odds
 
 def define_repeaters(graph, num_repeaters, min_steps, max_steps, existing_rule_vertices):
     """
     Randomly select vertices and their corresponding number of steps for the repeater rule.
-    Add k-1 edges to form a loop starting and stopping at the repeater vertex.
+    Add k-1 edges to form a loop starting and stopping at the repeater vertex; the
+    out-edge probabilities of the loop vertices are renormalized afterwards.
     """
     repeaters = {}
-    available_vertices = set(graph.nodes()) - existing_rule_vertices
-    
+    available_vertices = sorted(set(graph.nodes()) - existing_rule_vertices)
+    sources = []
+    targets = []
+
     for _ in range(num_repeaters):
-        vertex = random.choice(list(available_vertices))
+        vertex = random.choice(available_vertices)
         steps = random.randint(min_steps, max_steps)
         
         # Add k-1 edges to form a loop starting and stopping at the repeater vertex
-        loop_vertices = random.sample(list(available_vertices), steps - 1)
+        loop_vertices = random.sample([v for v in available_vertices if v != vertex], steps - 1)
         loop_vertices.insert(0, vertex)
         loop_vertices.append(vertex)
-        
-        for i in range(len(loop_vertices) - 1):
-            graph.add_edge(loop_vertices[i], loop_vertices[i + 1])
+        sources.extend(loop_vertices[:-1])
+        targets.extend(loop_vertices[1:])
         
         repeaters[vertex] = steps
-    
+
+    add_edges(graph, sources, targets)
     return repeaters
 
 def check_rule_compliance(walk, ascenders, descenders, evens, odds):
@@ -97,6 +93,128 @@ def check_rule_compliance(walk, ascenders, descenders, evens, odds):
                 return False
     return True
 
+class WalkState:
+    """
+    Running constraint state of a walk that grows one vertex at a time.
+
+    Rules record their constraints here as vertices are appended: a minimum
+    bound (ascenders), a maximum bound (descenders), a parity lock (evens and
+    odds, -1 once both are active) and the position at which each visited
+    repeater is next due. Every change is logged so ``rollback`` can undo the
+    most recent vertex in O(1).
+    """
+    def __init__(self, graph=None):
+        self.graph = graph
+        self.walk = []
+        self.lower = None
+        self.upper = None
+        self.parity = None
+        self.due = {}
+        self._frames = []
+
+    @property
+    def length(self):
+        return len(self.walk)
+
+    def begin(self):
+        self._frames.append([])
+
+    def rollback(self):
+        for name, key, value in reversed(self._frames.pop()):
+            if name == 'due':
+                if value is None:
+                    del self.due[key]
+                else:
+                    self.due[key] = value
+            else:
+                setattr(self, name, value)
+        return self.walk.pop()
+
+    def _set(self, name, value):
+        self._frames[-1].append((name, None, getattr(self, name)))
+        setattr(self, name, value)
+
+    def raise_lower(self, bound):
+        if self.lower is None or bound > self.lower:
+            self._set('lower', bound)
+
+    def reduce_upper(self, bound):
+        if self.upper is None or bound < self.upper:
+            self._set('upper', bound)
+
+    def lock_parity(self, parity):
+        if self.parity is None:
+            self._set('parity', parity)
+        elif self.parity != parity and self.parity != -1:
+            self._set('parity', -1)
+
+    def set_due(self, vertex, position):
+        self._frames[-1].append(('due', vertex, self.due.get(vertex)))
+        self.due[vertex] = position
+
+
+class RuleChecker:
+    """
+    Incremental rule checker: answers "can this vertex come next?" in O(1)
+    per rule and supports push/pop so walks can backtrack.
+
+    Rules that do not implement ``admits``/``advance`` are checked by calling
+    ``apply`` on the extended walk instead.
+    """
+    def __init__(self, rules, walk=(), graph=None):
+        self.rules = tuple(rule for rule in rules if type(rule).admits is not Rule.admits)
+        self.fallback_rules = tuple(rule for rule in rules if type(rule).admits is Rule.admits)
+        self.state = WalkState(graph)
+        for vertex in walk:
+            self.push(vertex)
+
+    def __len__(self):
+        return self.state.length
+
+    @property
+    def walk(self):
+        return self.state.walk
+
+    def allows(self, vertex):
+        vertex = int(vertex)
+        if not all(rule.admits(self.state, vertex) for rule in self.rules):
+            return False
+        if self.fallback_rules:
+            extended = self.state.walk + [vertex]
+            return all(rule.apply(self.state.graph, extended) for rule in self.fallback_rules)
+        return True
+
+    def rejecting_rule(self, vertex):
+        """
+        The first rule that does not allow vertex next, or None.
+        """
+        vertex = int(vertex)
+        for rule in self.rules:
+            if not rule.admits(self.state, vertex):
+                return rule
+        if self.fallback_rules:
+            extended = self.state.walk + [vertex]
+            for rule in self.fallback_rules:
+                if not rule.apply(self.state.graph, extended):
+                    return rule
+        return None
+
+    def push(self, vertex):
+        vertex = int(vertex)
+        self.state.begin()
+        for rule in self.rules:
+            rule.advance(self.state, vertex)
+        self.state.walk.append(vertex)
+
+    def pop(self):
+        return self.state.rollback()
+
+    def reset(self, walk=()):
+        self.state = WalkState(self.state.graph)
+        for vertex in walk:
+            self.push(vertex)
+
+
 class Rule(ABC):
     @abstractmethod
     def apply(self, walk, graph):
@@ -109,6 +227,134 @@ class Rule(ABC):
         """
         pass
 
+    def admits(self, state, vertex):
+        """
+        Check in O(1) whether vertex may be appended to a walk in the given WalkState.
+        """
+        return True
+
+    def advance(self, state, vertex):
+        """
+        Record the constraints vertex places on the rest of the walk in the WalkState.
+        """
+        pass
+
+    def prepare(self, graph):
+        """
+        Function ``(walks, valid) -> violation_mask(graph, walks, valid)``
+        for checking many batches against the same graph, with whatever the
+        rule needs (lookup tables, a CSR copy of the graph) built once.
+        """
+        return lambda walks, valid: self.violation_mask(graph, walks, valid)
+
+    def check_batch(self, graph, walks, lengths):
+        """
+        Check a whole batch of walks at once.
+
+        :param walks: int array of shape (num_walks, max_length); entries past
+            each walk's length are padding and ignored
+        :param lengths: number of vertices in every walk
+        :return: (passed, first_violation) where passed is a boolean array and
+            first_violation the index of the first vertex that breaks the rule
+            (-1 for walks that pass)
+        """
+        walks = np.asarray(walks, dtype=np.int64)
+        valid = np.arange(walks.shape[1]) < np.asarray(lengths)[:, None]
+        broken = self.violation_mask(graph, walks, valid)
+        passed = ~broken.any(axis=1)
+        return passed, np.where(passed, -1, np.argmax(broken, axis=1))
+
+    def violation_mask(self, graph, walks, valid):
+        """
+        Boolean mask of the walk positions whose vertex breaks the rule given
+        the vertices before it. Rules without a vectorized form fall back to
+        calling ``apply`` on growing prefixes and only mark the first one.
+        """
+        broken = np.zeros(walks.shape, dtype=bool)
+        for row, walk in enumerate(walks):
+            walk = walk[valid[row]].tolist()
+            for j in range(len(walk)):
+                if not self.apply(graph, walk[:j + 1]):
+                    broken[row, j] = True
+                    break
+        return broken
+
+
+def _lookup_table(vertices, values=None):
+    """
+    Dense array indexed by vertex: the vertex's value (True by default) for
+    rule vertices and 0 elsewhere.
+    """
+    vertices = np.fromiter((int(v) for v in vertices), dtype=np.int64)
+    table = np.zeros(int(vertices.max()) + 1 if len(vertices) else 0,
+                     dtype=bool if values is None else np.int64)
+    table[vertices] = True if values is None else np.fromiter((int(k) for k in values), dtype=np.int64)
+    return table
+
+
+def _lookup(table, walks, valid):
+    """
+    Look up every valid walk position in a table built by _lookup_table.
+    """
+    inside = valid & (walks >= 0) & (walks < len(table))
+    found = np.zeros(walks.shape, dtype=table.dtype)
+    found[inside] = table[walks[inside]]
+    return found
+
+
+def _shift_right(values, fill):
+    """
+    values[:, j - 1] at column j, i.e. what is known before each position.
+    """
+    shifted = np.empty_like(values)
+    shifted[:, :1] = fill
+    shifted[:, 1:] = values[:, :-1]
+    return shifted
+
+
+def _ascender_violations(walks, valid, marked):
+    """
+    Positions below the running maximum of the marked (ascender) vertices before them.
+    """
+    values = np.where(marked, walks, -1)
+    lower = _shift_right(np.maximum.accumulate(values, axis=1), -1)
+    return valid & (walks < lower)
+
+
+def _descender_violations(walks, valid, marked):
+    """
+    Positions above the running minimum of the marked (descender) vertices before them.
+    """
+    unbounded = np.iinfo(np.int64).max
+    values = np.where(marked, walks, unbounded)
+    upper = _shift_right(np.minimum.accumulate(values, axis=1), unbounded)
+    return valid & (walks > upper)
+
+
+def _parity_violations(walks, valid, marked, parity):
+    """
+    Positions of the wrong parity after a marked (even or odd) vertex.
+    """
+    seen = _shift_right(np.logical_or.accumulate(marked, axis=1), False)
+    return valid & seen & (walks % 2 != parity)
+
+
+def _repeater_violations(walks, periods):
+    """
+    Positions revisiting a repeater (non-zero period) other than exactly its
+    period after the previous visit.
+    """
+    rows, cols = np.nonzero(periods)
+    vertices = walks[rows, cols]
+    # Consecutive visits of the same repeater within a walk must be k apart
+    order = np.lexsort((cols, vertices, rows))
+    rows, cols, vertices = rows[order], cols[order], vertices[order]
+    repeat = (rows[1:] == rows[:-1]) & (vertices[1:] == vertices[:-1])
+    bad = repeat & (cols[1:] - cols[:-1] != periods[rows[1:], cols[1:]])
+    broken = np.zeros(walks.shape, dtype=bool)
+    broken[rows[1:][bad], cols[1:][bad]] = True
+    return broken
+
 class AscenderRule(Rule):
     def __init__(self, ascenders):
         self.ascenders = ascenders
@@ -127,6 +373,20 @@ class AscenderRule(Rule):
                 return i+1
         return None
 
+    def admits(self, state, vertex):
+        return state.lower is None or vertex >= state.lower
+
+    def advance(self, state, vertex):
+        if vertex in self.ascenders:
+            state.raise_lower(vertex)
+
+    def violation_mask(self, graph, walks, valid):
+        return self.prepare(graph)(walks, valid)
+
+    def prepare(self, graph):
+        table = _lookup_table(self.ascenders)
+        return lambda walks, valid: _ascender_violations(walks, valid, _lookup(table, walks, valid))
+
 class DescenderRule(Rule):
     def __init__(self, descenders):
         self.descenders = descenders
@@ -145,6 +405,20 @@ class DescenderRule(Rule):
                 return i+1
         return None
 
+    def admits(self, state, vertex):
+        return state.upper is None or vertex <= state.upper
+
+    def advance(self, state, vertex):
+        if vertex in self.descenders:
+            state.reduce_upper(vertex)
+
+    def violation_mask(self, graph, walks, valid):
+        return self.prepare(graph)(walks, valid)
+
+    def prepare(self, graph):
+        table = _lookup_table(self.descenders)
+        return lambda walks, valid: _descender_violations(walks, valid, _lookup(table, walks, valid))
+
 class EvenRule(Rule):
     def __init__(self, evens):
         self.evens = evens
@@ -163,6 +437,20 @@ class EvenRule(Rule):
                 return i+1
         return None
 
+    def admits(self, state, vertex):
+        return state.parity is None or vertex % 2 == state.parity
+
+    def advance(self, state, vertex):
+        if vertex in self.evens:
+            state.lock_parity(0)
+
+    def violation_mask(self, graph, walks, valid):
+        return self.prepare(graph)(walks, valid)
+
+    def prepare(self, graph):
+        table = _lookup_table(self.evens)
+        return lambda walks, valid: _parity_violations(walks, valid, _lookup(table, walks, valid), 0)
+
 class OddRule(Rule):
     def __init__(self, odds):
         self.odds = odds
@@ -181,6 +469,20 @@ class OddRule(Rule):
                 return i+1
         return None
 
+    def admits(self, state, vertex):
+        return state.parity is None or vertex % 2 == state.parity
+
+    def advance(self, state, vertex):
+        if vertex in self.odds:
+            state.lock_parity(1)
+
+    def violation_mask(self, graph, walks, valid):
+        return self.prepare(graph)(walks, valid)
+
+    def prepare(self, graph):
+        table = _lookup_table(self.odds)
+        return lambda walks, valid: _parity_violations(walks, valid, _lookup(table, walks, valid), 1)
+
 class EdgeExistenceRule(Rule):
     def apply(self, walk, graph):
         for i in range(len(walk) - 1):
@@ -188,6 +490,22 @@ class EdgeExistenceRule(Rule):
                 return False
         return True
 
+    def admits(self, state, vertex):
+        return state.graph is None or not state.walk or state.graph.has_edge(state.walk[-1], vertex)
+
+    def violation_mask(self, graph, walks, valid):
+        return self.prepare(graph)(walks, valid)
+
+    def prepare(self, graph):
+        # The CSR copy of a networkx graph keeps its edge keys between calls
+        graph = as_csr(graph)
+
+        def violation_mask(walks, valid):
+            broken = np.zeros(walks.shape, dtype=bool)
+            broken[:, 1:] = valid[:, 1:] & ~graph.has_edges(walks[:, :-1], walks[:, 1:])
+            return broken
+        return violation_mask
+
 class RepeaterRule(Rule):
     def __init__(self, repeaters):
         self.repeaters = repeaters
@@ -211,3 +529,69 @@ class RepeaterRule(Rule):
                         return indices[i+1]
         return None
 
+    def admits(self, state, vertex):
+        due = state.due.get(vertex)
+        return due is None or due == state.length
+
+    def advance(self, state, vertex):
+        if vertex in self.repeaters:
+            state.set_due(vertex, state.length + self.repeaters[vertex])
+
+    def violation_mask(self, graph, walks, valid):
+        return self.prepare(graph)(walks, valid)
+
+    def prepare(self, graph):
+        table = _lookup_table(self.repeaters, self.repeaters.values())
+        return lambda walks, valid: _repeater_violations(walks, _lookup(table, walks, valid))
+
+
+class ViolationProfiler:
+    """
+    violation_profile for many walks checked against the same graph and
+    rules: every rule is prepared once (lookup tables built, the graph
+    converted to CSR for edge existence), so each further walk or batch
+    costs one linear pass per rule.
+    """
+    def __init__(self, graph, rules):
+        self.rules = tuple(rules)
+        self._masks = [rule.prepare(graph) for rule in self.rules]
+
+    def profile(self, walks, lengths):
+        """
+        Which rules the vertex at every position of a batch of walks breaks,
+        given the vertices before it. Rules without a vectorized form only
+        mark their first violation.
+
+        :param walks: int array of shape (num_walks, max_length), padded past
+            each walk's length
+        :param lengths: number of vertices in every walk
+        :return: (broken, first_violation) where broken is a boolean array of
+            shape (num_rules, num_walks, max_length) and first_violation the
+            position at which each rule is first broken in each walk (-1 if never)
+        """
+        walks = np.asarray(walks, dtype=np.int64)
+        valid = np.arange(walks.shape[1]) < np.asarray(lengths)[:, None]
+        broken = np.zeros((len(self.rules),) + walks.shape, dtype=bool)
+        for r, mask in enumerate(self._masks):
+            broken[r] = mask(walks, valid)
+        first_violation = np.full(broken.shape[:2], -1, dtype=np.int64)
+        if walks.shape[1]:
+            first_violation = np.where(broken.any(axis=2), np.argmax(broken, axis=2), -1)
+        return broken, first_violation
+
+    def walk_profile(self, walk):
+        """
+        profile of a single walk: (broken of shape (num_rules, len(walk)),
+        first_violation of every rule).
+        """
+        walk = np.asarray(walk, dtype=np.int64)
+        broken, first_violation = self.profile(walk[None], [len(walk)])
+        return broken[:, 0], first_violation[:, 0]
+
+
+def violation_profile(graph, walks, lengths, rules):
+    """
+    One-off ViolationProfiler(graph, rules).profile(walks, lengths); use a
+    ViolationProfiler to check further walks without preparing the rules again.
+    """
+    return ViolationProfiler(graph, rules).profile(walks, lengths)
@@ -0,0 +1,108 @@
+import bisect
+import numpy as np
+
+
+class AliasTable:
+    """
+    Walker alias tables for the out-edges of every vertex of a CSR graph.
+
+    Edge ``e`` of vertex ``v`` keeps its own slot with probability
+    ``accept[e]`` and otherwise hands over to edge ``alias[e]`` of the same
+    vertex, so a neighbour is drawn in O(1) with a single uniform number.
+    Rows whose probabilities are all zero are treated as uniform.
+    """
+    def __init__(self, indptr, indices, probability):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices)
+        self.probability = np.asarray(probability, dtype=np.float64)
+        self.accept, self.alias = _build_alias(self.indptr, self.probability)
+
+    def sample(self, vertex, rng):
+        """
+        Draw an out-neighbour of vertex from its edge distribution, or None
+        for vertices without out-edges.
+        """
+        start = int(self.indptr[vertex])
+        degree = int(self.indptr[vertex + 1]) - start
+        if degree == 0:
+            return None
+        draw = rng.random() * degree
+        slot = min(int(draw), degree - 1)
+        edge = start + slot
+        if draw - slot >= self.accept[edge]:
+            edge = int(self.alias[edge])
+        return int(self.indices[edge])
+
+    def sample_admitted(self, vertex, admits, rng, max_rejections=8):
+        """
+        Draw an out-neighbour for which ``admits(neighbour)`` holds, with the
+        edge distribution renormalized over the admitted neighbours.
+
+        Draws from the alias table are rejected until one is admitted; after
+        ``max_rejections`` misses the admitted subset is built explicitly and
+        sampled from its cumulative weights. Returns None when no neighbour
+        is admitted.
+        """
+        for _ in range(max_rejections):
+            neighbor = self.sample(vertex, rng)
+            if neighbor is None:
+                return None
+            if admits(neighbor):
+                return neighbor
+
+        neighbors = []
+        weights = []
+        for edge in range(int(self.indptr[vertex]), int(self.indptr[vertex + 1])):
+            neighbor = int(self.indices[edge])
+            if admits(neighbor):
+                neighbors.append(neighbor)
+                weights.append(self.probability[edge])
+        if not neighbors:
+            return None
+        return choose_weighted(neighbors, weights, rng)
+
+
+def choose_weighted(options, weights, rng):
+    """
+    Pick one of options with probability proportional to its weight, or
+    uniformly if all weights are zero.
+    """
+    cumulative = np.cumsum(weights).tolist()
+    if not cumulative or cumulative[-1] <= 0:
+        return rng.choice(options)
+    i = bisect.bisect_right(cumulative, rng.random() * cumulative[-1])
+    return options[min(i, len(options) - 1)]
+
+
+def _build_alias(indptr, probability):
+    degrees = np.diff(indptr)
+    rows = np.repeat(np.arange(len(degrees)), degrees)
+    totals = np.bincount(rows, weights=probability, minlength=len(degrees))
+
+    # Scale every row to mean 1; rows without weight become uniform
+    scaled = np.ones(len(probability))
+    weighted = totals[rows] > 0
+    scaled[weighted] = probability[weighted] * degrees[rows[weighted]] / totals[rows[weighted]]
+
+    accept = np.ones(len(probability))
+    alias = np.arange(len(probability), dtype=np.int64)
+    uneven = np.flatnonzero((degrees > 1) & (totals > 0))
+    for v in uneven:
+        start, end = int(indptr[v]), int(indptr[v + 1])
+        row = scaled[start:end].tolist()
+        if max(row) - min(row) < 1e-12:
+            continue
+        small = [e for e, p in enumerate(row) if p < 1.0]
+        large = [e for e, p in enumerate(row) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large[-1]
+            accept[start + s] = row[s]
+            alias[start + s] = start + l
+            row[l] -= 1.0 - row[s]
+            if row[l] < 1.0:
+                small.append(large.pop())
+        # Whatever is left over is 1 up to rounding
+        for e in small + large:
+            accept[start + e] = 1.0
+    return accept, alias
@@ -0,0 +1,136 @@
+import json
+import struct
+import networkx as nx
+import numpy as np
+from .csr import CSRGraph, as_csr
+from .rules import AscenderRule, DescenderRule, EvenRule, OddRule, RepeaterRule, EdgeExistenceRule
+from .rule_index import RuleIndex
+
+MAGIC = b'GVGRAPH\0'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# Rule classes stored by name, with the attribute holding their vertices
+_RULE_VERTICES = {
+    'AscenderRule': (AscenderRule, 'ascenders'),
+    'DescenderRule': (DescenderRule, 'descenders'),
+    'EvenRule': (EvenRule, 'evens'),
+    'OddRule': (OddRule, 'odds'),
+}
+
+
+def write_graph_file(path, graph, rules=()):
+    """
+    Write a graph and its rules to a single binary file.
+
+    The file starts with a magic string, the format version and the length
+    of a JSON header describing every array (dtype, shape, byte offset) and
+    the rules. The arrays follow, each aligned to 64 bytes, so they can be
+    memory-mapped in place: the CSR ``indptr``, ``indices`` and
+    ``probability`` arrays and the vertices (plus repeater steps) of each rule.
+    A RuleIndex is stored as its per-vertex ``rule_type`` and ``rule_param``
+    arrays.
+    """
+    graph = as_csr(graph)
+    arrays = {'indptr': graph.indptr, 'indices': graph.indices, 'probability': graph.probability}
+    rule_entries = []
+    for i, rule in enumerate(rules):
+        name = type(rule).__name__
+        entry = {'type': name}
+        if name in _RULE_VERTICES:
+            vertices = getattr(rule, _RULE_VERTICES[name][1])
+            entry['vertices'] = f'rule{i}_vertices'
+            arrays[entry['vertices']] = np.array(sorted(int(v) for v in vertices), dtype=np.int64)
+        elif isinstance(rule, RepeaterRule):
+            items = sorted((int(v), int(k)) for v, k in rule.repeaters.items())
+            entry['vertices'] = f'rule{i}_vertices'
+            entry['steps'] = f'rule{i}_steps'
+            arrays[entry['vertices']] = np.array([v for v, _ in items], dtype=np.int64)
+            arrays[entry['steps']] = np.array([k for _, k in items], dtype=np.int64)
+        elif isinstance(rule, RuleIndex):
+            entry['rule_type'] = f'rule{i}_type'
+            entry['rule_param'] = f'rule{i}_param'
+            arrays[entry['rule_type']] = rule.rule_type
+            arrays[entry['rule_param']] = rule.rule_param
+        elif not isinstance(rule, EdgeExistenceRule):
+            raise ValueError(f"Cannot store rules of type {name}")
+        rule_entries.append(entry)
+
+    header = {'num_nodes': graph.number_of_nodes(), 'arrays': {}, 'rules': rule_entries}
+    # Offsets depend on the header size, which depends on the offsets; lay the
+    # arrays out relative to the data section and fix the start afterwards.
+    offset = 0
+    for name, array in arrays.items():
+        header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _align(offset + array.nbytes)
+    encoded = json.dumps(header).encode('utf-8')
+    data_start = _align(len(MAGIC) + 8 + len(encoded))
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<II', FORMAT_VERSION, len(encoded)))
+        f.write(encoded)
+        for name, array in arrays.items():
+            f.seek(data_start + header['arrays'][name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(data_start + offset)
+
+
+def read_graph_file(path, mmap=False):
+    """
+    Read a file written by write_graph_file.
+
+    :param mmap: memory-map the arrays read-only instead of reading them
+    :return: (CSRGraph, tuple of rules)
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a graphverse graph file")
+        version, header_length = struct.unpack('<II', f.read(8))
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported graph file version {version}")
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    data_start = _align(len(MAGIC) + 8 + header_length)
+
+    def array(name):
+        spec = header['arrays'][name]
+        dtype = np.dtype(spec['dtype'])
+        shape = tuple(spec['shape'])
+        offset = data_start + spec['offset']
+        if mmap and int(np.prod(shape)):
+            return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+        return np.fromfile(path, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape)
+
+    graph = CSRGraph(array('indptr'), array('indices'), array('probability'))
+    rules = []
+    for entry in header['rules']:
+        name = entry['type']
+        if name in _RULE_VERTICES:
+            rules.append(_RULE_VERTICES[name][0](set(array(entry['vertices']).tolist())))
+        elif name == 'RepeaterRule':
+            vertices = array(entry['vertices']).tolist()
+            steps = array(entry['steps']).tolist()
+            rules.append(RepeaterRule(dict(zip(vertices, steps))))
+        elif name == 'RuleIndex':
+            rules.append(RuleIndex(array(entry['rule_type']), array(entry['rule_param'])))
+        else:
+            rules.append(EdgeExistenceRule())
+    return graph, tuple(rules)
+
+
+def is_graph_file(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def read_gml_graph(path):
+    """
+    Read a graph saved in the old GML format with its node labels restored
+    to integers.
+    """
+    G = nx.read_gml(path)
+    return nx.relabel_nodes(G, {v: int(v) for v in G.nodes})
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
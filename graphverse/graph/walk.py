@@ -1,77 +1,199 @@
+import logging
 import random
-from .rules import Rule
+from .csr import CSRGraph
+from .rules import Rule, RuleChecker
+from .sampling import choose_weighted
+from .parallel import map_walk_tasks, spawn_seeds
+
+WALK_CHUNK_SIZE = 256
+
+logger = logging.getLogger(__name__)
 
 def check_rule_compliance(graph, walk, rules):
     return all(rule.apply(graph, walk) for rule in rules)
 
-def generate_valid_walk(graph, start_vertex, min_length, max_length, rules, max_attempts=10):
+def generate_valid_walk(graph, start_vertex, min_length, max_length, rules, max_attempts=10, rng=None,
+                        metrics=None):
     """
     Generate a walk that satisfies all rules.
     The walk length will be between min_length and max_length, 
     or shorter if a dead-end is reached while satisfying rules.
+    Next vertices follow the edge ``probability`` distribution, renormalized
+    over the neighbours the rules allow.
+    Randomness comes from rng (a random.Random) or the random module.
+    Steps, backtracks, restarts and rejected neighbours are counted in
+    metrics (a WalkMetrics) when given.
     """
-    target_length = random.randint(min_length, max_length)
+    rng = random if rng is None else rng
+    target_length = rng.randint(min_length, max_length)
     walk = [start_vertex]
+    checker = RuleChecker(rules, walk, graph=graph)
+    admits = checker.allows if metrics is None else metrics.admits(checker)
     attempts = 0
-    
-    print(f"Starting walk from node {start_vertex}")
-    
+
+    logger.debug("Starting walk from node %s", start_vertex)
+
     while len(walk) < target_length:
         if not walk:
             # If the walk becomes empty, restart from the starting vertex
             walk = [start_vertex]
+            checker.reset(walk)
             attempts = 0
+            if metrics is not None:
+                metrics.count('restarts')
             continue
 
-        valid_neighbors = [
-            neighbor for neighbor in graph.neighbors(walk[-1])
-            if check_rule_compliance(graph, walk + [neighbor], rules)
-        ]
-        
-        if not valid_neighbors:
-            print(f"No valid neighbors found for node {walk[-1]}")
+        next_vertex = _sample_neighbor(graph, walk[-1], admits, rng)
+
+        if next_vertex is None:
+            logger.debug("No valid neighbors found for node %s", walk[-1])
             attempts += 1
-            
+            if metrics is not None:
+                metrics.count('dead_ends')
+
             if attempts >= max_attempts:
-                print(f"Maximum attempts reached. Restarting walk from node {start_vertex}")
+                logger.debug("Maximum attempts reached. Restarting walk from node %s", start_vertex)
                 walk = [start_vertex]
+                checker.reset(walk)
                 attempts = 0
+                if metrics is not None:
+                    metrics.count('restarts')
             else:
                 # Backtrack to the previous vertex and try again
                 walk.pop()
+                checker.pop()
+                if metrics is not None:
+                    metrics.count('backtracks')
         else:
-            next_vertex = random.choice(valid_neighbors)
             walk.append(next_vertex)
-    
+            checker.push(next_vertex)
+            if metrics is not None:
+                metrics.count('steps')
+
     if len(walk) >= min_length:
-        print(f"Valid walk generated: {walk}")
+        logger.debug("Valid walk generated from node %s with %d vertices", start_vertex, len(walk))
         return walk
     else:
-        print(f"Failed to generate a valid walk from node {start_vertex}")
+        logger.debug("Failed to generate a valid walk from node %s", start_vertex)
+        return None
+
+def _sample_neighbor(graph, vertex, admits, rng):
+    """
+    Draw a neighbour of vertex for which admits(neighbour) holds, weighted by
+    edge probability. CSR graphs use their cached alias table; networkx graphs
+    read the ``probability`` edge attributes (1 when missing).
+    """
+    if isinstance(graph, CSRGraph):
+        return graph.alias_table().sample_admitted(vertex, admits, rng)
+    neighbors = []
+    weights = []
+    for neighbor, data in graph[vertex].items():
+        if admits(neighbor):
+            neighbors.append(int(neighbor))
+            weights.append(data.get('probability', 1.0))
+    if not neighbors:
         return None
+    return choose_weighted(neighbors, weights, rng)
 
-def generate_multiple_walks(graph, num_walks, min_length, max_length, rules):
+def generate_multiple_walks(graph, num_walks, min_length, max_length, rules, workers=None, seed=None, rng=None,
+                            metrics=None):
     """
     Generate multiple valid walks for training data.
     Includes walks that reach dead-ends while satisfying rules.
+
+    With ``workers`` set, the walks are generated in fixed-size chunks, each
+    with its own RNG stream derived from ``seed``, and the chunks are spread
+    over that many processes. The same seed gives the same walks for any
+    number of workers.
+
+    ``metrics`` (a WalkMetrics) collects per-step counters and walk lengths;
+    with workers, only the walks that come back are recorded.
     """
+    if workers is not None:
+        chunks = iter_multiple_walk_chunks(graph, num_walks, min_length, max_length, rules, workers, seed)
+        return _collect_chunks(chunks, metrics)
+
+    rng = random if rng is None else rng
+    nodes = list(graph.nodes)
     walks = []
     attempts = 0
     max_attempts = 10  # Arbitrary limit to prevent infinite loops
-    
+
     while len(walks) < num_walks:
-        print(f"On walk {len(walks)} out of {num_walks}")
-        start_vertex = random.choice(list(graph.nodes))
-        walk = generate_valid_walk(graph, start_vertex, min_length, max_length, rules)
-        
+        logger.debug("On walk %d out of %d", len(walks), num_walks)
+        start_vertex = rng.choice(nodes)
+        walk = generate_valid_walk(graph, start_vertex, min_length, max_length, rules, rng=rng, metrics=metrics)
+        if metrics is not None:
+            metrics.record_walk(walk)
+
         if walk:
             walks.append(walk)
             attempts = 0  # Reset attempts counter on successful walk generation
         else:
             attempts += 1
-            
+
             if attempts >= max_attempts:
-                print(f"Maximum attempts reached for vertex {start_vertex}. Moving to a new starting vertex.")
+                logger.debug("Maximum attempts reached for vertex %s. Moving to a new starting vertex.",
+                             start_vertex)
                 attempts = 0  # Reset attempts counter for the new starting vertex
-    
-    return walks
\ No newline at end of file
+
+    return walks
+
+def generate_per_node_walks(graph, min_length, max_length, rules, workers=None, seed=None, rng=None,
+                            metrics=None):
+    """
+    Generate one valid walk starting from each node in the graph, skipping
+    nodes from which no valid walk was found. ``workers``, ``seed`` and
+    ``metrics`` behave as in generate_multiple_walks.
+    """
+    if workers is not None:
+        chunks = iter_per_node_walk_chunks(graph, min_length, max_length, rules, workers, seed)
+        return _collect_chunks(chunks, metrics)
+
+    per_node_walks = []
+    for node in graph.nodes:
+        logger.debug("Generating a walk starting from node %s", node)
+        valid_walk = generate_valid_walk(graph, node, min_length, max_length, rules, rng=rng, metrics=metrics)
+        if metrics is not None:
+            metrics.record_walk(valid_walk)
+        if valid_walk:
+            per_node_walks.append(valid_walk)
+    return per_node_walks
+
+def _collect_chunks(chunks, metrics):
+    walks = []
+    for chunk in chunks:
+        if metrics is not None:
+            metrics.record_walks(chunk)
+        walks.extend(chunk)
+    return walks
+
+def iter_multiple_walk_chunks(graph, num_walks, min_length, max_length, rules, workers=1, seed=None):
+    """
+    Yield the walks of generate_multiple_walks(workers=...) one chunk at a
+    time, so callers can consume them before the whole corpus exists.
+    """
+    chunk_sizes = [min(WALK_CHUNK_SIZE, num_walks - i) for i in range(0, num_walks, WALK_CHUNK_SIZE)]
+    tasks = [(size, chunk_seed, min_length, max_length)
+             for size, chunk_seed in zip(chunk_sizes, spawn_seeds(seed, len(chunk_sizes)))]
+    return map_walk_tasks(graph, rules, _random_walk_chunk, tasks, workers)
+
+def iter_per_node_walk_chunks(graph, min_length, max_length, rules, workers=1, seed=None):
+    """
+    Yield the walks of generate_per_node_walks(workers=...) one chunk at a time.
+    """
+    nodes = list(graph.nodes)
+    chunks = [nodes[i:i + WALK_CHUNK_SIZE] for i in range(0, len(nodes), WALK_CHUNK_SIZE)]
+    tasks = [(chunk, chunk_seed, min_length, max_length)
+             for chunk, chunk_seed in zip(chunks, spawn_seeds(seed, len(chunks)))]
+    return map_walk_tasks(graph, rules, _per_node_walk_chunk, tasks, workers)
+
+def _random_walk_chunk(graph, rules, task):
+    num_walks, seed, min_length, max_length = task
+    return generate_multiple_walks(graph, num_walks, min_length, max_length, rules, rng=random.Random(seed))
+
+def _per_node_walk_chunk(graph, rules, task):
+    nodes, seed, min_length, max_length = task
+    rng = random.Random(seed)
+    walks = (generate_valid_walk(graph, node, min_length, max_length, rules, rng=rng) for node in nodes)
+    return [walk for walk in walks if walk]
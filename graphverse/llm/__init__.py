@@ -1,4 +1,4 @@
-from .model import WalkTransformer
+from .model import WalkTransformer, KVCache
 from .training import train_model
 from .token_generation import seed_walk
-from .evaluation import evaluate_model, count_rule_violations
\ No newline at end of file
+from .evaluation import evaluate_model, evaluate_model_batched, count_rule_violations, walk_violation_profile
\ No newline at end of file
@@ -0,0 +1,51 @@
+import os
+import socket
+import tempfile
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from .model import WalkTransformer
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def launch_training(training_data, vocab, epochs, batch_size, learning_rate, device, world_size, history, options):
+    """
+    Run train_model in ``world_size`` local processes joined by a gloo
+    process group and return the trained model, rebuilt in this process
+    from rank 0's weights.
+    """
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        result_path = os.path.join(tmp, 'result.pt')
+        mp.spawn(_worker, nprocs=world_size, join=True,
+                 args=(world_size, port, result_path, training_data, vocab, epochs, batch_size, learning_rate,
+                       device, options))
+        result = torch.load(result_path, weights_only=False)
+    if history is not None:
+        history.extend(result['history'])
+    model = WalkTransformer(len(vocab), **result['config'])
+    model.load_state_dict(result['model'])
+    return model.to(device)
+
+
+def _worker(rank, world_size, port, result_path, training_data, vocab, epochs, batch_size, learning_rate,
+            device, options):
+    from .training import _train
+    os.environ['MASTER_ADDR'] = '127.0.0.1'
+    os.environ['MASTER_PORT'] = str(port)
+    dist.init_process_group('gloo', rank=rank, world_size=world_size)
+    try:
+        history = []
+        model = _train(training_data, vocab, epochs, batch_size, learning_rate, device, history=history,
+                       rank=rank, world_size=world_size, **options)
+        if rank == 0:
+            config = {key: options[key] for key in ('d_model', 'nhead', 'num_layers', 'dim_feedforward',
+                                                    'causal', 'dropout', 'positional', 'max_len')}
+            torch.save({'model': model.cpu().state_dict(), 'config': config, 'history': history}, result_path)
+    finally:
+        dist.destroy_process_group()
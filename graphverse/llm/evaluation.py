@@ -1,58 +1,245 @@
-from ..graph.walk import check_rule_compliance, generate_valid_walk
+from ..graph.walk import generate_valid_walk
+from ..graph.rules import ViolationProfiler, violation_profile
+from ..graph.batch_walk import generate_walk_batch
+from ..graph.csr import as_csr
 
 import random
+import numpy as np
 import torch
 
 
-def evaluate_model(model, graph, vocab, num_samples, min_start_length, max_start_length, rules):
+# Why decoding of a sample stopped, recorded as its 'stop_reason'
+STOP_REASONS = ('end', 'pad', 'start', 'unknown_vertex', 'invalid_edge', 'max_new_tokens')
+_INVALID_EDGE = STOP_REASONS.index('invalid_edge')
+_MAX_NEW_TOKENS = STOP_REASONS.index('max_new_tokens')
+
+
+def evaluate_model(model, graph, vocab, num_samples, min_start_length, max_start_length, rules,
+                   max_new_tokens=100):
+    """
+    Extend ``num_samples`` rule-compliant prompts greedily with the model
+    and check the generated walks against the rules.
+
+    At most ``max_new_tokens`` vertices are added to each prompt, so time
+    and memory per sample are bounded. Decoding stops early when the model
+    predicts <END>, <PAD> or <START>, a vertex outside the graph, or a
+    vertex that is not an out-neighbour of the current one; that token is
+    not added. Every record's ``stop_reason`` is one of STOP_REASONS.
+    """
     model.eval()
+    device = next(model.parameters()).device
+    nodes = list(graph.nodes)
+    token_vertex = _token_vertices(vocab, graph)
+    stop_codes = _stop_codes(vocab, token_vertex)
 
     evaluation_results = []
 
     for _ in range(num_samples):
         start_length = random.randint(min_start_length, max_start_length)
-        start_walk = generate_valid_walk(graph, random.choice(
-            list(graph.nodes)), start_length, start_length, rules)
+        start_walk = generate_valid_walk(graph, random.choice(nodes), start_length, start_length, rules)
 
-        input_tensor = torch.tensor([vocab.token2idx[str(node)]
-                                    for node in start_walk], dtype=torch.long).unsqueeze(0)
+        input_tensor = torch.as_tensor(vocab.encode(start_walk), device=device).unsqueeze(0)
 
         generated_walk = start_walk[:]
-        current_vertex = start_walk[-1]
-
-        while current_vertex in graph.nodes:
-            logits = model(input_tensor)
-            next_vertex_idx = torch.argmax(logits[0, -1]).item()
-            next_vertex = int(vocab.idx2token[next_vertex_idx])
-
-            generated_walk.append(next_vertex)
-            input_tensor = torch.cat((input_tensor, torch.tensor(
-                [[next_vertex_idx]], dtype=torch.long)), dim=1)
+        stop_reason = None
 
-            current_vertex = next_vertex
+        with torch.no_grad():
+            # Decode incrementally: after the prompt only the newest token is fed
+            logits, cache = model.forward_incremental(input_tensor)
+            for step in range(max_new_tokens):
+                next_vertex_idx = torch.argmax(logits[0, -1]).item()
+                next_vertex = int(token_vertex[next_vertex_idx])
+                if next_vertex < 0:
+                    stop_reason = STOP_REASONS[stop_codes[next_vertex_idx]]
+                    break
+                if not graph.has_edge(generated_walk[-1], next_vertex):
+                    stop_reason = STOP_REASONS[_INVALID_EDGE]
+                    break
 
-        rule_violations = []
-        for i, rule in enumerate(rules, start=1):
-            if not rule.is_satisfied_by(graph, generated_walk):
-                violation_info = {
-                    'rule_type': type(rule).__name__,
-                    'walk_length': len(generated_walk),
-                    'violation_position': rule.get_violation_position(graph, generated_walk)
-                }
-                rule_violations.append(violation_info)
+                generated_walk.append(next_vertex)
+                if step + 1 < max_new_tokens:
+                    logits, cache = model.forward_incremental(torch.tensor(
+                        [[next_vertex_idx]], dtype=torch.long, device=device), cache)
 
         evaluation_results.append({
             'start_walk': start_walk,
             'generated_walk': generated_walk,
-            'rule_violations': rule_violations
+            'stop_reason': stop_reason or STOP_REASONS[_MAX_NEW_TOKENS],
         })
 
+    _add_rule_violations(evaluation_results, graph, rules)
+    return evaluation_results
+
+
+def evaluate_model_batched(model, graph, vocab, num_samples, min_start_length, max_start_length, rules,
+                           batch_size=64, max_new_tokens=100, seed=None):
+    """
+    Batched version of evaluate_model that decodes ``batch_size`` prompts at
+    a time.
+
+    Prompts of different lengths are left-padded and decoded greedily
+    together with a KV cache. A row stops for the same reasons as in
+    evaluate_model, with edges checked on the model's device; finished rows
+    are fed padding until the whole batch is done. Rules are checked once
+    decoding has finished.
+
+    :return: the same list of records as evaluate_model
+    """
+    model.eval()
+    device = next(model.parameters()).device
+    pad_idx = vocab.pad_idx
+
+    token_vertex = torch.from_numpy(_token_vertices(vocab, graph)).to(device)
+    csr = as_csr(graph)
+    edge_keys = (torch.from_numpy(csr.edge_keys()).to(device), csr.number_of_nodes())
+
+    starts, start_lengths = generate_walk_batch(graph, num_samples, min_start_length, max_start_length,
+                                                rules, seed=seed)
+
+    evaluation_results = []
+    for offset in range(0, len(starts), batch_size):
+        prompts = [starts[i, :start_lengths[i]].tolist()
+                   for i in range(offset, min(offset + batch_size, len(starts)))]
+        generated, stop_reasons = _decode_batch(model, prompts, vocab, token_vertex, pad_idx, max_new_tokens,
+                                                device, edge_keys)
+
+        for start_walk, new_vertices, stop_reason in zip(prompts, generated, stop_reasons):
+            evaluation_results.append({
+                'start_walk': start_walk,
+                'generated_walk': start_walk + new_vertices,
+                'stop_reason': stop_reason,
+            })
+
+    _add_rule_violations(evaluation_results, graph, rules)
     return evaluation_results
 
 
-def count_rule_violations(walk, graph, rules):
-    violations = 0
-    for i in range(len(walk)):
-        if not check_rule_compliance(walk[:i+1], graph, rules):
-            violations += 1
-    return violations
+def _token_vertices(vocab, graph):
+    """
+    Vertex behind every token id, -1 for tokens that end a walk.
+    """
+    token_vertex = vocab.decode(np.arange(len(vocab)))
+    token_vertex[~np.isin(token_vertex, np.fromiter(graph.nodes, dtype=np.int64))] = -1
+    return token_vertex
+
+
+def _stop_codes(vocab, token_vertex):
+    """
+    Index into STOP_REASONS of why predicting each token id ends a walk
+    (-1 for vertices of the graph), as an array or tensor like token_vertex.
+    """
+    codes = token_vertex * 0 + STOP_REASONS.index('unknown_vertex')
+    codes[token_vertex >= 0] = -1
+    for idx, reason in ((vocab.end_idx, 'end'), (vocab.pad_idx, 'pad'), (vocab.start_idx, 'start')):
+        codes[idx] = STOP_REASONS.index(reason)
+    return codes
+
+
+def _decode_batch(model, prompts, vocab, token_vertex, pad_idx, max_new_tokens, device, edge_keys=None):
+    """
+    Greedily extend left-padded prompts until every row has stopped.
+
+    With ``edge_keys``, a (CSRGraph.edge_keys tensor, number of vertices)
+    pair, rows also stop on a vertex that does not follow an edge.
+
+    :return: (new vertices of every row, stop reason of every row)
+    """
+    width = max(len(prompt) for prompt in prompts)
+    input_tensor = torch.full((len(prompts), width), pad_idx, dtype=torch.long)
+    for row, prompt in enumerate(prompts):
+        input_tensor[row, width - len(prompt):] = torch.from_numpy(vocab.encode(prompt))
+    input_tensor = input_tensor.to(device)
+    padding_mask = torch.arange(width, device=device) < torch.tensor(
+        [width - len(prompt) for prompt in prompts], device=device).unsqueeze(1)
+
+    stop_codes = _stop_codes(vocab, token_vertex)
+    current = torch.tensor([prompt[-1] for prompt in prompts], device=device)
+    reasons = torch.full((len(prompts),), _MAX_NEW_TOKENS, device=device)
+    steps = []
+    running = torch.ones(len(prompts), dtype=torch.bool, device=device)
+    with torch.no_grad():
+        logits, cache = model.forward_incremental(input_tensor, padding_mask=padding_mask)
+        for _ in range(max_new_tokens):
+            next_idx = torch.argmax(logits[:, -1], dim=-1)
+            next_vertex = token_vertex[next_idx]
+            code = stop_codes[next_idx]
+            if edge_keys is not None:
+                invalid = (code < 0) & ~_has_edges(edge_keys, current, next_vertex)
+                code = torch.where(invalid, _INVALID_EDGE, code)
+            stopping = running & (code >= 0)
+            reasons = torch.where(stopping, code, reasons)
+            running &= ~stopping
+            if not running.any():
+                break
+            steps.append(torch.where(running, next_vertex, -1))
+            current = torch.where(running, next_vertex, current)
+            next_idx = torch.where(running, next_idx, pad_idx).unsqueeze(1)
+            logits, cache = model.forward_incremental(next_idx, cache, padding_mask=~running.unsqueeze(1))
+
+    stop_reasons = [STOP_REASONS[code] for code in reasons.tolist()]
+    if not steps:
+        return [[] for _ in prompts], stop_reasons
+    steps = torch.stack(steps, dim=1).cpu().numpy()
+    # A row stays stopped once it stops, so its vertices form a prefix
+    return [row[row >= 0].tolist() for row in steps], stop_reasons
+
+
+def _has_edges(edge_keys, sources, targets):
+    """
+    Tensor counterpart of CSRGraph.has_edges for vertices of the graph.
+    """
+    edge_keys, n = edge_keys
+    keys = sources * n + targets
+    if not len(edge_keys):
+        return torch.zeros(keys.shape, dtype=torch.bool, device=keys.device)
+    i = torch.searchsorted(edge_keys, keys).clamp(max=len(edge_keys) - 1)
+    return edge_keys[i] == keys
+
+
+def _add_rule_violations(evaluation_results, graph, rules):
+    """
+    Check all generated walks against every rule in one batch and attach
+    the list of violated rules to each record. A RuleIndex is checked as
+    its separate rules so violations still name the rule type.
+    """
+    walks = [result['generated_walk'] for result in evaluation_results]
+    lengths = np.array([len(walk) for walk in walks], dtype=np.int64)
+    padded = np.full((len(walks), max(lengths, default=0)), -1, dtype=np.int64)
+    for row, walk in enumerate(walks):
+        padded[row, :len(walk)] = walk
+
+    rules = [part for rule in rules for part in (rule.to_rules() if hasattr(rule, 'to_rules') else (rule,))]
+    _, first_violation = violation_profile(graph, padded, lengths, rules)
+    for row, result in enumerate(evaluation_results):
+        result['rule_violations'] = [{
+            'rule_type': type(rule).__name__,
+            'walk_length': int(lengths[row]),
+            'violation_position': int(first_violation[r, row])
+        } for r, rule in enumerate(rules) if first_violation[r, row] >= 0]
+
+
+def walk_violation_profile(walk, graph, rules, profiler=None):
+    """
+    Violation profile of a single walk in one pass per rule: which rules
+    the vertex at each step breaks and where each rule is first broken.
+    Pass a ViolationProfiler(graph, rules) as ``profiler`` when profiling
+    many walks so the graph and rule tables are prepared only once.
+
+    :return: (broken, first_violation) with broken a boolean array of shape
+        (num_rules, len(walk)) and first_violation the first position that
+        breaks each rule (-1 if none)
+    """
+    if profiler is None:
+        profiler = ViolationProfiler(graph, rules)
+    return profiler.walk_profile(walk)
+
+
+def count_rule_violations(walk, graph, rules, profiler=None):
+    """
+    Number of prefixes of walk that break at least one rule. A rule stays
+    broken once broken, so these are the prefixes that reach the earliest
+    violation. ``profiler`` is reused as in walk_violation_profile.
+    """
+    _, first_violation = walk_violation_profile(walk, graph, rules, profiler)
+    first_violation = first_violation[first_violation >= 0]
+    return len(walk) - int(first_violation.min()) if len(first_violation) else 0
@@ -1,41 +1,233 @@
 import math
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
+from .positional import build_positional
 
-class PositionalEncoding(nn.Module):
-    def __init__(self, d_model, dropout=0.1, max_len=5000):
-        super(PositionalEncoding, self).__init__()
-        self.dropout = nn.Dropout(p=dropout)
+class KVCache:
+    """
+    Attention keys and values of every layer for the tokens decoded so far,
+    used by WalkTransformer.forward_incremental.
+    """
+    def __init__(self, batch_size, device):
+        self.keys = []
+        self.values = []
+        self.padding_mask = torch.zeros((batch_size, 0), dtype=torch.bool, device=device)
+        self.seen = torch.zeros(batch_size, dtype=torch.long, device=device)
+        self.positions = torch.zeros((batch_size, 0), dtype=torch.long, device=device)
+        # Non-causal models cannot reuse keys and values and re-run everything
+        self.tokens = torch.zeros((batch_size, 0), dtype=torch.long, device=device)
 
-        pe = torch.zeros(max_len, d_model)
-        position = torch.arange(0, max_len, dtype=torch.float).unsqueeze(1)
-        div_term = torch.exp(torch.arange(0, d_model, 2).float() * (-math.log(10000.0) / d_model))
-        pe[:, 0::2] = torch.sin(position * div_term)
-        pe[:, 1::2] = torch.cos(position * div_term)
-        pe = pe.unsqueeze(0).transpose(0, 1)
-        self.register_buffer('pe', pe)
+    def __len__(self):
+        return self.padding_mask.size(1)
+
+    def extend(self, padding_mask):
+        """
+        Register new tokens and return their positions; padding tokens do
+        not advance the position of their row.
+        """
+        real = (~padding_mask).long()
+        positions = self.seen[:, None] + real.cumsum(dim=1) - real
+        self.seen = self.seen + real.sum(dim=1)
+        self.padding_mask = torch.cat([self.padding_mask, padding_mask], dim=1)
+        self.positions = torch.cat([self.positions, positions], dim=1)
+        return positions
+
+
+def attention_block_mask(num_queries, num_keys, key_padding_mask=None, causal=True, device=None):
+    """
+    Boolean attention mask, True where attention is blocked, for the last
+    ``num_queries`` of ``num_keys`` tokens. Shape (queries, keys), or
+    (batch, queries, keys) with a key padding mask. Every token may attend to
+    itself, so padding rows never end up fully masked.
+    """
+    query_positions = torch.arange(num_keys - num_queries, num_keys, device=device)
+    key_positions = torch.arange(num_keys, device=device)
+    blocked = torch.zeros((num_queries, num_keys), dtype=torch.bool, device=device)
+    if causal:
+        blocked = key_positions[None, :] > query_positions[:, None]
+    if key_padding_mask is not None:
+        blocked = blocked[None] | key_padding_mask[:, None, :]
+    return blocked & (key_positions[None, :] != query_positions[:, None])
 
-    def forward(self, x):
-        x = x + self.pe[:x.size(0), :]
-        return self.dropout(x)
 
 class WalkTransformer(nn.Module):
-    def __init__(self, vocab_size, d_model, nhead, num_layers, dim_feedforward):
+    """
+    Transformer encoder over walk tokens. With ``causal=True`` (the default,
+    as in train_model) every token only attends to itself and earlier
+    tokens, which is what generation sees and lets forward_incremental reuse
+    cached keys and values.
+
+    ``positional`` picks the position information: 'sinusoidal' or
+    'learned' embeddings, or 'rotary' or 'alibi' attention (see
+    graphverse.llm.positional). ``max_len`` sizes the position table, and
+    should be the longest walk the model is trained on; sinusoidal, rotary
+    and ALiBi positions keep working past it.
+    """
+    def __init__(self, vocab_size, d_model, nhead, num_layers, dim_feedforward, causal=True, dropout=0.1,
+                 positional='sinusoidal', max_len=512):
         super().__init__()
         self.d_model = d_model
+        self.nhead = nhead
+        self.causal = causal
         self.embedding = nn.Embedding(vocab_size, d_model)
-        self.pos_encoder = PositionalEncoding(d_model)
+        self.pos_encoder = build_positional(positional, d_model, nhead, max_len, dropout)
         self.transformer = nn.TransformerEncoder(
-            nn.TransformerEncoderLayer(d_model, nhead, dim_feedforward),
+            nn.TransformerEncoderLayer(d_model, nhead, dim_feedforward, dropout, batch_first=True),
             num_layers
         )
         self.fc_out = nn.Linear(d_model, vocab_size)
 
-    def forward(self, src):
-        src = src.transpose(0, 1)  # (batch, seq) -> (seq, batch)
-        embedded = self.embedding(src) * math.sqrt(self.d_model)
-        embedded = self.pos_encoder(embedded)
-        output = self.transformer(embedded)
-        output = output.transpose(0, 1)  # (seq, batch, feature) -> (batch, seq, feature)
+    def forward(self, src, src_mask=None, positions=None, padding_mask=None, position_offset=0):
+        """
+        :param src: (batch, seq) token ids
+        :param src_mask: optional (seq, seq) or (batch, seq, seq) attention mask,
+            True where attention is blocked
+        :param positions: optional (batch, seq) position ids
+        :param padding_mask: optional (batch, seq) mask, True for padding
+            tokens, which are then never attended to
+        :param position_offset: position of the first token when
+            ``positions`` is not given
+
+        A causal model needs no padding mask for right-padded batches (real
+        tokens never look ahead to the padding), and without one runs the
+        fused ``is_causal`` attention kernel. A non-causal model in eval mode
+        with only a padding mask runs on nested tensors that skip the
+        padding altogether.
+        """
+        if positions is None:
+            positions = torch.arange(position_offset, position_offset + src.size(1), device=src.device)[None]
+        embedded = self.pos_encoder.embed(self.embedding(src) * math.sqrt(self.d_model), positions)
+        if self.pos_encoder.relative:
+            return self._forward_relative(embedded, src_mask, positions, padding_mask)
+
+        is_causal = False
+        if self.causal:
+            causal_mask = attention_block_mask(src.size(1), src.size(1), device=src.device)
+            is_causal = src_mask is None and padding_mask is None
+            src_mask = causal_mask if src_mask is None else src_mask | causal_mask
+        if src_mask is not None and src_mask.dim() == 3:
+            src_mask = src_mask.repeat_interleave(self.nhead, dim=0)
+        output = self.transformer(embedded, mask=src_mask, src_key_padding_mask=padding_mask,
+                                  is_causal=is_causal)
         return self.fc_out(output)
-        
\ No newline at end of file
+
+    def _forward_relative(self, x, src_mask, positions, padding_mask):
+        """
+        Rotary and ALiBi positions act inside attention, which
+        nn.TransformerEncoder cannot do, so the layers are run by hand.
+        """
+        seq = x.size(1)
+        blocked = src_mask
+        if self.causal:
+            causal_mask = attention_block_mask(seq, seq, device=x.device)
+            blocked = causal_mask if blocked is None else blocked | causal_mask
+        if padding_mask is not None:
+            if blocked is None:
+                blocked = torch.zeros((seq, seq), dtype=torch.bool, device=x.device)
+            blocked = blocked | padding_mask[:, None, :]
+        if blocked is not None:
+            # Every token may attend to itself, so no row is fully masked
+            blocked = blocked & ~torch.eye(seq, dtype=torch.bool, device=x.device)
+        bias = self.pos_encoder.bias(positions, positions)
+        is_causal = self.causal and src_mask is None and padding_mask is None and bias is None
+        attn_mask = None if is_causal else _sdpa_mask(blocked, bias)
+        for layer in self.transformer.layers:
+            x = self._layer(layer, x, positions, attn_mask, is_causal)
+        if self.transformer.norm is not None:
+            x = self.transformer.norm(x)
+        return self.fc_out(x)
+
+    def forward_incremental(self, src, cache=None, padding_mask=None):
+        """
+        Run only the new tokens ``src`` (batch, t) through the model, reusing
+        the keys and values cached for the earlier tokens of each row.
+
+        :param cache: KVCache returned by the previous call, or None to start
+        :param padding_mask: optional (batch, t) mask of (left) padding tokens,
+            which are never attended to and do not advance positions
+        :return: (logits for the new tokens, updated cache)
+
+        The logits match ``forward`` on the whole sequence. A model built
+        without ``causal=True`` lets earlier tokens attend to later ones, so
+        nothing can be reused and the whole sequence is re-run instead.
+        """
+        if cache is None:
+            cache = KVCache(src.size(0), src.device)
+        if padding_mask is None:
+            padding_mask = torch.zeros_like(src, dtype=torch.bool)
+        positions = cache.extend(padding_mask)
+        key_padding_mask = cache.padding_mask if cache.padding_mask.any() else None
+
+        if not self.causal:
+            cache.tokens = torch.cat([cache.tokens, src], dim=1)
+            output = self.forward(cache.tokens, positions=cache.positions, padding_mask=key_padding_mask)
+            return output[:, -src.size(1):], cache
+
+        blocked = None
+        bias = self.pos_encoder.bias(positions, cache.positions)
+        # An unpadded prefill is plain causal attention and runs the fused kernel
+        is_causal = key_padding_mask is None and bias is None and src.size(1) > 1 and len(cache) == src.size(1)
+        if not is_causal and (key_padding_mask is not None or src.size(1) > 1):
+            blocked = attention_block_mask(src.size(1), len(cache), key_padding_mask, device=src.device)
+
+        x = self.pos_encoder.embed(self.embedding(src) * math.sqrt(self.d_model), positions)
+        attn_mask = _sdpa_mask(blocked, bias)
+        for i, layer in enumerate(self.transformer.layers):
+            x = self._layer(layer, x, positions, attn_mask, is_causal, cache, i)
+        if self.transformer.norm is not None:
+            x = self.transformer.norm(x)
+        return self.fc_out(x), cache
+
+    def _layer(self, layer, x, positions, attn_mask, is_causal=False, cache=None, i=0):
+        """
+        One encoder layer computed from its own weights, with rotated
+        queries and keys and, given a cache, the keys and values of the
+        earlier tokens.
+        """
+        attn = layer.self_attn
+        batch, steps, d_model = x.shape
+
+        def self_attention(y):
+            q, k, v = F.linear(y, attn.in_proj_weight, attn.in_proj_bias) \
+                .view(batch, steps, 3, self.nhead, d_model // self.nhead).permute(2, 0, 3, 1, 4)
+            q, k = self.pos_encoder.rotate(q, positions), self.pos_encoder.rotate(k, positions)
+            if cache is not None:
+                if i < len(cache.keys):
+                    k = torch.cat([cache.keys[i], k], dim=2)
+                    v = torch.cat([cache.values[i], v], dim=2)
+                    cache.keys[i], cache.values[i] = k, v
+                else:
+                    cache.keys.append(k)
+                    cache.values.append(v)
+            mask = attn_mask
+            if mask is not None and mask.is_floating_point():
+                mask = mask.to(q.dtype)
+            out = F.scaled_dot_product_attention(q, k, v, attn_mask=mask, is_causal=is_causal,
+                                                 dropout_p=attn.dropout if self.training else 0.0)
+            return layer.dropout1(attn.out_proj(out.transpose(1, 2).reshape(batch, steps, d_model)))
+
+        def feed_forward(y):
+            return layer.dropout2(layer.linear2(layer.dropout(layer.activation(layer.linear1(y)))))
+
+        if layer.norm_first:
+            x = x + self_attention(layer.norm1(x))
+            return x + feed_forward(layer.norm2(x))
+        x = layer.norm1(x + self_attention(x))
+        return layer.norm2(x + feed_forward(x))
+
+
+def _sdpa_mask(blocked, bias):
+    """
+    Attention mask for scaled_dot_product_attention from a boolean blocked
+    mask, (queries, keys) or (batch, queries, keys), and an optional
+    (batch, heads, queries, keys) additive bias.
+    """
+    if blocked is not None and blocked.dim() == 3:
+        blocked = blocked.unsqueeze(1)
+    if bias is None:
+        # SDPA takes True where attention is allowed
+        return None if blocked is None else ~blocked
+    if blocked is not None:
+        bias = bias.masked_fill(blocked, float('-inf'))
+    return bias
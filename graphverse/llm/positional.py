@@ -0,0 +1,155 @@
+"""
+Position information for WalkTransformer.
+
+Every variant has the same three hooks: ``embed(x, positions)`` for the
+token embeddings, ``rotate(x, positions)`` for attention queries and keys and
+``bias(query_positions, key_positions)`` for an additive attention bias.
+Absolute variants (sinusoidal, learned) only change the embeddings; relative
+ones (rotary, ALiBi) only act inside attention, so the model routes them
+through its own attention implementation.
+"""
+import math
+import torch
+import torch.nn as nn
+
+POSITIONAL_ENCODINGS = ('sinusoidal', 'learned', 'rotary', 'alibi')
+
+
+def sinusoid(positions, d_model):
+    """
+    Sinusoidal encodings of integer positions of any shape, (..., d_model).
+    """
+    div_term = torch.exp(torch.arange(0, d_model, 2, device=positions.device).float()
+                         * (-math.log(10000.0) / d_model))
+    angles = positions.unsqueeze(-1).float() * div_term
+    return torch.stack([angles.sin(), angles.cos()], dim=-1).flatten(-2)[..., :d_model]
+
+
+class Positions(nn.Module):
+    """
+    Base class: no position information, only embedding dropout.
+    """
+    relative = False
+
+    def __init__(self, dropout=0.1):
+        super().__init__()
+        self.dropout = nn.Dropout(p=dropout)
+
+    def embed(self, x, positions):
+        return self.dropout(x)
+
+    def rotate(self, x, positions):
+        return x
+
+    def bias(self, query_positions, key_positions):
+        return None
+
+
+class SinusoidalPositions(Positions):
+    """
+    Fixed sinusoidal encodings. The first ``max_len`` positions are kept in a
+    table, which is not saved with the model (and ignored in older
+    checkpoints that have it); later positions are computed on the fly.
+    """
+    def __init__(self, d_model, max_len, dropout=0.1):
+        super().__init__(dropout)
+        self.d_model = d_model
+        self.register_buffer('pe', sinusoid(torch.arange(max_len), d_model), persistent=False)
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # Checkpoints from before the table stopped being saved still carry it
+        state_dict.pop(prefix + 'pe', None)
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+    def encode(self, positions):
+        # Select on the device rather than reading back positions.max(),
+        # which would sync on every decoding step
+        table = self.pe[positions.clamp(max=len(self.pe) - 1)]
+        overflow = (positions >= len(self.pe)).unsqueeze(-1)
+        return torch.where(overflow, sinusoid(positions, self.d_model).to(table.dtype), table)
+
+    def embed(self, x, positions):
+        return self.dropout(x + self.encode(positions))
+
+
+class LearnedPositions(SinusoidalPositions):
+    """
+    A trained embedding per position. Positions past ``max_len`` share the
+    embedding of the last one.
+    """
+    def __init__(self, d_model, max_len, dropout=0.1):
+        Positions.__init__(self, dropout)
+        self.embedding = nn.Embedding(max_len, d_model)
+
+    def encode(self, positions):
+        return self.embedding(positions.clamp(max=self.embedding.num_embeddings - 1))
+
+
+class RotaryPositions(Positions):
+    """
+    Rotary embeddings (RoPE): queries and keys are rotated by an angle
+    proportional to their position, so attention scores depend only on the
+    distance between tokens. Works for any position without a table.
+    """
+    relative = True
+
+    def __init__(self, head_dim, dropout=0.1, base=10000.0):
+        super().__init__(dropout)
+        if head_dim % 2:
+            raise ValueError(f"Rotary positions need an even head size, not {head_dim}")
+        self.register_buffer('inv_freq', base ** (-torch.arange(0, head_dim, 2).float() / head_dim),
+                             persistent=False)
+
+    def rotate(self, x, positions):
+        """
+        :param x: (batch, heads, seq, head_dim)
+        :param positions: (batch, seq)
+        """
+        angles = positions[:, None, :, None].float() * self.inv_freq
+        cos, sin = angles.cos().to(x.dtype), angles.sin().to(x.dtype)
+        first, second = x[..., 0::2], x[..., 1::2]
+        return torch.stack([first * cos - second * sin, first * sin + second * cos], dim=-1).flatten(-2)
+
+
+class ALiBiPositions(Positions):
+    """
+    Attention with linear biases (ALiBi): each head penalizes attention
+    scores linearly in the distance between query and key.
+    """
+    relative = True
+
+    def __init__(self, nhead, dropout=0.1):
+        super().__init__(dropout)
+        self.register_buffer('slopes', alibi_slopes(nhead), persistent=False)
+
+    def bias(self, query_positions, key_positions):
+        """
+        (batch, heads, queries, keys) bias for (batch, queries) and
+        (batch, keys) positions.
+        """
+        distance = (query_positions[:, :, None] - key_positions[:, None, :]).abs()
+        return -self.slopes[:, None, None] * distance[:, None].float()
+
+
+def alibi_slopes(nhead):
+    """
+    Geometric head slopes from the ALiBi paper, interleaving the slopes of
+    the next power of two when ``nhead`` is not one.
+    """
+    power = 2 ** math.floor(math.log2(nhead))
+    slopes = [2 ** (-8 * (i + 1) / power) for i in range(power)]
+    if power < nhead:
+        slopes += [2 ** (-4 * (i + 1) / power) for i in range(0, 2 * (nhead - power), 2)]
+    return torch.tensor(slopes)
+
+
+def build_positional(kind, d_model, nhead, max_len, dropout=0.1):
+    if kind == 'sinusoidal':
+        return SinusoidalPositions(d_model, max_len, dropout)
+    if kind == 'learned':
+        return LearnedPositions(d_model, max_len, dropout)
+    if kind == 'rotary':
+        return RotaryPositions(d_model // nhead, dropout)
+    if kind == 'alibi':
+        return ALiBiPositions(nhead, dropout)
+    raise ValueError(f"Unknown positional encoding {kind!r}, expected one of {POSITIONAL_ENCODINGS}")
@@ -6,18 +6,21 @@ def seed_walk(model, start_sequence, max_length, vocab, device='cuda' if torch.c
     current_sequence = start_sequence.copy()
 
     try:
-        while len(current_sequence) < max_length:
-            with torch.no_grad():
-                input_tensor = torch.tensor([vocab.token2idx[str(
-                    token)] for token in current_sequence]).unsqueeze(0).to(device)
-                output = model(input_tensor)
+        with torch.no_grad():
+            input_tensor = torch.as_tensor(vocab.encode(current_sequence)).unsqueeze(0).to(device)
+            # Only the newest token is run through the model after the prompt
+            output, cache = model.forward_incremental(input_tensor)
+            while len(current_sequence) < max_length:
                 next_token_idx = output[0, -1, :].argmax().item()
-                next_token = vocab.idx2token[next_token_idx]
-
-                if next_token == '<END>':
+                if next_token_idx == vocab.end_idx:
                     break
+                next_vertex = vocab.decode(next_token_idx)
+                if next_vertex < 0:
+                    return None
 
-                current_sequence.append(int(next_token))
+                current_sequence.append(next_vertex)
+                output, cache = model.forward_incremental(
+                    torch.tensor([[next_token_idx]], device=device), cache)
     except:
         return None
     return current_sequence
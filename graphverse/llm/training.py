@@ -1,29 +1,244 @@
+import contextlib
+import os
+import time
 import torch
+import torch.distributed as dist
 import torch.nn as nn
-from torch.utils.data import DataLoader, TensorDataset
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import BatchSampler, DataLoader, IterableDataset, RandomSampler, TensorDataset
 from .model import WalkTransformer
+from ..data.corpus import WalkCollator
+from ..data.batching import (LengthBucketSampler, ShardedBatchSampler, PackedWalkCollator, packed_attention_mask,
+                             walk_lengths)
 
-def train_model(training_data, vocab, epochs, batch_size, learning_rate, device='cuda' if torch.cuda.is_available() else 'cpu'):
-    model = WalkTransformer(len(vocab), d_model=512, nhead=8, num_layers=6, dim_feedforward=2048).to(device)
-    criterion = nn.CrossEntropyLoss(ignore_index=vocab.token2idx['<PAD>'])
+def train_model(training_data, vocab, epochs, batch_size, learning_rate, device='cuda' if torch.cuda.is_available() else 'cpu',
+                bucket_by_length=False, pack_sequences=False, pack_length=None, causal=True,
+                d_model=512, nhead=8, num_layers=6, dim_feedforward=2048, precision='fp32', compile_model=False,
+                accumulation_steps=1, checkpoint_path=None, checkpoint_every=None, history=None,
+                dropout=0.1, positional='sinusoidal', max_len=None, seed=None, world_size=1):
+    """
+    Train a WalkTransformer on either a padded token tensor or a Dataset of
+    variable-length token tensors (such as a WalkCorpus), which is padded
+    per batch. An IterableDataset such as a WalkStream is consumed in order,
+    one pass per epoch, so walks can be generated while training runs; it
+    cannot be bucketed by length or split over several processes.
+
+    ``bucket_by_length`` batches walks of similar length together so each
+    batch is padded only to its own longest walk. ``pack_sequences`` packs
+    the walks of each batch into rows of up to ``pack_length`` tokens
+    (default: the longest walk) with a block attention mask between walks.
+    ``causal`` (the default) trains a model that only attends to earlier
+    tokens, as in generation, which lets generation reuse cached keys and
+    values; a non-causal model is given a padding mask instead.
+
+    ``d_model``, ``nhead``, ``num_layers``, ``dim_feedforward``, ``dropout``
+    and ``positional`` set the model; its position table is sized to
+    ``max_len``, by default the longest training walk. ``precision='bf16'`` runs the forward pass
+    under bfloat16 autocast, ``compile_model`` wraps the model in
+    torch.compile (a string picks the backend) and ``accumulation_steps``
+    sums the gradients of that many batches before each optimizer step.
+    Losses are kept on the device and only read back once per epoch.
+
+    With ``checkpoint_path`` the model, optimizer and progress are saved at
+    the end of every epoch and every ``checkpoint_every`` optimizer steps,
+    and an existing checkpoint there is resumed from. Per-epoch loss and
+    tokens/sec are printed and, if ``history`` is a list, appended to it.
+
+    ``seed`` makes initialization and shuffling reproducible. With
+    ``world_size`` > 1, training runs in that many local processes with
+    DistributedDataParallel (gloo backend): every rank loads its slice of
+    each ``batch_size`` global batch, and the loss is normalized by the
+    global token count, so the loss curve matches single-process training
+    with the same seed (exactly so without dropout).
+    """
+    if isinstance(training_data, IterableDataset):
+        if bucket_by_length or world_size > 1:
+            raise ValueError("bucket_by_length and world_size > 1 need a map-style dataset")
+        if max_len is None:
+            max_len = training_data.max_tokens
+    elif max_len is None:
+        max_len = int(walk_lengths(training_data, vocab.pad_idx).max())
+    options = dict(bucket_by_length=bucket_by_length, pack_sequences=pack_sequences, pack_length=pack_length,
+                   causal=causal, d_model=d_model, nhead=nhead, num_layers=num_layers,
+                   dim_feedforward=dim_feedforward, precision=precision, compile_model=compile_model,
+                   accumulation_steps=accumulation_steps, checkpoint_path=checkpoint_path,
+                   checkpoint_every=checkpoint_every, dropout=dropout, positional=positional, max_len=max_len,
+                   seed=seed)
+    if world_size > 1:
+        from .distributed import launch_training
+        return launch_training(training_data, vocab, epochs, batch_size, learning_rate, device, world_size,
+                               history, options)
+    return _train(training_data, vocab, epochs, batch_size, learning_rate, device, history=history, **options)
+
+
+def _train(training_data, vocab, epochs, batch_size, learning_rate, device, bucket_by_length, pack_sequences,
+           pack_length, causal, d_model, nhead, num_layers, dim_feedforward, precision, compile_model,
+           accumulation_steps, checkpoint_path, checkpoint_every, dropout, positional, max_len, seed, history=None,
+           rank=0, world_size=1):
+    device = torch.device(device)
+    if precision not in ('fp32', 'bf16'):
+        raise ValueError(f"Unsupported precision {precision!r}")
+    if seed is not None:
+        torch.manual_seed(seed)
+    config = {'d_model': d_model, 'nhead': nhead, 'num_layers': num_layers,
+              'dim_feedforward': dim_feedforward, 'causal': causal, 'dropout': dropout,
+              'positional': positional, 'max_len': max_len}
+    model = WalkTransformer(len(vocab), **config).to(device)
+    pad_idx = vocab.pad_idx
+    criterion = nn.CrossEntropyLoss(ignore_index=pad_idx, reduction='sum')
     optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
-    
-    dataset = TensorDataset(training_data)
-    dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
-    
-    for epoch in range(epochs):
+
+    dataset = TensorDataset(training_data) if isinstance(training_data, torch.Tensor) else training_data
+    streaming = isinstance(dataset, IterableDataset)
+    lengths = walk_lengths(dataset, pad_idx) if (bucket_by_length or pack_sequences) and not streaming else None
+    if pack_sequences:
+        collate_fn = PackedWalkCollator(pad_idx, pack_length or (dataset.max_tokens if streaming
+                                                                 else int(lengths.max())))
+    else:
+        collate_fn = WalkCollator(pad_idx)
+    start_epoch, skip_batches, epoch_rng = 0, 0, None
+    sampler_seed = torch.initial_seed() if seed is None else seed
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        start_epoch, skip_batches, epoch_rng, saved_seed = _load_checkpoint(checkpoint_path, model, optimizer,
+                                                                            config)
+        # Without a seed the bucket order depends on the process; reuse the one
+        # of the run that wrote the checkpoint so a resumed epoch sees the same batches
+        if saved_seed is not None:
+            sampler_seed = saved_seed
+
+    shuffle_generator = None
+    sampler = None
+    if bucket_by_length:
+        # set_epoch below gives the sampler the checkpoint's epoch as well
+        sampler = LengthBucketSampler(lengths, batch_size, seed=sampler_seed)
+    elif (seed is not None or world_size > 1) and not streaming:
+        # A dedicated generator keeps the shuffle identical on every rank
+        shuffle_generator = torch.Generator().manual_seed(0 if seed is None else seed)
+        sampler = BatchSampler(RandomSampler(dataset, generator=shuffle_generator), batch_size, drop_last=False)
+    if world_size > 1:
+        sampler = ShardedBatchSampler(sampler, rank, world_size)
+    if streaming:
+        dataloader = DataLoader(dataset, batch_size=batch_size, collate_fn=collate_fn)
+    elif sampler is not None:
+        dataloader = DataLoader(dataset, batch_sampler=sampler, collate_fn=collate_fn)
+    else:
+        dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True, collate_fn=collate_fn)
+
+    forward = ddp = model
+    if world_size > 1:
+        forward = ddp = DistributedDataParallel(model)
+    if compile_model:
+        forward = torch.compile(forward, backend=compile_model) if isinstance(compile_model, str) \
+            else torch.compile(forward)
+    autocast = precision == 'bf16'
+
+    for epoch in range(start_epoch, epochs):
         model.train()
-        total_loss = 0
-        for batch in dataloader:
-            batch = batch[0].to(device)
-            optimizer.zero_grad()
-            output = model(batch[:, :-1])
-            loss = criterion(output.contiguous().view(-1, len(vocab)), batch[:, 1:].contiguous().view(-1))
-            loss.backward()
+        # Resuming mid-epoch replays the same shuffle and skips the batches already done
+        if epoch_rng is not None:
+            torch.set_rng_state(epoch_rng[0])
+            if shuffle_generator is not None:
+                shuffle_generator.set_state(epoch_rng[1])
+        epoch_rng = (torch.get_rng_state(), shuffle_generator.get_state() if shuffle_generator is not None else None)
+        if hasattr(sampler, 'set_epoch'):
+            sampler.set_epoch(epoch)
+
+        total_loss = torch.zeros((), device=device)
+        total_tokens = torch.zeros((), dtype=torch.long, device=device)
+        num_batches = 0
+        started = time.perf_counter()
+        optimizer.zero_grad()
+        for i, batch in enumerate(dataloader):
+            if i < skip_batches:
+                continue
+            if batch[0].size(0) == 0:
+                # This rank got no rows of the global batch but must still join the all-reduce:
+                # run a one-token walk, which has no targets
+                batch = (torch.tensor([[vocab.start_idx, pad_idx]]), torch.tensor([[0, -1]]),
+                         torch.zeros((1, 2), dtype=torch.long))
+            tokens = batch[0].to(device)
+            targets = tokens[:, 1:]
+            # Gradients of accumulation micro-steps are only all-reduced with the last one
+            sync = world_size == 1 or (i + 1) % accumulation_steps == 0 or i + 1 == len(dataloader)
+            with contextlib.nullcontext() if sync else ddp.no_sync():
+                with torch.autocast(device.type, dtype=torch.bfloat16, enabled=autocast):
+                    if pack_sequences:
+                        segments, positions = batch[1].to(device), batch[2].to(device)
+                        # The first token of each packed walk is not a target of the walk before it
+                        targets = targets.masked_fill(segments[:, 1:] != segments[:, :-1], pad_idx)
+                        output = forward(tokens[:, :-1], src_mask=packed_attention_mask(segments[:, :-1]),
+                                         positions=positions[:, :-1])
+                    elif causal:
+                        output = forward(tokens[:, :-1])
+                    else:
+                        output = forward(tokens[:, :-1], padding_mask=tokens[:, :-1] == pad_idx)
+                loss_sum = criterion(output.float().reshape(-1, len(vocab)), targets.reshape(-1))
+                batch_tokens = (targets != pad_idx).sum()
+                global_tokens = batch_tokens.clone()
+                if world_size > 1:
+                    dist.all_reduce(global_tokens)
+                # Mean over the tokens of the whole global batch; DDP averages
+                # gradients over ranks, which the world_size factor undoes.
+                loss = loss_sum * world_size / global_tokens.clamp(min=1)
+                (loss / accumulation_steps).backward()
+
+            reported = loss_sum.detach()
+            if world_size > 1:
+                dist.all_reduce(reported)
+            total_loss += reported / global_tokens.clamp(min=1)
+            total_tokens += global_tokens
+            num_batches += 1
+
+            if (i + 1) % accumulation_steps == 0:
+                optimizer.step()
+                optimizer.zero_grad()
+                steps = (i + 1) // accumulation_steps
+                if checkpoint_path is not None and checkpoint_every and steps % checkpoint_every == 0 and rank == 0:
+                    _save_checkpoint(checkpoint_path, model, optimizer, config, epoch, i + 1, epoch_rng,
+                                     sampler_seed)
+        if num_batches and (i + 1) % accumulation_steps:
             optimizer.step()
-            total_loss += loss.item()
-        
-        avg_loss = total_loss / len(dataloader)
-        print(f"Epoch {epoch+1}/{epochs}, Loss: {avg_loss:.4f}")
-    
-    return model
\ No newline at end of file
+            optimizer.zero_grad()
+        skip_batches = 0
+        epoch_rng = None
+
+        elapsed = time.perf_counter() - started
+        avg_loss = total_loss.item() / max(num_batches, 1)
+        tokens_per_sec = total_tokens.item() / elapsed if elapsed > 0 else 0.0
+        if rank == 0:
+            print(f"Epoch {epoch+1}/{epochs}, Loss: {avg_loss:.4f}, Tokens/sec: {tokens_per_sec:.0f}")
+            if history is not None:
+                history.append({'epoch': epoch + 1, 'loss': avg_loss, 'tokens': total_tokens.item(),
+                                'tokens_per_sec': tokens_per_sec})
+            if checkpoint_path is not None:
+                _save_checkpoint(checkpoint_path, model, optimizer, config, epoch + 1, 0, None, sampler_seed)
+
+    return model
+
+
+def _save_checkpoint(path, model, optimizer, config, epoch, batches_done, epoch_rng, sampler_seed):
+    """
+    Atomically write the training state: a crash while saving leaves the
+    previous checkpoint intact.
+    """
+    state = {
+        'model': model.state_dict(),
+        'optimizer': optimizer.state_dict(),
+        'config': config,
+        'epoch': epoch,
+        'batches_done': batches_done,
+        'epoch_rng': epoch_rng,
+        'sampler_seed': sampler_seed,
+    }
+    tmp = f'{path}.tmp'
+    torch.save(state, tmp)
+    os.replace(tmp, path)
+
+
+def _load_checkpoint(path, model, optimizer, config):
+    state = torch.load(path, weights_only=False)
+    if state['config'] != config:
+        raise ValueError(f"Checkpoint {path} was written for model {state['config']}, not {config}")
+    model.load_state_dict(state['model'])
+    optimizer.load_state_dict(state['optimizer'])
+    return state['epoch'], state['batches_done'], state['epoch_rng'], state.get('sampler_seed')
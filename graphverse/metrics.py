@@ -0,0 +1,101 @@
+import logging
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class WalkMetrics:
+    """
+    Counters, histograms and timers for walk generation and data preparation.
+
+    Walk code takes an optional ``metrics`` argument and only touches it
+    when one is given, so leaving it out costs a single ``is None`` check
+    per event. Collected values:
+
+    - ``counters``: steps, backtracks, restarts, walks, failed_walks, ...
+    - ``rejections``: neighbours refused, per rule type
+    - ``walk_lengths``: histogram of generated walk lengths
+    - ``timers``: total seconds spent in each named stage
+
+    With ``progress_every`` set, a progress line is logged at INFO level
+    every that many walks.
+    """
+    def __init__(self, progress_every=None):
+        self.counters = Counter()
+        self.rejections = Counter()
+        self.walk_lengths = Counter()
+        self.timers = defaultdict(float)
+        self.progress_every = progress_every
+        self._started = time.perf_counter()
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def record_walk(self, walk):
+        """
+        Count a finished walk (None for a failed one) and its length.
+        """
+        if walk is None:
+            self.counters['failed_walks'] += 1
+            return
+        self.counters['walks'] += 1
+        self.walk_lengths[len(walk)] += 1
+        if self.progress_every and self.counters['walks'] % self.progress_every == 0:
+            self.report()
+
+    def record_walks(self, walks):
+        for walk in walks:
+            self.record_walk(walk)
+
+    def admits(self, checker):
+        """
+        Wrap ``checker.allows`` so that every refused neighbour is counted
+        against the first rule that refuses it.
+        """
+        def allows(vertex):
+            rule = checker.rejecting_rule(vertex)
+            if rule is None:
+                return True
+            self.rejections[type(rule).__name__] += 1
+            return False
+        return allows
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] += time.perf_counter() - start
+
+    def summary(self):
+        """
+        Plain dict of everything collected so far.
+        """
+        return {
+            'counters': dict(self.counters),
+            'rejections': dict(self.rejections),
+            'walk_lengths': dict(sorted(self.walk_lengths.items())),
+            'timers': dict(self.timers),
+        }
+
+    def report(self):
+        elapsed = time.perf_counter() - self._started
+        walks = self.counters['walks']
+        logger.info("%d walks (%.1f/s), %d steps, %d backtracks, %d restarts",
+                    walks, walks / elapsed if elapsed > 0 else 0.0, self.counters['steps'],
+                    self.counters['backtracks'], self.counters['restarts'])
+
+
+@contextmanager
+def timed(metrics, name):
+    """
+    metrics.timer(name) that does nothing when metrics is None.
+    """
+    if metrics is None:
+        yield
+    else:
+        with metrics.timer(name):
+            yield
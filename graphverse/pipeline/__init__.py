@@ -0,0 +1,3 @@
+from .cache import ArtifactCache, stage_key
+from .runner import Pipeline, Stage
+from .experiment import experiment_pipeline, run_experiment
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import shutil
+
+COMPLETE_FILE = '.complete'
+
+
+def stage_key(name, params, inputs=()):
+    """
+    Content address of a stage: a hash of its name, its parameters (which
+    include the seed) and the keys of the stages it reads from, so changing
+    anything upstream changes every key downstream.
+    """
+    payload = json.dumps({'stage': name, 'params': params, 'inputs': list(inputs)},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:20]
+
+
+class ArtifactCache:
+    """
+    Directory of stage artifacts addressed by stage name and key.
+
+    Each artifact is a directory ``<root>/<name>-<key>`` that a stage fills
+    with whatever files it produces. Artifacts are built in a temporary
+    directory and renamed into place once complete, so an interrupted build
+    never leaves a half-written artifact behind. The modification time of
+    the completion marker records when an artifact was last used; with
+    ``max_bytes`` set, the least recently used artifacts are deleted after
+    every build until the cache fits again.
+    """
+    def __init__(self, root, max_bytes=None):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def path(self, name, key):
+        return os.path.join(self.root, f'{name}-{key}')
+
+    def has(self, name, key):
+        return os.path.exists(os.path.join(self.path(name, key), COMPLETE_FILE))
+
+    def touch(self, name, key):
+        os.utime(os.path.join(self.path(name, key), COMPLETE_FILE))
+
+    def get_or_build(self, name, key, build, protect=()):
+        """
+        Return the artifact directory for (name, key), calling
+        ``build(directory)`` to create it if it is not cached yet.
+
+        :param protect: artifact directories that eviction must keep
+        """
+        path = self.path(name, key)
+        if self.has(name, key):
+            self.touch(name, key)
+            return path
+
+        tmp = os.path.join(self.root, f'.tmp-{name}-{key}-{os.getpid()}')
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        try:
+            build(tmp)
+            open(os.path.join(tmp, COMPLETE_FILE), 'w').close()
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp, path)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        if self.max_bytes is not None:
+            self.evict(self.max_bytes, protect=set(protect) | {path})
+        return path
+
+    def entries(self):
+        """
+        List of (path, last_used, size_in_bytes) for every complete artifact.
+        """
+        entries = []
+        for entry in os.scandir(self.root):
+            marker = os.path.join(entry.path, COMPLETE_FILE)
+            if entry.is_dir() and os.path.exists(marker):
+                entries.append((entry.path, os.path.getmtime(marker), _directory_size(entry.path)))
+        return entries
+
+    def evict(self, max_bytes, protect=()):
+        """
+        Delete least recently used artifacts until at most ``max_bytes``
+        are cached. Returns the deleted paths.
+        """
+        entries = sorted(self.entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        evicted = []
+        for path, _, size in entries:
+            if total <= max_bytes:
+                break
+            if path in protect:
+                continue
+            shutil.rmtree(path)
+            total -= size
+            evicted.append(path)
+        return evicted
+
+
+def _directory_size(path):
+    total = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(directory, name))
+    return total
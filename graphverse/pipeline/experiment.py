@@ -0,0 +1,118 @@
+import json
+import os
+import random
+import numpy as np
+import torch
+from ..graph.graph_generation import generate_random_graph, save_graph, load_graph
+from ..graph.rule_index import assign_rules
+from ..data.preparation import prepare_training_data
+from ..data.corpus import WalkCorpus
+from ..llm.training import train_model
+from ..llm.evaluation import evaluate_model_batched
+from .runner import Pipeline
+
+GRAPH_FILE = 'graph.gvg'
+CORPUS_DIR = 'corpus'
+MODEL_FILE = 'model.pt'
+RESULTS_FILE = 'evaluation.json'
+
+
+def seed_everything(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def build_graph(directory, params, inputs):
+    """
+    Random graph plus its rule assignment, saved together; the rules are
+    stored as a single RuleIndex so later stages look them up per vertex.
+    """
+    seed_everything(params['seed'])
+    G = generate_random_graph(params['n'], params['in_edges'], params['out_edges'])
+    index = assign_rules(G, params['n'], params['num_repeaters'], params['repeater_min_steps'],
+                         params['repeater_max_steps'], seed=params['seed'])
+    save_graph(G, os.path.join(directory, GRAPH_FILE), (index,))
+
+
+def build_corpus(directory, params, inputs, workers=None):
+    """
+    Training walks streamed to an on-disk corpus.
+    """
+    graph, rules = load_graph(os.path.join(inputs['graph'], GRAPH_FILE), with_rules=True)
+    prepare_training_data(graph, params['num_samples'], params['min_length'], params['max_length'], rules,
+                          seed=params['seed'], workers=workers,
+                          corpus_path=os.path.join(directory, CORPUS_DIR))
+
+
+def build_model(directory, params, inputs, device=None):
+    """
+    Model trained on the corpus; every parameter except the seed is passed
+    on to train_model.
+    """
+    seed_everything(params['seed'])
+    corpus = WalkCorpus(os.path.join(inputs['corpus'], CORPUS_DIR))
+    kwargs = {k: v for k, v in params.items() if k != 'seed'}
+    if device is not None:
+        kwargs['device'] = device
+    model = train_model(corpus, corpus.vocab, **kwargs)
+    torch.save(model.cpu(), os.path.join(directory, MODEL_FILE))
+
+
+def build_evaluation(directory, params, inputs, device=None):
+    """
+    Evaluation records of the trained model, saved as JSON.
+    """
+    seed_everything(params['seed'])
+    graph, rules = load_graph(os.path.join(inputs['graph'], GRAPH_FILE), with_rules=True)
+    vocab = WalkCorpus(os.path.join(inputs['corpus'], CORPUS_DIR)).vocab
+    model = load_model(inputs['model'], device)
+    kwargs = {k: v for k, v in params.items() if k != 'seed'}
+    results = evaluate_model_batched(model, graph, vocab, rules=rules, seed=params['seed'], **kwargs)
+    with open(os.path.join(directory, RESULTS_FILE), 'w') as f:
+        json.dump(results, f)
+
+
+def load_model(directory, device=None):
+    model = torch.load(os.path.join(directory, MODEL_FILE), weights_only=False)
+    return model.to(device) if device is not None else model
+
+
+def experiment_pipeline(cache, graph_params, corpus_params, model_params, evaluation_params,
+                        workers=None, device=None):
+    """
+    Pipeline with the graph -> corpus -> model -> evaluation stages of
+    main.py. Each params dict must contain a ``seed``.
+    """
+    pipeline = Pipeline(cache)
+    pipeline.add('graph', build_graph, graph_params)
+    pipeline.add('corpus', build_corpus, corpus_params, inputs=('graph',), options={'workers': workers})
+    pipeline.add('model', build_model, model_params, inputs=('corpus',), options={'device': device})
+    pipeline.add('evaluation', build_evaluation, evaluation_params, inputs=('graph', 'corpus', 'model'),
+                  options={'device': device})
+    return pipeline
+
+
+def run_experiment(cache, graph_params, corpus_params, model_params, evaluation_params,
+                   workers=None, device=None):
+    """
+    Run (or load from the cache) every stage of the experiment.
+
+    :return: dict with the graph, rules, corpus, vocab, model and
+        evaluation_results
+    """
+    pipeline = experiment_pipeline(cache, graph_params, corpus_params, model_params, evaluation_params,
+                                   workers=workers, device=device)
+    evaluation_dir = pipeline.run('evaluation')
+    graph, rules = load_graph(os.path.join(pipeline.run('graph'), GRAPH_FILE), with_rules=True)
+    corpus = WalkCorpus(os.path.join(pipeline.run('corpus'), CORPUS_DIR))
+    with open(os.path.join(evaluation_dir, RESULTS_FILE)) as f:
+        evaluation_results = json.load(f)
+    return {
+        'graph': graph,
+        'rules': rules,
+        'corpus': corpus,
+        'vocab': corpus.vocab,
+        'model': load_model(pipeline.run('model'), device),
+        'evaluation_results': evaluation_results,
+    }
@@ -0,0 +1,62 @@
+from .cache import ArtifactCache, stage_key
+
+
+class Stage:
+    """
+    One step of a pipeline.
+
+    ``build(directory, params, inputs, **options)`` writes the stage's
+    artifact into ``directory``; ``inputs`` maps the names of the stages it
+    depends on to their artifact directories. ``params`` identify the result
+    and are part of the cache key; ``options`` (worker counts, devices, ...)
+    only affect how it is computed and are not.
+    """
+    def __init__(self, name, build, params, inputs=(), options=None):
+        self.name = name
+        self.build = build
+        self.params = params
+        self.inputs = tuple(inputs)
+        self.options = options or {}
+
+
+class Pipeline:
+    """
+    Runs stages in dependency order, reusing cached artifacts whose key
+    (stage parameters plus the keys of all upstream stages) is unchanged.
+    """
+    def __init__(self, cache):
+        self.cache = cache if isinstance(cache, ArtifactCache) else ArtifactCache(cache)
+        self.stages = {}
+
+    def add(self, name, build, params, inputs=(), options=None):
+        for dependency in inputs:
+            if dependency not in self.stages:
+                raise ValueError(f"Stage {name} depends on unknown stage {dependency}")
+        self.stages[name] = Stage(name, build, params, inputs, options)
+        return name
+
+    def key(self, name):
+        stage = self.stages[name]
+        return stage_key(name, stage.params, [self.key(dependency) for dependency in stage.inputs])
+
+    def is_cached(self, name):
+        return self.cache.has(name, self.key(name))
+
+    def run(self, name):
+        """
+        Return the artifact directory of a stage, building it and any
+        missing upstream artifacts first.
+        """
+        return self._run(name, [])
+
+    def _run(self, name, done):
+        stage = self.stages[name]
+        inputs = {dependency: self._run(dependency, done) for dependency in stage.inputs}
+        done.extend(inputs.values())
+
+        def build(directory):
+            stage.build(directory, stage.params, inputs, **stage.options)
+
+        path = self.cache.get_or_build(name, self.key(name), build, protect=done)
+        done.append(path)
+        return path
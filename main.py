@@ -1,64 +1,37 @@
-import networkx as nx
-import matplotlib.pyplot as plt
 import torch
 import pandas as pd
 import math
-import random
 
-from graphverse.graph.graph_generation import generate_random_graph, calculate_edge_density
-from graphverse.graph.rules import AscenderRule, DescenderRule, EvenRule, OddRule, RepeaterRule
-from graphverse.graph.rules import define_all_rules
-from graphverse.data.preparation import prepare_training_data
-from graphverse.llm.training import train_model
-from graphverse.llm.evaluation import evaluate_model
+from graphverse.pipeline import run_experiment
 
-# Generate graph
-n = 1000  # Number of vertices
-in_edges = 100  # inital number of edges each vertex should have
-out_edges = 100  # '' out edges
-G = generate_random_graph(n, in_edges, out_edges)
-
-print(f'graph created')
+# Every stage is cached under .graphverse_cache, keyed by its parameters and
+# those of the stages before it: changing only the training parameters reuses
+# the cached graph and corpus.
+device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+experiment = run_experiment(
+    '.graphverse_cache',
+    graph_params={
+        'n': 1000,  # Number of vertices
+        'in_edges': 100,  # inital number of edges each vertex should have
+        'out_edges': 100,  # '' out edges
+        'num_repeaters': 3,
+        'repeater_min_steps': 10,
+        'repeater_max_steps': 100,
+        'seed': 0,
+    },
+    corpus_params={'num_samples': 100_000, 'min_length': 10, 'max_length': 50, 'seed': 0},
+    model_params={'epochs': 1, 'batch_size': 32, 'learning_rate': 0.001, 'seed': 0},
+    evaluation_params={'num_samples': 10000, 'min_start_length': 1, 'max_start_length': 5, 'seed': 0},
+    device=device,
+)
+G = experiment['graph']
+vocab = experiment['vocab']
+evaluation_results = experiment['evaluation_results']
 
-# Print some information about the graph
 print(f"Number of nodes: {G.number_of_nodes()}")
 print(f"Number of edges: {G.number_of_edges()}")
-print(f"Is strongly connected: {nx.is_strongly_connected(G)}")
-print(f"Is wealkly connected: {nx.is_weakly_connected(G)}")
-
-# Define rule sets
-print('selecting vertices with rules')
-ascenders, descenders, evens, odds, repeaters = define_all_rules(
-    G, n, 3, 10, 100)
-
-# print all rule se
-# Create rule tuple
-rules = (
-    AscenderRule(ascenders),
-    DescenderRule(descenders),
-    EvenRule(evens),
-    OddRule(odds),
-    RepeaterRule(repeaters)
-)
-print(f'Now preparing training data')
-
-# Prepare training data
-training_data, vocab = prepare_training_data(
-    G, num_samples=100_000, min_length=10, max_length=50, rules=rules)
-print(f'Training data prepared')
 print(f'Vocab size: {len(vocab)}')
-print(f'Training data shape: {training_data.shape}')
-print(f'Begin training')
-
-# Train the model
-device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-model = train_model(training_data, vocab, epochs=1,
-                    batch_size=32, learning_rate=0.001, device=device)
-
-# Evaluate the model
-max_corpus_length = training_data.size(1)  # Get the maximum sequence length
-evaluation_results = evaluate_model(model, G, vocab, num_samples=10000,
-                                    min_start_length=1, max_start_length=int(0.1 * max_corpus_length), rules=rules)
+print(f"Training walks: {len(experiment['corpus'])}")
 
 # Analyze results
 df_results = pd.DataFrame(evaluation_results)
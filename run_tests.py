@@ -5,7 +5,7 @@ if __name__ == '__main__':
     test_suite = unittest.TestSuite()
 
     # Discover tests in each subfolder
-    for folder in ['graph_generation', 'data', 'llm']:
+    for folder in ['graph_generation', 'data', 'llm', 'pipeline', 'benchmark']:
         subfolder_tests = test_loader.discover(f'tests/{folder}')
         test_suite.addTests(subfolder_tests)
     
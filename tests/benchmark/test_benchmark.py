@@ -0,0 +1,44 @@
+import json
+import os
+import tempfile
+import unittest
+from graphverse.benchmark import BenchmarkCase, compare, default_cases, main, run_benchmarks
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_run_keeps_fastest_repeat(self):
+        case = BenchmarkCase('count', 'items', lambda scale: int(1000 * scale), lambda size: size)
+        results = run_benchmarks([case], repeat=2, scale=0.5)
+        self.assertEqual(results['count']['units'], 500)
+        self.assertGreater(results['count']['rate'], 0)
+
+    def test_compare_uses_thresholds(self):
+        baseline = {'a': {'rate': 100.0}, 'b': {'rate': 100.0}}
+        results = {'a': {'rate': 85.0}, 'b': {'rate': 70.0}, 'new': {'rate': 1.0}}
+        self.assertEqual([r[0] for r in compare(results, baseline, threshold=0.2)], ['b'])
+        self.assertEqual(compare(results, baseline, threshold=0.2, thresholds={'b': 0.5}), [])
+        self.assertEqual([r[0] for r in compare(results, baseline, threshold=0.1)], ['a', 'b'])
+
+    def test_cli_writes_json_and_flags_regressions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'results.json')
+            args = ['--filter', 'rules_check_batch', '--scale', '0.01', '--repeat', '1', '--output', output]
+            self.assertEqual(main(args), 0)
+            with open(output) as f:
+                results = json.load(f)
+            self.assertIn('rules_check_batch', results['results'])
+
+            results['results']['rules_check_batch']['rate'] *= 1000
+            baseline = os.path.join(tmp, 'baseline.json')
+            with open(baseline, 'w') as f:
+                json.dump(results, f)
+            self.assertEqual(main(args[:-2] + ['--baseline', baseline]), 1)
+
+    def test_evaluation_cases(self):
+        cases = [case for case in default_cases() if case.name.startswith('evaluation')]
+        self.assertEqual([case.name for case in cases], ['evaluation', 'evaluation_batched'])
+        results = run_benchmarks(cases, repeat=1, scale=0.05)
+        self.assertEqual([result['units'] for result in results.values()], [4, 4])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import torch
+from torch.utils.data import TensorDataset
+from graphverse.data.batching import LengthBucketSampler, PackedWalkCollator, packed_attention_mask, walk_lengths
+from graphverse.data.corpus import WalkCollator
+from graphverse.data.vocabulary import WalkVocabulary
+from graphverse.llm.training import train_model
+
+class TestBatching(unittest.TestCase):
+    def setUp(self):
+        self.lengths = [3, 9, 4, 8, 5, 7, 6, 10, 3, 9] * 10
+
+    def test_bucket_sampler_covers_every_walk_once(self):
+        sampler = LengthBucketSampler(self.lengths, batch_size=8, bucket_size=40, seed=0)
+        batches = list(sampler)
+        self.assertEqual(len(batches), len(sampler))
+        self.assertEqual(sorted(i for batch in batches for i in batch), list(range(len(self.lengths))))
+
+    def test_bucket_sampler_groups_similar_lengths(self):
+        sampler = LengthBucketSampler(self.lengths, batch_size=10, bucket_size=100, seed=0)
+        for batch in sampler:
+            spread = max(self.lengths[i] for i in batch) - min(self.lengths[i] for i in batch)
+            self.assertLessEqual(spread, 1)
+
+    def test_bucket_sampler_is_seeded_per_epoch(self):
+        first = LengthBucketSampler(self.lengths, batch_size=8, seed=1)
+        second = LengthBucketSampler(self.lengths, batch_size=8, seed=1)
+        self.assertEqual(list(first), list(second))
+        self.assertNotEqual(list(first), list(LengthBucketSampler(self.lengths, batch_size=8, seed=1)))
+
+    def test_collator_trims_to_batch_maximum(self):
+        data = torch.tensor([[1, 5, 2, 0, 0, 0], [1, 5, 6, 2, 0, 0]])
+        batch, = WalkCollator(0)(list(TensorDataset(data)))
+        self.assertEqual(batch.shape, (2, 4))
+        self.assertEqual(walk_lengths(data, 0).tolist(), [3, 4])
+
+    def test_packing(self):
+        items = [torch.tensor([1, 5, 2]), torch.tensor([1, 6, 7, 8, 2]), torch.tensor([1, 9, 2])]
+        tokens, segments, positions = PackedWalkCollator(0, 6)(items)
+        self.assertEqual(tokens.tolist(), [[1, 6, 7, 8, 2, 0], [1, 5, 2, 1, 9, 2]])
+        self.assertEqual(segments.tolist(), [[0, 0, 0, 0, 0, -1], [0, 0, 0, 1, 1, 1]])
+        self.assertEqual(positions[1].tolist(), [0, 1, 2, 0, 1, 2])
+        mask = packed_attention_mask(segments)
+        self.assertFalse(mask[1, 4, 3])
+        self.assertTrue(mask[1, 4, 2])
+
+    def test_train_with_buckets_and_packing(self):
+        vocab = WalkVocabulary([list(range(10))])
+        data = torch.zeros((40, 12), dtype=torch.long)
+        for i in range(40):
+            length = 3 + i % 8
+            data[i, :length] = torch.randint(3, len(vocab), (length,))
+        for options in ({'bucket_by_length': True}, {'pack_sequences': True, 'pack_length': 24}):
+            model = train_model(data, vocab, epochs=1, batch_size=8, learning_rate=0.001, device='cpu', **options)
+            self.assertEqual(model.fc_out.out_features, len(vocab))
+
+if __name__ == '__main__':
+    unittest.main()
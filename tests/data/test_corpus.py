@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+import networkx as nx
+import numpy as np
+import torch
+from graphverse.data.corpus import CorpusWriter, WalkCorpus, WalkCollator
+from graphverse.data.preparation import prepare_training_data
+from graphverse.data.vocabulary import WalkVocabulary
+from graphverse.graph.rules import AscenderRule
+from graphverse.llm.training import train_model
+
+class TestWalkCorpus(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'corpus')
+        self.vocab = WalkVocabulary([list(range(10))])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        walks = [[1, 2, 3], [4, 5], [6, 7, 8, 9]]
+        with CorpusWriter(self.path, self.vocab, chunk_tokens=4) as writer:
+            writer.add_walks(walks)
+
+        corpus = WalkCorpus(self.path)
+        self.assertEqual(len(corpus), 3)
+        self.assertEqual(corpus.lengths.tolist(), [5, 4, 6])
+        self.assertEqual(corpus.vocab.token2idx, self.vocab.token2idx)
+        for walk, tokens in zip(walks, corpus):
+            decoded = [int(corpus.vocab.idx2token[idx]) for idx in tokens[1:-1].tolist()]
+            self.assertEqual(decoded, walk)
+            self.assertEqual(tokens[0].item(), self.vocab.token2idx['<START>'])
+            self.assertEqual(tokens[-1].item(), self.vocab.token2idx['<END>'])
+
+    def test_items_share_mapped_memory(self):
+        with CorpusWriter(self.path, self.vocab) as writer:
+            writer.add([1, 2, 3])
+        corpus = WalkCorpus(self.path)
+        item = corpus[0]
+        self.assertEqual(item.data_ptr(), corpus.tokens.ctypes.data)
+
+    def test_interrupted_write_is_not_a_corpus(self):
+        with CorpusWriter(self.path, self.vocab) as writer:
+            writer.add([1, 2, 3])
+        with self.assertRaises(KeyboardInterrupt):
+            with CorpusWriter(self.path, self.vocab) as writer:
+                writer.add([4, 5])
+                raise KeyboardInterrupt
+        with self.assertRaises(FileNotFoundError):
+            WalkCorpus(self.path)
+
+    def test_collator_pads_per_batch(self):
+        batch, = WalkCollator(0)([torch.tensor([1, 5, 2], dtype=torch.int32), torch.tensor([1, 2], dtype=torch.int32)])
+        self.assertEqual(batch.dtype, torch.long)
+        self.assertEqual(batch.tolist(), [[1, 5, 2], [1, 2, 0]])
+
+    def test_prepare_and_train_from_corpus(self):
+        graph = nx.gnp_random_graph(10, 0.9, seed=0, directed=True)
+        corpus, vocab = prepare_training_data(graph, 20, 3, 6, (AscenderRule({5}),), seed=0, corpus_path=self.path)
+        self.assertIsInstance(corpus, WalkCorpus)
+        self.assertEqual(len(corpus), 20 + 10)
+
+        again, _ = prepare_training_data(graph, 20, 3, 6, (AscenderRule({5}),), seed=0,
+                                         corpus_path=os.path.join(self.tmp.name, 'again'))
+        np.testing.assert_array_equal(np.asarray(corpus.tokens), np.asarray(again.tokens))
+
+        model = train_model(corpus, vocab, epochs=1, batch_size=8, learning_rate=0.001, device='cpu')
+        self.assertEqual(model.fc_out.out_features, len(vocab))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import networkx as nx
+import numpy as np
+from graphverse.data.streaming import WalkStream
+from graphverse.data.vocabulary import WalkVocabulary
+from graphverse.graph.csr import CSRGraph
+from graphverse.graph.rule_index import RuleIndex
+from graphverse.graph.rules import EvenRule, RepeaterRule
+from graphverse.llm.training import train_model
+
+class TestWalkStream(unittest.TestCase):
+    def setUp(self):
+        self.graph = CSRGraph.from_networkx(nx.complete_graph(20, create_using=nx.DiGraph))
+        self.rules = (EvenRule({4}), RepeaterRule({7: 3}))
+        self.vocab = WalkVocabulary.from_vertices(self.graph.nodes)
+
+    def assertValidEpoch(self, stream, budget):
+        walks = list(stream)
+        tokens = sum(len(walk) for walk in walks)
+        self.assertGreaterEqual(tokens, budget)
+        self.assertLess(tokens - len(walks[-1]), budget)
+        for walk in walks:
+            self.assertEqual(int(walk[0]), self.vocab.start_idx)
+            self.assertEqual(int(walk[-1]), self.vocab.end_idx)
+            vertices = self.vocab.decode(walk[1:-1].numpy()).tolist()
+            self.assertTrue(4 <= len(vertices) <= 8)
+            self.assertTrue(all(self.graph.has_edge(u, v) for u, v in zip(vertices, vertices[1:])))
+            self.assertTrue(all(rule.apply(self.graph, vertices) for rule in self.rules))
+        return walks
+
+    def test_inline_epochs(self):
+        stream = WalkStream(self.graph, self.rules, self.vocab, 4, 8, 500, workers=0, chunk_size=16, seed=0)
+        first = self.assertValidEpoch(stream, 500)
+        second = self.assertValidEpoch(stream, 500)
+        self.assertNotEqual([w.tolist() for w in first], [w.tolist() for w in second])
+
+        again = WalkStream(self.graph, self.rules, self.vocab, 4, 8, 500, workers=0, chunk_size=16, seed=0)
+        self.assertEqual([w.tolist() for w in list(again)], [w.tolist() for w in first])
+
+    def test_rules_are_indexed_once(self):
+        stream = WalkStream(self.graph, self.rules, self.vocab, 4, 8, 100, workers=0, batched=True, seed=0)
+        index, = stream.rules
+        self.assertIs(RuleIndex.from_rules(stream.rules, 20), index)
+        self.assertEqual(index.rule_sets(), (set(), set(), {4}, set(), {7: 3}))
+        self.assertValidEpoch(stream, 100)
+
+    def test_background_producers(self):
+        for batched in (False, True):
+            with WalkStream(self.graph, self.rules, self.vocab, 4, 8, 2000, workers=2, queue_size=2,
+                            chunk_size=32, batched=batched, seed=0) as stream:
+                self.assertValidEpoch(stream, 2000)
+                self.assertValidEpoch(stream, 2000)
+                producers = list(stream._producers)
+                self.assertEqual(len(producers), 2)
+            self.assertFalse(any(process.is_alive() for process in producers))
+
+    def test_train_model(self):
+        history = []
+        with WalkStream(self.graph, self.rules, self.vocab, 4, 8, 400, workers=1, chunk_size=16, seed=0) as stream:
+            model = train_model(stream, self.vocab, epochs=2, batch_size=8, learning_rate=1e-3, device='cpu',
+                                d_model=16, nhead=2, num_layers=1, dim_feedforward=32, history=history,
+                                pack_sequences=True)
+        self.assertEqual(len(history), 2)
+        self.assertTrue(all(np.isfinite(entry['loss']) for entry in history))
+        self.assertEqual(model.pos_encoder.pe.size(0), 10)
+        with self.assertRaises(ValueError):
+            train_model(stream, self.vocab, epochs=1, batch_size=8, learning_rate=1e-3, device='cpu',
+                        bucket_by_length=True)
+
+if __name__ == '__main__':
+    unittest.main()
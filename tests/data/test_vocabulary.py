@@ -0,0 +1,65 @@
+import json
+import os
+import pickle
+import tempfile
+import unittest
+import numpy as np
+import torch
+from graphverse.data.corpus import CorpusWriter, WalkCorpus, META_FILE
+from graphverse.data.vocabulary import WalkVocabulary
+
+
+class TestWalkVocabulary(unittest.TestCase):
+    def setUp(self):
+        self.vocab = WalkVocabulary([[5, 3, 5], [7, 3]])
+
+    def test_ids_in_order_of_first_appearance(self):
+        self.assertEqual(self.vocab.token2idx, {'<PAD>': 0, '<START>': 1, '<END>': 2, '5': 3, '3': 4, '7': 5})
+        self.assertEqual(self.vocab.idx2token[4], '3')
+        self.assertIs(self.vocab.idx2token, self.vocab.idx2token)
+        self.vocab.add_vertices([9])
+        self.assertEqual(self.vocab.idx2token[6], '9')
+        self.assertEqual(WalkVocabulary.from_vertices(range(4)).vertices.tolist(), [0, 1, 2, 3])
+
+    def test_batch_encode_and_decode(self):
+        walks = np.array([[5, 3], [7, 5]])
+        tokens = self.vocab.encode(walks)
+        self.assertEqual(tokens.tolist(), [[3, 4], [5, 3]])
+        self.assertEqual(self.vocab.decode(tokens).tolist(), walks.tolist())
+        self.assertTrue(torch.equal(self.vocab.encode(torch.from_numpy(walks)), torch.from_numpy(tokens)))
+        self.assertEqual(self.vocab.decode(torch.tensor([0, 1, 2, 5])).tolist(), [-1, -1, -1, 7])
+        self.assertEqual(self.vocab.encode(3), 4)
+        self.assertEqual(self.vocab.decode(3), 5)
+
+    def test_unknown_vertices(self):
+        with self.assertRaises(KeyError):
+            self.vocab.encode([3, 9])
+        self.assertEqual(self.vocab.encode([-2, 9, 7], missing=-1).tolist(), [-1, -1, 5])
+
+    def test_loads_string_keyed_vocabularies(self):
+        legacy = {'<PAD>': 0, '<START>': 1, '<END>': 2, '5': 3, '3': 4, '7': 5}
+        self.assertEqual(WalkVocabulary.from_token2idx(legacy).encode([5, 3, 7]).tolist(), [3, 4, 5])
+        self.assertEqual(WalkVocabulary.from_dict(self.vocab.to_dict()).token2idx, legacy)
+
+        # An instance pickled by the dict-based class
+        old = WalkVocabulary.__new__(WalkVocabulary)
+        old.__setstate__({'token2idx': legacy, 'idx2token': {v: k for k, v in legacy.items()}})
+        self.assertEqual(old.encode(7), 5)
+        self.assertEqual(pickle.loads(pickle.dumps(self.vocab)).token2idx, legacy)
+
+    def test_reads_version_1_corpus(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with CorpusWriter(tmp, self.vocab) as writer:
+                writer.add_walks([[5, 3], [7]])
+            with open(os.path.join(tmp, META_FILE)) as f:
+                meta = json.load(f)
+            meta.update(format_version=1, vocab=self.vocab.token2idx)
+            with open(os.path.join(tmp, META_FILE), 'w') as f:
+                json.dump(meta, f)
+            corpus = WalkCorpus(tmp)
+            self.assertEqual(corpus.vocab.token2idx, self.vocab.token2idx)
+            self.assertEqual(corpus[1].tolist(), [1, 5, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
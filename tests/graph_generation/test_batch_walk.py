@@ -0,0 +1,58 @@
+import unittest
+import networkx as nx
+import numpy as np
+from graphverse.graph.batch_walk import generate_walk_batch
+from graphverse.graph.csr import CSRGraph
+from graphverse.graph.rules import AscenderRule, DescenderRule, EvenRule, OddRule, RepeaterRule, EdgeExistenceRule
+from graphverse.graph.walk import check_rule_compliance
+from graphverse.data.preparation import prepare_training_data
+
+class TestBatchWalk(unittest.TestCase):
+    def setUp(self):
+        G = nx.gnp_random_graph(60, 0.2, seed=1, directed=True)
+        self.graph = CSRGraph.from_networkx(G)
+        self.rules = (
+            AscenderRule({30, 31}),
+            DescenderRule({28}),
+            EvenRule({10}),
+            OddRule({41}),
+            RepeaterRule({5: 3}),
+        )
+
+    def test_walks_follow_edges_and_rules(self):
+        walks, lengths = generate_walk_batch(self.graph, 300, 4, 12, self.rules, seed=0, batch_size=128)
+        self.assertEqual(walks.shape, (300, 12))
+        self.assertTrue(((lengths >= 4) & (lengths <= 12)).all())
+        for row, length in zip(walks, lengths):
+            walk = row[:length].tolist()
+            self.assertTrue((row[length:] == -1).all())
+            self.assertTrue(EdgeExistenceRule().apply(walk, self.graph))
+            self.assertTrue(check_rule_compliance(self.graph, walk, self.rules))
+
+    def test_reproducible_with_seed(self):
+        first = generate_walk_batch(self.graph, 50, 4, 12, self.rules, seed=3)
+        second = generate_walk_batch(self.graph, 50, 4, 12, self.rules, seed=3)
+        np.testing.assert_array_equal(first[0], second[0])
+        np.testing.assert_array_equal(first[1], second[1])
+
+    def test_start_vertices(self):
+        walks, lengths = generate_walk_batch(self.graph, None, 3, 6, self.rules, seed=0, start_vertices=[1, 2, 3])
+        self.assertEqual(walks[:, 0].tolist(), [1, 2, 3])
+
+    def test_follows_edge_probabilities(self):
+        G = nx.DiGraph()
+        G.add_edge(0, 1, probability=0.9)
+        G.add_edge(0, 2, probability=0.1)
+        G.add_edge(1, 0, probability=1.0)
+        G.add_edge(2, 0, probability=1.0)
+        walks, _ = generate_walk_batch(G, 2000, 2, 2, (), seed=0, start_vertices=[0] * 2000)
+        self.assertAlmostEqual((walks[:, 1] == 1).mean(), 0.9, delta=0.03)
+
+    def test_batched_training_data(self):
+        data, vocab = prepare_training_data(self.graph, 20, 4, 8, self.rules, batched=True, seed=0)
+        self.assertEqual(data.size(0), 20 + self.graph.number_of_nodes())
+        self.assertTrue((data[:, 0] == vocab.token2idx['<START>']).all())
+        self.assertEqual(int((data == vocab.token2idx['<END>']).sum()), data.size(0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import random
+import unittest
+import networkx as nx
+import numpy as np
+from graphverse.graph.csr import CSRGraph, as_csr
+from graphverse.graph.graph_generation import generate_random_csr_graph
+from graphverse.graph.rules import (AscenderRule, EdgeExistenceRule, define_ascenders, define_evens_odds,
+                                    define_repeaters)
+from graphverse.graph.walk import generate_valid_walk
+
+class TestCSRGraph(unittest.TestCase):
+    def setUp(self):
+        self.nx_graph = nx.DiGraph()
+        self.nx_graph.add_nodes_from(range(5))
+        self.nx_graph.add_edge(0, 2, probability=0.75)
+        self.nx_graph.add_edge(0, 1, probability=0.25)
+        self.nx_graph.add_edge(1, 2, probability=1.0)
+        self.nx_graph.add_edge(2, 3, probability=1.0)
+        self.nx_graph.add_edge(3, 4)
+        self.nx_graph.add_edge(4, 0)
+        self.graph = CSRGraph.from_networkx(self.nx_graph)
+
+    def test_layout(self):
+        self.assertEqual(self.graph.indptr.dtype, np.int32)
+        self.assertEqual(self.graph.indices.dtype, np.int32)
+        self.assertEqual(self.graph.probability.dtype, np.float32)
+        self.assertEqual(self.graph.number_of_nodes(), 5)
+        self.assertEqual(self.graph.number_of_edges(), 6)
+        self.assertEqual(list(self.graph.neighbors(0)), [1, 2])
+        np.testing.assert_allclose(self.graph.edge_probabilities(0), [0.25, 0.75])
+
+    def test_missing_probabilities_are_filled(self):
+        np.testing.assert_allclose(self.graph.edge_probabilities(3), [1.0])
+
+    def test_has_edge(self):
+        self.assertTrue(self.graph.has_edge(0, 2))
+        self.assertFalse(self.graph.has_edge(2, 0))
+        self.assertFalse(self.graph.has_edge(7, 0))
+
+    def test_nodes_attribute_and_call(self):
+        self.assertEqual(list(self.graph.nodes), list(range(5)))
+        self.assertEqual(set(self.graph.nodes()), set(range(5)))
+        self.assertEqual(len(self.graph.nodes), 5)
+        self.assertIn(np.int64(4), self.graph.nodes)
+        self.assertNotIn(5, self.graph.nodes())
+
+    def test_define_rules_on_csr_graph(self):
+        graph = generate_random_csr_graph(20, 2, 2, seed=0)
+        random.seed(0)
+        ascenders = define_ascenders(graph, 20, set())
+        evens, odds = define_evens_odds(graph, 20, ascenders)
+        self.assertTrue(evens | odds <= set(range(20)))
+        repeaters = define_repeaters(graph, 1, 2, 3, ascenders | evens | odds)
+        self.assertEqual(len(repeaters), 1)
+
+    def test_edge_keys(self):
+        keys = self.graph.edge_keys()
+        self.assertIs(self.graph.edge_keys(), keys)
+        self.assertEqual(keys.tolist(), sorted(u * 5 + v for u, v in self.nx_graph.edges()))
+        self.assertEqual(self.graph.has_edges([0, 2, 7, 3], [2, 0, 0, -1]).tolist(), [True, False, False, False])
+        self.graph.add_edges([2], [0])
+        self.assertTrue(self.graph.has_edges([2], [0])[0])
+
+    def test_round_trip(self):
+        G = self.graph.to_networkx()
+        self.assertEqual(set(G.edges()), set(self.nx_graph.edges()))
+        self.assertAlmostEqual(G[0][2]['probability'], 0.75)
+        self.assertIs(as_csr(self.graph), self.graph)
+
+    def test_walks_and_rules(self):
+        walk = generate_valid_walk(self.graph, 0, 4, 4, (AscenderRule({1}),))
+        self.assertEqual(len(walk), 4)
+        self.assertTrue(all(isinstance(v, int) for v in walk))
+        self.assertTrue(EdgeExistenceRule().apply(walk, self.graph))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import networkx as nx
+import numpy as np
+from graphverse.graph.csr import CSRGraph
+from graphverse.graph.graph_generation import generate_random_csr_graph, strongly_connected_labels
+
+class TestCSRGraphGeneration(unittest.TestCase):
+    def test_degrees_and_probabilities(self):
+        graph = generate_random_csr_graph(200, 5, 7, seed=0)
+        out_degree = np.diff(graph.indptr)
+        in_degree = np.bincount(graph.indices, minlength=200)
+        self.assertTrue((out_degree >= 7).all())
+        self.assertTrue((in_degree >= 5).all())
+        self.assertFalse((graph.edge_sources() == graph.indices).any())
+        totals = np.bincount(graph.edge_sources(), weights=graph.probability, minlength=200)
+        np.testing.assert_allclose(totals, 1.0, rtol=1e-5)
+
+    def test_strongly_connected(self):
+        graph = generate_random_csr_graph(300, 1, 1, seed=4)
+        self.assertTrue(nx.is_strongly_connected(graph.to_networkx()))
+
+    def test_dense_graph(self):
+        graph = generate_random_csr_graph(10, 9, 9, seed=0)
+        self.assertEqual(graph.number_of_edges(), 90)
+
+    def test_reproducible(self):
+        first = generate_random_csr_graph(100, 3, 3, seed=9)
+        second = generate_random_csr_graph(100, 3, 3, seed=9)
+        np.testing.assert_array_equal(first.indices, second.indices)
+        np.testing.assert_array_equal(first.probability, second.probability)
+
+    def test_strongly_connected_labels(self):
+        G = nx.DiGraph([(0, 1), (1, 0), (1, 2), (2, 3), (3, 2), (4, 4)])
+        labels = strongly_connected_labels(CSRGraph.from_networkx(G))
+        self.assertEqual(labels[0], labels[1])
+        self.assertEqual(labels[2], labels[3])
+        self.assertEqual(len(set(labels.tolist())), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import networkx as nx
+import numpy as np
+from graphverse.graph.csr import CSRGraph
+from graphverse.graph.parallel import MappedGraph, load_mapped_graph, spawn_seeds
+from graphverse.graph.rules import AscenderRule, EvenRule
+from graphverse.graph.walk import generate_multiple_walks, generate_per_node_walks, check_rule_compliance
+
+class TestParallelWalks(unittest.TestCase):
+    def setUp(self):
+        self.graph = nx.gnp_random_graph(40, 0.3, seed=2, directed=True)
+        self.rules = (AscenderRule({20}), EvenRule({8}))
+
+    def test_same_seed_same_corpus_for_any_worker_count(self):
+        single = generate_multiple_walks(self.graph, 300, 3, 8, self.rules, workers=1, seed=7)
+        pooled = generate_multiple_walks(self.graph, 300, 3, 8, self.rules, workers=3, seed=7)
+        self.assertEqual(single, pooled)
+        self.assertEqual(len(pooled), 300)
+        for walk in pooled:
+            self.assertTrue(check_rule_compliance(self.graph, walk, self.rules))
+
+    def test_per_node_walks(self):
+        single = generate_per_node_walks(self.graph, 3, 8, self.rules, workers=1, seed=1)
+        pooled = generate_per_node_walks(self.graph, 3, 8, self.rules, workers=2, seed=1)
+        self.assertEqual(single, pooled)
+        self.assertEqual([walk[0] for walk in pooled], sorted(walk[0] for walk in pooled))
+
+    def test_mapped_graph_round_trip(self):
+        graph = CSRGraph.from_networkx(self.graph)
+        with MappedGraph(graph) as path:
+            mapped = load_mapped_graph(path)
+            np.testing.assert_array_equal(mapped.indices, graph.indices)
+            self.assertIsInstance(mapped.indices.base, np.memmap)
+
+    def test_spawn_seeds(self):
+        self.assertEqual(spawn_seeds(3, 4), spawn_seeds(3, 4))
+        self.assertEqual(len(set(spawn_seeds(3, 4))), 4)
+
+if __name__ == '__main__':
+    unittest.main()
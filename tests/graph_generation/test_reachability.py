@@ -0,0 +1,56 @@
+import random
+import unittest
+import networkx as nx
+from graphverse.graph.csr import CSRGraph
+from graphverse.graph.reachability import ReachabilityIndex, generate_planned_walk, generate_planned_walks
+from graphverse.graph.rules import AscenderRule, EvenRule, OddRule, RepeaterRule, EdgeExistenceRule
+
+
+class TestReachability(unittest.TestCase):
+    def setUp(self):
+        # 0 -> 1 -> 2 is a dead end; 0 -> 3 leads into the cycle 3 -> 4 -> 5 -> 3
+        self.graph = CSRGraph.from_edges(6, [0, 1, 0, 3, 4, 5], [1, 2, 3, 4, 5, 3])
+
+    def test_reach_counts_remaining_vertices(self):
+        index = ReachabilityIndex(self.graph, (), max_length=8)
+        reach = index.reach(index.step((-1, 6, 2), 0))
+        self.assertEqual(reach[[0, 1, 2, 3]].tolist(), [7, 1, 0, 7])
+
+    def test_reach_respects_constraint_state(self):
+        index = ReachabilityIndex(self.graph, (OddRule({5}),), max_length=8)
+        state = index.step((-1, 6, 2), 5)
+        # Only odd vertices remain usable: 5 -> 3 and nothing after 3
+        self.assertEqual(index.reach(state)[5], 1)
+
+    def test_never_enters_dead_end(self):
+        rng = random.Random(0)
+        for _ in range(50):
+            walk = generate_planned_walk(self.graph, 0, 5, 5, (), rng=rng)
+            self.assertEqual(walk[:2], [0, 3])
+            self.assertEqual(len(walk), 5)
+
+    def test_trailing_sink_vertices(self):
+        # Vertex 4 has no out-edges, so the last edges belong to vertex 3
+        graph = CSRGraph.from_edges(5, [1, 2, 3, 3], [2, 1, 0, 1])
+        index = ReachabilityIndex(graph, (), max_length=4)
+        self.assertEqual(index.reach(index.step((-1, 5, 2), 3))[3], 3)
+        self.assertEqual(len(generate_planned_walk(graph, 3, 4, 4, ())), 4)
+
+    def test_unreachable_minimum_returns_none(self):
+        self.assertIsNone(generate_planned_walk(self.graph, 1, 3, 5, ()))
+
+    def test_walks_satisfy_rules(self):
+        rng = random.Random(1)
+        graph = nx.gnp_random_graph(40, 0.3, directed=True, seed=2)
+        rules = (AscenderRule({18, 21}), EvenRule({6, 30}), OddRule({9}), RepeaterRule({11: 3}),
+                 EdgeExistenceRule())
+        walks = generate_planned_walks(graph, 100, 5, 20, rules, rng=rng)
+        self.assertEqual(len(walks), 100)
+        for walk in walks:
+            self.assertTrue(5 <= len(walk) <= 20)
+            self.assertTrue(rules[-1].apply(walk, graph))
+            for rule in rules[:-1]:
+                self.assertTrue(rule.apply(graph, walk))
+
+if __name__ == '__main__':
+    unittest.main()
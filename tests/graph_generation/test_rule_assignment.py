@@ -0,0 +1,102 @@
+import random
+import unittest
+import networkx as nx
+import numpy as np
+from graphverse.graph.graph_generation import generate_random_csr_graph
+from graphverse.graph.rule_index import RuleIndex, assign_rules, ASCENDER, REPEATER
+from graphverse.graph.rules import (AscenderRule, DescenderRule, EvenRule, OddRule, RepeaterRule, RuleChecker,
+                                    define_all_rules)
+
+
+class TestRuleIndexRule(unittest.TestCase):
+    def setUp(self):
+        self.rules = (AscenderRule({10, 12}), DescenderRule({14}), EvenRule({4}), OddRule({7}),
+                      RepeaterRule({3: 4, 9: 2}))
+        self.index = RuleIndex.from_rules(self.rules, 20)
+
+    def test_checker_matches_separate_rules(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            walk = [rng.randrange(20)]
+            separate = RuleChecker(self.rules, walk)
+            indexed = RuleChecker((self.index,), walk)
+            for _ in range(15):
+                candidate = rng.randrange(20)
+                self.assertEqual(indexed.allows(candidate), separate.allows(candidate))
+                if separate.allows(candidate):
+                    separate.push(candidate)
+                    indexed.push(candidate)
+
+    def test_check_batch_matches_separate_rules(self):
+        rng = np.random.default_rng(0)
+        walks = rng.integers(0, 20, size=(400, 12))
+        lengths = rng.integers(1, 13, size=400)
+        results = [rule.check_batch(None, walks, lengths) for rule in self.rules]
+        passed, first = self.index.check_batch(None, walks, lengths)
+        self.assertEqual(passed.tolist(), np.logical_and.reduce([p for p, _ in results]).tolist())
+        firsts = np.array([np.where(f < 0, 99, f) for _, f in results]).min(axis=0)
+        self.assertEqual(first.tolist(), np.where(firsts == 99, -1, firsts).tolist())
+
+    def test_lookup_and_rule_sets(self):
+        self.assertEqual(self.index.lookup(3), (REPEATER, 4))
+        self.assertEqual(self.index.lookup(10), (ASCENDER, 0))
+        self.assertEqual(self.index.lookup(50), (0, 0))
+        self.assertEqual(self.index.rule_sets(), ({10, 12}, {14}, {4}, {7}, {3: 4, 9: 2}))
+
+
+class TestAssignRules(unittest.TestCase):
+    def assertLoops(self, graph, index):
+        for vertex in index.vertices(REPEATER).tolist():
+            period = int(index.rule_param[vertex])
+            # Some walk of exactly `period` steps returns to the repeater
+            frontier = {vertex}
+            for _ in range(period):
+                frontier = {int(w) for v in frontier for w in graph.neighbors(v)}
+            self.assertIn(vertex, frontier)
+
+    def test_csr_graph(self):
+        graph = generate_random_csr_graph(2000, 3, 3, seed=0)
+        index = assign_rules(graph, 2000, 20, 3, 6, seed=1)
+        self.assertEqual(len(index), 2000)
+        # At most one rule per vertex
+        flags = index.rule_type[index.rule_type > 0]
+        self.assertTrue(np.all(flags & (flags - 1) == 0))
+        self.assertEqual(len(index.vertices(REPEATER)), 20)
+        periods = index.rule_param[index.vertices(REPEATER)]
+        self.assertTrue(np.all((periods >= 3) & (periods <= 6)))
+        self.assertEqual(np.count_nonzero(index.rule_param), 20)
+        ascenders = index.vertices(ASCENDER)
+        self.assertTrue(np.all((ascenders >= 900) & (ascenders <= 1100)))
+
+        totals = np.bincount(graph.edge_sources(), weights=graph.probability, minlength=2000)
+        self.assertTrue(np.allclose(totals, 1.0, atol=1e-5))
+        self.assertLoops(graph, index)
+
+    def test_reproducible(self):
+        first = assign_rules(generate_random_csr_graph(300, 2, 2, seed=0), 300, 5, 2, 4, seed=3)
+        second = assign_rules(generate_random_csr_graph(300, 2, 2, seed=0), 300, 5, 2, 4, seed=3)
+        self.assertEqual(first.rule_type.tolist(), second.rule_type.tolist())
+        self.assertEqual(first.rule_param.tolist(), second.rule_param.tolist())
+
+    def test_networkx_graph_probabilities_are_renormalized(self):
+        G = nx.gnp_random_graph(100, 0.05, directed=True, seed=0)
+        for u in G:
+            for v in G[u]:
+                G[u][v]['probability'] = 1.0 / G.out_degree(u)
+        index = assign_rules(G, 100, 4, 3, 5, seed=0)
+        for u in G:
+            if G.out_degree(u):
+                self.assertAlmostEqual(sum(d['probability'] for d in G[u].values()), 1.0)
+        self.assertLoops(G, index)
+
+    def test_define_all_rules(self):
+        G = nx.gnp_random_graph(100, 0.05, directed=True, seed=0)
+        random.seed(0)
+        ascenders, descenders, evens, odds, repeaters = define_all_rules(G, 100, 3, 2, 4)
+        self.assertEqual(len(repeaters), 3)
+        self.assertEqual(len(evens), 10)
+        sets = [ascenders, descenders, evens, odds, set(repeaters)]
+        self.assertEqual(sum(len(s) for s in sets), len(set().union(*sets)))
+
+if __name__ == '__main__':
+    unittest.main()
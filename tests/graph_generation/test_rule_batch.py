@@ -0,0 +1,60 @@
+import random
+import unittest
+import networkx as nx
+import numpy as np
+from graphverse.graph.csr import CSRGraph
+from graphverse.graph.rules import (AscenderRule, DescenderRule, EvenRule, OddRule, RepeaterRule,
+                                    EdgeExistenceRule, Rule)
+
+
+def first_violation(rule, graph, walk):
+    for j in range(len(walk)):
+        prefix = walk[:j + 1]
+        ok = rule.apply(prefix, graph) if isinstance(rule, EdgeExistenceRule) else rule.apply(graph, prefix)
+        if not ok:
+            return j
+    return -1
+
+
+class TestRuleBatch(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.graph = nx.gnp_random_graph(30, 0.5, directed=True, seed=1)
+        self.walks = [[rng.randrange(30) for _ in range(rng.randint(1, 15))] for _ in range(500)]
+        self.lengths = np.array([len(walk) for walk in self.walks])
+        self.padded = np.full((len(self.walks), self.lengths.max()), -1)
+        for row, walk in enumerate(self.walks):
+            self.padded[row, :len(walk)] = walk
+
+    def assertMatchesApply(self, rule, graph):
+        passed, first = rule.check_batch(graph, self.padded, self.lengths)
+        expected = [first_violation(rule, self.graph, walk) for walk in self.walks]
+        self.assertEqual(first.tolist(), expected)
+        self.assertEqual(passed.tolist(), [e == -1 for e in expected])
+
+    def test_matches_apply(self):
+        rules = (AscenderRule({10, 12}), DescenderRule({20, 22}), EvenRule({4, 6}), OddRule({5, 7}),
+                 RepeaterRule({3: 3, 8: 4}))
+        for rule in rules:
+            self.assertMatchesApply(rule, self.graph)
+
+    def test_edge_existence_on_csr(self):
+        self.assertMatchesApply(EdgeExistenceRule(), CSRGraph.from_networkx(self.graph))
+
+    def test_repeater_gap(self):
+        walks = np.array([[7, 1, 2, 7, 7, -1], [7, 1, 7, 0, 0, 0]])
+        passed, first = RepeaterRule({7: 3}).check_batch(None, walks, [5, 3])
+        self.assertEqual(passed.tolist(), [False, False])
+        self.assertEqual(first.tolist(), [4, 2])
+
+    def test_fallback_for_rules_without_vectorized_form(self):
+        class NoSixRule(Rule):
+            def apply(self, graph, walk):
+                return 6 not in walk
+
+        passed, first = NoSixRule().check_batch(None, [[1, 6, 2], [6, 0, 0]], [3, 1])
+        self.assertEqual(passed.tolist(), [False, False])
+        self.assertEqual(first.tolist(), [1, 0])
+
+if __name__ == '__main__':
+    unittest.main()
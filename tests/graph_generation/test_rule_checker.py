@@ -0,0 +1,56 @@
+import random
+import unittest
+from graphverse.graph.rules import Rule, AscenderRule, DescenderRule, EvenRule, OddRule, RepeaterRule, RuleChecker
+from graphverse.graph.walk import check_rule_compliance
+
+class TestRuleChecker(unittest.TestCase):
+    def setUp(self):
+        self.rules = (
+            AscenderRule({10, 12}),
+            DescenderRule({14}),
+            EvenRule({4}),
+            OddRule({7}),
+            RepeaterRule({3: 4, 9: 2}),
+        )
+
+    def test_matches_full_rule_check(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            walk = [rng.randrange(20)]
+            checker = RuleChecker(self.rules, walk)
+            for _ in range(15):
+                candidate = rng.randrange(20)
+                expected = check_rule_compliance(None, walk + [candidate], self.rules)
+                self.assertEqual(checker.allows(candidate), expected)
+                if expected:
+                    walk.append(candidate)
+                    checker.push(candidate)
+
+    def test_push_pop_restores_state(self):
+        checker = RuleChecker(self.rules, [3])
+        checker.push(10)
+        self.assertFalse(checker.allows(9))
+        self.assertEqual(checker.pop(), 10)
+        self.assertTrue(checker.allows(9))
+        self.assertFalse(checker.allows(3))
+        for vertex in (1, 2, 11):
+            checker.push(vertex)
+        self.assertTrue(checker.allows(3))
+        self.assertEqual(checker.walk, [3, 1, 2, 11])
+
+    def test_parity_conflict_blocks_everything(self):
+        checker = RuleChecker((EvenRule({4}), OddRule({4})), [4])
+        self.assertFalse(checker.allows(2))
+        self.assertFalse(checker.allows(5))
+
+    def test_rules_without_incremental_hooks_fall_back_to_apply(self):
+        class NoSixRule(Rule):
+            def apply(self, graph, walk):
+                return 6 not in walk
+
+        checker = RuleChecker((NoSixRule(),), [1])
+        self.assertFalse(checker.allows(6))
+        self.assertTrue(checker.allows(5))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import random
+import unittest
+from collections import Counter
+import numpy as np
+from graphverse.graph.csr import CSRGraph
+from graphverse.graph.sampling import AliasTable, choose_weighted
+
+
+class TestAliasSampling(unittest.TestCase):
+    def setUp(self):
+        self.graph = CSRGraph.from_edges(4, [0, 0, 0, 0, 1, 2], [0, 1, 2, 3, 2, 0],
+                                         probability=[0.1, 0.2, 0.3, 0.4, 1.0, 0.0])
+        self.rng = random.Random(0)
+
+    def frequencies(self, draw, samples=40000):
+        counts = Counter(draw() for _ in range(samples))
+        return {k: v / samples for k, v in counts.items()}
+
+    def test_alias_table_follows_edge_probabilities(self):
+        table = self.graph.alias_table()
+        self.assertIs(table, self.graph.alias_table())
+        freq = self.frequencies(lambda: table.sample(0, self.rng))
+        for vertex, p in enumerate([0.1, 0.2, 0.3, 0.4]):
+            self.assertAlmostEqual(freq[vertex], p, delta=0.01)
+
+    def test_renormalizes_over_admitted_neighbors(self):
+        table = self.graph.alias_table()
+        freq = self.frequencies(lambda: table.sample_admitted(0, lambda v: v in (1, 3), self.rng))
+        self.assertEqual(set(freq), {1, 3})
+        self.assertAlmostEqual(freq[1], 1 / 3, delta=0.01)
+        # Rejection falls back to explicit renormalization when admitted mass is tiny
+        freq = self.frequencies(lambda: table.sample_admitted(0, lambda v: v in (0, 1), self.rng, 1))
+        self.assertAlmostEqual(freq[0], 1 / 3, delta=0.01)
+
+    def test_zero_weight_rows_and_dead_ends(self):
+        table = self.graph.alias_table()
+        self.assertEqual(table.sample(2, self.rng), 0)
+        self.assertIsNone(table.sample(3, self.rng))
+        self.assertIsNone(table.sample_admitted(1, lambda v: False, self.rng))
+
+    def test_alias_tables_are_exact(self):
+        probability = np.random.default_rng(0).random(50)
+        table = AliasTable([0, 50], np.arange(50), probability)
+        mass = table.accept.copy()
+        np.add.at(mass, table.alias, 1 - table.accept)
+        self.assertTrue(np.allclose(mass / 50, probability / probability.sum()))
+
+    def test_choose_weighted(self):
+        self.assertEqual(choose_weighted(['a', 'b'], [0.0, 2.0], self.rng), 'b')
+        self.assertIn(choose_weighted(['a', 'b'], [0.0, 0.0], self.rng), ('a', 'b'))
+
+if __name__ == '__main__':
+    unittest.main()
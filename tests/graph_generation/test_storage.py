@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+import networkx as nx
+import numpy as np
+from graphverse.graph.csr import CSRGraph
+from graphverse.graph.graph_generation import save_graph, load_graph
+from graphverse.graph.rules import AscenderRule, DescenderRule, EvenRule, OddRule, RepeaterRule, EdgeExistenceRule
+from graphverse.graph.rule_index import RuleIndex
+
+
+class TestGraphStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'graph.gvg')
+        self.graph = CSRGraph.from_edges(5, [0, 0, 1, 2, 3, 4], [1, 2, 3, 4, 0, 1],
+                                         probability=[0.25, 0.75, 1.0, 1.0, 1.0, 1.0])
+        self.rules = (AscenderRule({3}), DescenderRule({1}), EvenRule({2, 4}), OddRule(set()),
+                      RepeaterRule({0: 3}), EdgeExistenceRule())
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assertSameGraph(self, graph):
+        self.assertTrue(np.array_equal(graph.indptr, self.graph.indptr))
+        self.assertTrue(np.array_equal(graph.indices, self.graph.indices))
+        self.assertTrue(np.array_equal(graph.probability, self.graph.probability))
+
+    def test_round_trip_with_rules(self):
+        save_graph(self.graph, self.path, self.rules)
+        for mmap in (False, True):
+            graph, rules = load_graph(self.path, mmap=mmap, with_rules=True)
+            self.assertSameGraph(graph)
+            self.assertEqual([type(rule) for rule in rules], [type(rule) for rule in self.rules])
+            self.assertEqual(rules[0].ascenders, {3})
+            self.assertEqual(rules[2].evens, {2, 4})
+            self.assertEqual(rules[3].odds, set())
+            self.assertEqual(rules[4].repeaters, {0: 3})
+            self.assertIsInstance(next(iter(rules[0].ascenders)), int)
+
+    def test_rule_index_round_trip(self):
+        index = RuleIndex.from_rules(self.rules, 5)
+        save_graph(self.graph, self.path, (index,))
+        for mmap in (False, True):
+            _, (loaded,) = load_graph(self.path, mmap=mmap, with_rules=True)
+            self.assertIsInstance(loaded, RuleIndex)
+            self.assertEqual(loaded.rule_type.tolist(), index.rule_type.tolist())
+            self.assertEqual(loaded.rule_param.tolist(), [3, 0, 0, 0, 0])
+
+    def test_mmap_maps_arrays(self):
+        save_graph(self.graph, self.path)
+        graph = load_graph(self.path, mmap=True)
+        self.assertIsInstance(graph.indices.base, np.memmap)
+        self.assertEqual(graph.indices.ctypes.data % 64, 0)
+
+    def test_networkx_graph_and_legacy_gml(self):
+        G = nx.DiGraph()
+        G.add_edge(0, 1, probability=1.0)
+        G.add_edge(1, 0, probability=1.0)
+        save_graph(G, self.path)
+        self.assertEqual(list(load_graph(self.path).neighbors(0)), [1])
+
+        gml = os.path.join(self.tmp.name, 'graph.gml')
+        nx.write_gml(G, gml)
+        graph = load_graph(gml)
+        self.assertIsInstance(graph, nx.DiGraph)
+        self.assertTrue(graph.has_edge(1, 0))
+        self.assertIn(0, graph.nodes)
+        self.assertEqual(graph[0][1]['probability'], 1.0)
+
+        converted = load_graph(self.path, as_networkx=True)
+        self.assertIsInstance(converted, nx.DiGraph)
+        self.assertEqual(set(converted.edges()), {(0, 1), (1, 0)})
+
+    def test_default_path_falls_back_to_gml(self):
+        G = nx.DiGraph()
+        G.add_edge(0, 1, probability=1.0)
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        try:
+            nx.write_gml(G, 'my_graph.gml')
+            self.assertIsInstance(load_graph(), nx.DiGraph)
+            save_graph(G)
+            self.assertIsInstance(load_graph(), CSRGraph)
+        finally:
+            os.chdir(cwd)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import contextlib
+import io
+import logging
+import random
+import unittest
+import networkx as nx
+from graphverse.data.preparation import prepare_training_data
+from graphverse.graph.rules import EvenRule, OddRule
+from graphverse.graph.walk import generate_multiple_walks
+from graphverse.metrics import WalkMetrics
+
+
+class TestWalkMetrics(unittest.TestCase):
+    def setUp(self):
+        self.graph = nx.gnp_random_graph(30, 0.9, directed=True, seed=0)
+        self.rules = (EvenRule({2, 4}), OddRule({3}))
+
+    def test_walks_are_quiet_by_default(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            generate_multiple_walks(self.graph, 5, 3, 6, self.rules, rng=random.Random(0))
+        self.assertEqual(out.getvalue(), '')
+
+    def test_counters_and_histogram(self):
+        metrics = WalkMetrics()
+        walks = generate_multiple_walks(self.graph, 50, 3, 6, self.rules, rng=random.Random(0), metrics=metrics)
+        summary = metrics.summary()
+        self.assertEqual(summary['counters']['walks'], 50)
+        self.assertEqual(sum(summary['walk_lengths'].values()), 50)
+        self.assertEqual(summary['walk_lengths'], {n: sum(len(w) == n for w in walks)
+                                                   for n in sorted({len(w) for w in walks})})
+        self.assertGreaterEqual(summary['counters']['steps'], sum(len(w) - 1 for w in walks))
+        self.assertTrue(set(summary['rejections']) <= {'EvenRule', 'OddRule'})
+
+    def test_stage_timers_and_progress(self):
+        metrics = WalkMetrics(progress_every=10)
+        with self.assertLogs('graphverse.metrics', level=logging.INFO) as logs:
+            prepare_training_data(self.graph, 20, 3, 6, self.rules, metrics=metrics)
+        self.assertEqual(set(metrics.timers), {'per_node_walks', 'walks', 'encode'})
+        self.assertEqual(metrics.counters['walks'], 50)
+        self.assertEqual(len(logs.output), 5)
+
+if __name__ == '__main__':
+    unittest.main()
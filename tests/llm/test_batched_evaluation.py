@@ -0,0 +1,102 @@
+import unittest
+import networkx as nx
+import pandas as pd
+import torch
+from graphverse.data.vocabulary import WalkVocabulary
+from graphverse.graph.rules import AscenderRule, EvenRule, RepeaterRule
+from graphverse.llm.evaluation import evaluate_model, evaluate_model_batched, _decode_batch, STOP_REASONS
+from graphverse.llm.model import WalkTransformer
+
+
+class TestBatchedEvaluation(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        self.graph = nx.complete_graph(20, create_using=nx.DiGraph)
+        self.vocab = WalkVocabulary([list(range(20))])
+        self.model = WalkTransformer(len(self.vocab), d_model=32, nhead=4, num_layers=2,
+                                     dim_feedforward=64, causal=True).eval()
+        self.rules = (AscenderRule({10}), EvenRule({4}), RepeaterRule({7: 3}))
+        self.token_vertex = torch.full((len(self.vocab),), -1, dtype=torch.long)
+        for idx, token in self.vocab.idx2token.items():
+            if token.isdigit():
+                self.token_vertex[idx] = int(token)
+
+    def greedy(self, prompt, max_new_tokens):
+        tokens = [self.vocab.token2idx[str(v)] for v in prompt]
+        generated = []
+        with torch.no_grad():
+            for _ in range(max_new_tokens):
+                idx = self.model(torch.tensor([tokens]))[0, -1].argmax().item()
+                if self.token_vertex[idx] < 0:
+                    break
+                generated.append(int(self.token_vertex[idx]))
+                tokens.append(idx)
+        return generated
+
+    def test_batch_decoding_matches_single_prompts(self):
+        prompts = [[3], [5, 8, 1, 2], [0, 9]]
+        decoded, reasons = _decode_batch(self.model, prompts, self.vocab, self.token_vertex, 0, 6,
+                                         torch.device('cpu'))
+        self.assertEqual(decoded, [self.greedy(prompt, 6) for prompt in prompts])
+        for vertices, reason in zip(decoded, reasons):
+            self.assertEqual(reason == 'max_new_tokens', len(vertices) == 6)
+
+    def test_records_feed_pandas_analysis(self):
+        results = evaluate_model_batched(self.model, self.graph, self.vocab, num_samples=10,
+                                         min_start_length=1, max_start_length=5, rules=self.rules,
+                                         batch_size=4, max_new_tokens=8, seed=0)
+        self.assertEqual(len(results), 10)
+        for result in results:
+            self.assertEqual(result['generated_walk'][:len(result['start_walk'])], result['start_walk'])
+            self.assertLessEqual(len(result['generated_walk']) - len(result['start_walk']), 8)
+        df = pd.DataFrame(results)
+        self.assertEqual(list(df.columns), ['start_walk', 'generated_walk', 'stop_reason', 'rule_violations'])
+        pd.json_normalize(df['rule_violations'].explode().dropna().tolist())
+
+
+class TestStopAwareEvaluation(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        self.vocab = WalkVocabulary([list(range(20))])
+        self.model = WalkTransformer(len(self.vocab), d_model=32, nhead=4, num_layers=2,
+                                     dim_feedforward=64, causal=True).eval()
+
+    def evaluate(self, graph, rules, max_new_tokens):
+        single = evaluate_model(self.model, graph, self.vocab, 6, 1, 4, rules, max_new_tokens=max_new_tokens)
+        batched = evaluate_model_batched(self.model, graph, self.vocab, 6, 1, 4, rules, batch_size=4,
+                                         max_new_tokens=max_new_tokens, seed=0)
+        return single + batched
+
+    def always_predict(self, token):
+        with torch.no_grad():
+            self.model.fc_out.weight.zero_()
+            self.model.fc_out.bias.fill_(-10.0)
+            self.model.fc_out.bias[token] = 10.0
+
+    def test_generation_is_bounded(self):
+        graph = nx.complete_graph(20, create_using=nx.DiGraph)
+        for result in self.evaluate(graph, (EvenRule({4}),), 5):
+            new = result['generated_walk'][len(result['start_walk']) - 1:]
+            self.assertIn(result['stop_reason'], STOP_REASONS)
+            self.assertEqual(result['stop_reason'] == 'max_new_tokens', len(new) == 6)
+            self.assertTrue(all(graph.has_edge(u, v) for u, v in zip(new, new[1:])))
+
+    def test_stops_on_end_and_pad(self):
+        graph = nx.complete_graph(20, create_using=nx.DiGraph)
+        for token, reason in ((self.vocab.end_idx, 'end'), (self.vocab.pad_idx, 'pad')):
+            self.always_predict(token)
+            for result in self.evaluate(graph, (), 50):
+                self.assertEqual(result['stop_reason'], reason)
+                self.assertEqual(result['generated_walk'], result['start_walk'])
+
+    def test_stops_on_invalid_edge(self):
+        graph = nx.cycle_graph(20, create_using=nx.DiGraph)
+        self.always_predict(self.vocab.encode(0))
+        for result in self.evaluate(graph, (), 50):
+            self.assertEqual(result['stop_reason'], 'invalid_edge')
+            new = result['generated_walk'][len(result['start_walk']):]
+            self.assertEqual(new, [0] if result['start_walk'][-1] == 19 else [])
+
+
+if __name__ == '__main__':
+    unittest.main()
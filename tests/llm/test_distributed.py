@@ -0,0 +1,47 @@
+import contextlib
+import io
+import unittest
+import torch
+from graphverse.data.vocabulary import WalkVocabulary
+from graphverse.llm.training import train_model
+
+SMALL = {'d_model': 32, 'nhead': 4, 'num_layers': 1, 'dim_feedforward': 64, 'dropout': 0.0}
+
+
+class TestDistributedTraining(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        self.vocab = WalkVocabulary([list(range(10))])
+        lengths = torch.randint(4, 13, (27,))
+        self.data = torch.full((27, 12), self.vocab.token2idx['<PAD>'])
+        for row, length in enumerate(lengths):
+            self.data[row, :length] = torch.randint(3, len(self.vocab), (int(length),))
+
+    def train(self, **options):
+        history = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            model = train_model(self.data, self.vocab, epochs=2, batch_size=8, learning_rate=0.01, device='cpu',
+                                seed=0, history=history, **dict(SMALL, **options))
+        return model, [h['loss'] for h in history]
+
+    def test_matches_single_process(self):
+        single, single_losses = self.train()
+        # The last global batch has 3 walks, so one of four ranks gets none
+        for world_size in (2, 4):
+            model, losses = self.train(world_size=world_size)
+            for a, b in zip(losses, single_losses):
+                self.assertAlmostEqual(a, b, places=5)
+            with torch.no_grad():
+                self.assertTrue(torch.allclose(model.eval()(self.data), single.eval()(self.data), atol=1e-4))
+
+    def test_bucketed_packed_and_accumulated(self):
+        for options in ({'bucket_by_length': True}, {'pack_sequences': True, 'causal': True},
+                        {'accumulation_steps': 2}):
+            _, single_losses = self.train(**options)
+            _, losses = self.train(world_size=2, **options)
+            for a, b in zip(losses, single_losses):
+                self.assertAlmostEqual(a, b, places=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
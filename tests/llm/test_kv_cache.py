@@ -0,0 +1,49 @@
+import unittest
+import torch
+from graphverse.llm.model import WalkTransformer
+
+
+class TestKVCache(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        self.src = torch.randint(3, 20, (2, 8))
+
+    def model(self, causal):
+        model = WalkTransformer(20, d_model=32, nhead=4, num_layers=2, dim_feedforward=64, causal=causal)
+        return model.eval()
+
+    def test_incremental_matches_full_forward(self):
+        model = self.model(causal=True)
+        with torch.no_grad():
+            full = model(self.src)
+            logits, cache = model.forward_incremental(self.src[:, :3])
+            steps = [logits]
+            for t in range(3, self.src.size(1)):
+                logits, cache = model.forward_incremental(self.src[:, t:t + 1], cache)
+                steps.append(logits)
+        self.assertEqual(len(cache), self.src.size(1))
+        self.assertTrue(torch.allclose(torch.cat(steps, dim=1), full, atol=1e-5))
+
+    def test_left_padding_is_ignored(self):
+        model = self.model(causal=True)
+        padded = torch.cat([torch.zeros(2, 2, dtype=torch.long), self.src], dim=1)
+        padding_mask = torch.zeros_like(padded, dtype=torch.bool)
+        padding_mask[:, :2] = True
+        with torch.no_grad():
+            full = model(self.src)
+            logits, cache = model.forward_incremental(padded[:, :5], padding_mask=padding_mask[:, :5])
+            logits_next, _ = model.forward_incremental(padded[:, 5:6], cache)
+        self.assertTrue(torch.allclose(logits[:, 2:], full[:, :3], atol=1e-5))
+        self.assertTrue(torch.allclose(logits_next[:, 0], full[:, 3], atol=1e-5))
+
+    def test_non_causal_model_recomputes(self):
+        model = self.model(causal=False)
+        with torch.no_grad():
+            full = model(self.src)
+            _, cache = model.forward_incremental(self.src[:, :4])
+            logits, _ = model.forward_incremental(self.src[:, 4:], cache)
+        self.assertTrue(torch.allclose(logits, full[:, 4:], atol=1e-5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -20,5 +20,34 @@ class TestLLMModel(unittest.TestCase):
         
         self.assertEqual(output.shape, (batch_size, seq_length, vocab_size))
 
+    def test_causal_model_ignores_future_tokens(self):
+        torch.manual_seed(0)
+        model = WalkTransformer(20, 32, 4, 2, 64, causal=True).eval()
+        x = torch.randint(3, 20, (4, 10))
+        changed = x.clone()
+        changed[:, 6:] = 0
+        with torch.no_grad():
+            self.assertTrue(torch.allclose(model(x)[:, :6], model(changed)[:, :6], atol=1e-5))
+
+    def test_causal_by_default(self):
+        self.assertTrue(WalkTransformer(20, 32, 4, 2, 64).causal)
+        self.assertFalse(WalkTransformer(20, 32, 4, 2, 64, causal=False).causal)
+
+    def test_padding_mask_hides_padding(self):
+        torch.manual_seed(0)
+        model = WalkTransformer(20, 32, 4, 2, 64, causal=False).eval()
+        x = torch.randint(3, 20, (3, 6))
+        padded = torch.cat([x, torch.zeros((3, 4), dtype=torch.long)], dim=1)
+        padding_mask = padded == 0
+        padding_mask[1:, 4:6] = True  # rows of different lengths
+        with torch.no_grad():
+            full = model(x)
+            masked = model(padded, padding_mask=padding_mask)
+            short = model(x[1:, :4])
+        self.assertTrue(torch.allclose(masked[0, :6], full[0], atol=1e-5))
+        self.assertTrue(torch.allclose(masked[1:, :4], short, atol=1e-5))
+        model.train()
+        self.assertTrue(torch.isfinite(model(padded, padding_mask=padding_mask)).all())
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
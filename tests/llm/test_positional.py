@@ -0,0 +1,101 @@
+import contextlib
+import io
+import unittest
+from unittest import mock
+import torch
+from graphverse.data.vocabulary import WalkVocabulary
+from graphverse.llm.model import WalkTransformer
+from graphverse.llm.positional import POSITIONAL_ENCODINGS, alibi_slopes, sinusoid
+from graphverse.llm.training import train_model
+
+
+class TestPositional(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        self.src = torch.randint(3, 20, (2, 10))
+
+    def model(self, positional, causal=True, max_len=16):
+        return WalkTransformer(20, d_model=32, nhead=4, num_layers=2, dim_feedforward=64, causal=causal,
+                               positional=positional, max_len=max_len).eval()
+
+    def test_incremental_decoding_matches_forward(self):
+        for positional in POSITIONAL_ENCODINGS:
+            model = self.model(positional)
+            padded = torch.cat([torch.zeros((2, 2), dtype=torch.long), self.src], dim=1)
+            padding_mask = padded == 0
+            with torch.no_grad():
+                full = model(self.src)
+                logits, cache = model.forward_incremental(padded[:, :6], padding_mask=padding_mask[:, :6])
+                steps = [logits[:, 2:]]
+                for t in range(6, padded.size(1)):
+                    logits, cache = model.forward_incremental(padded[:, t:t + 1], cache)
+                    steps.append(logits)
+            self.assertTrue(torch.allclose(torch.cat(steps, dim=1), full, atol=1e-5), positional)
+
+    def test_position_offset(self):
+        for positional in POSITIONAL_ENCODINGS:
+            model = self.model(positional, causal=False)
+            positions = torch.arange(5, 15).expand(2, -1)
+            with torch.no_grad():
+                self.assertTrue(torch.allclose(model(self.src, position_offset=5),
+                                               model(self.src, positions=positions), atol=1e-6))
+        # Relative positions only see distances, so shifting every token changes nothing
+        for positional in ('rotary', 'alibi'):
+            model = self.model(positional)
+            with torch.no_grad():
+                self.assertTrue(torch.allclose(model(self.src), model(self.src, position_offset=1000), atol=1e-4))
+
+    def test_positions_past_max_len(self):
+        model = self.model('sinusoidal', max_len=4)
+        self.assertNotIn('pos_encoder.pe', model.state_dict())
+        positions = torch.arange(10)
+        self.assertTrue(torch.allclose(model.pos_encoder.encode(positions), sinusoid(positions, 32)))
+        with torch.no_grad():
+            self.assertEqual(model(self.src).shape, (2, 10, 20))
+            self.assertEqual(self.model('learned', max_len=4)(self.src).shape, (2, 10, 20))
+
+    def test_encode_does_not_read_back_positions(self):
+        encoder = self.model('sinusoidal', max_len=4).pos_encoder
+        positions = torch.tensor([[2], [7]])
+        with mock.patch.object(torch.Tensor, '__int__', side_effect=AssertionError), \
+                mock.patch.object(torch.Tensor, 'item', side_effect=AssertionError):
+            encoded = encoder.encode(positions)
+        self.assertTrue(torch.allclose(encoded, sinusoid(positions, 32)))
+
+    def test_loads_checkpoints_with_position_table(self):
+        model = self.model('sinusoidal')
+        state = model.state_dict()
+        state['pos_encoder.pe'] = torch.zeros(5000, 1, 32)
+        model.load_state_dict(state)
+        self.assertEqual(len(model.pos_encoder.pe), 16)
+
+    def test_alibi_slopes(self):
+        self.assertEqual(alibi_slopes(4).tolist(), [0.25, 0.0625, 0.015625, 0.00390625])
+        self.assertEqual(len(alibi_slopes(6)), 6)
+        with self.assertRaises(ValueError):
+            self.model('absolute')
+
+    def test_no_dropout_in_eval(self):
+        model = WalkTransformer(20, 32, 4, 1, 64, dropout=0.5, positional='rotary').eval()
+        with torch.no_grad():
+            self.assertTrue(torch.equal(model(self.src), model(self.src)))
+
+    def test_train_sizes_table_to_longest_walk(self):
+        vocab = WalkVocabulary([list(range(10))])
+        data = torch.randint(3, len(vocab), (16, 9))
+        data[:, 7:] = vocab.token2idx['<PAD>']
+        for positional in POSITIONAL_ENCODINGS:
+            with contextlib.redirect_stdout(io.StringIO()):
+                model = train_model(data, vocab, epochs=1, batch_size=8, learning_rate=0.01, device='cpu',
+                                    d_model=32, nhead=4, num_layers=1, dim_feedforward=64,
+                                    positional=positional, pack_sequences=True)
+            self.assertEqual(model.fc_out.out_features, len(vocab))
+        self.assertEqual(len(model.pos_encoder.slopes), 4)
+        with contextlib.redirect_stdout(io.StringIO()):
+            model = train_model(data, vocab, epochs=1, batch_size=8, learning_rate=0.01, device='cpu',
+                                d_model=32, nhead=4, num_layers=1, dim_feedforward=64)
+        self.assertEqual(len(model.pos_encoder.pe), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+import torch
+from graphverse.data.batching import LengthBucketSampler
+from graphverse.data.vocabulary import WalkVocabulary
+from graphverse.llm.training import train_model
+
+SMALL = {'d_model': 32, 'nhead': 4, 'num_layers': 1, 'dim_feedforward': 64}
+
+
+class TestTrainingOptions(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        self.vocab = WalkVocabulary([list(range(10))])
+        self.data = torch.randint(3, len(self.vocab), (40, 12))
+
+    def train(self, **options):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return train_model(self.data, self.vocab, batch_size=8, learning_rate=0.01, device='cpu',
+                               **dict(SMALL, **options))
+
+    def test_model_size_and_history(self):
+        history = []
+        model = self.train(epochs=2, history=history)
+        self.assertEqual(model.d_model, 32)
+        self.assertEqual(len(model.transformer.layers), 1)
+        self.assertEqual([h['epoch'] for h in history], [1, 2])
+        self.assertEqual(history[0]['tokens'], 40 * 11)
+        self.assertGreater(history[0]['tokens_per_sec'], 0)
+
+    def test_bf16_compile_and_accumulation(self):
+        history = []
+        self.train(epochs=1, precision='bf16', compile_model='eager', accumulation_steps=3, history=history)
+        self.assertTrue(torch.isfinite(torch.tensor(history[0]['loss'])))
+        with self.assertRaises(ValueError):
+            self.train(epochs=1, precision='fp8')
+
+    def test_resume_from_checkpoint(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'checkpoint.pt')
+            self.train(epochs=1, checkpoint_path=path, checkpoint_every=2)
+            self.assertEqual(torch.load(path, weights_only=False)['epoch'], 1)
+
+            history = []
+            model = self.train(epochs=2, checkpoint_path=path, history=history)
+            self.assertEqual([h['epoch'] for h in history], [2])
+            saved = torch.load(path, weights_only=False)
+            self.assertEqual(saved['epoch'], 2)
+            self.assertTrue(torch.equal(saved['model']['fc_out.weight'], model.fc_out.weight))
+
+            with self.assertRaises(ValueError):
+                self.train(epochs=3, checkpoint_path=path, d_model=16)
+
+    def test_resume_mid_epoch_replays_shuffle(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'checkpoint.pt')
+            torch.manual_seed(1)
+            self.train(epochs=1, checkpoint_path=path, checkpoint_every=2)
+            state = torch.load(path, weights_only=False)
+            state.update(epoch=0, batches_done=4)
+            torch.save(state, path)
+            history = []
+            self.train(epochs=1, checkpoint_path=path, history=history)
+            self.assertEqual(history[0]['tokens'], 8 * 11)
+
+    def test_resume_keeps_bucket_order_without_seed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'checkpoint.pt')
+            torch.manual_seed(1)
+            self.train(epochs=1, checkpoint_path=path, checkpoint_every=2, bucket_by_length=True)
+            state = torch.load(path, weights_only=False)
+            state.update(epoch=0, batches_done=4)
+            torch.save(state, path)
+            # A new process starts from a different initial seed
+            torch.manual_seed(2)
+            with mock.patch('graphverse.llm.training.LengthBucketSampler', wraps=LengthBucketSampler) as sampler:
+                self.train(epochs=1, checkpoint_path=path, bucket_by_length=True)
+            self.assertEqual(sampler.call_args.kwargs['seed'], state['sampler_seed'])
+            self.assertEqual(torch.load(path, weights_only=False)['sampler_seed'], state['sampler_seed'])
+
+if __name__ == '__main__':
+    unittest.main()
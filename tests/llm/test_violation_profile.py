@@ -0,0 +1,64 @@
+import random
+import unittest
+import networkx as nx
+import numpy as np
+from graphverse.graph.rules import (AscenderRule, DescenderRule, EvenRule, OddRule, RepeaterRule,
+                                    EdgeExistenceRule, ViolationProfiler, violation_profile)
+from graphverse.llm.evaluation import count_rule_violations, walk_violation_profile
+
+
+def prefix_compliant(walk, graph, rule):
+    if isinstance(rule, EdgeExistenceRule):
+        return rule.apply(walk, graph)
+    return rule.apply(graph, walk)
+
+
+class TestViolationProfile(unittest.TestCase):
+    def setUp(self):
+        self.graph = nx.gnp_random_graph(30, 0.5, directed=True, seed=1)
+        self.rules = (AscenderRule({10, 12}), DescenderRule({20, 22}), EvenRule({4, 6}), OddRule({5, 7}),
+                      RepeaterRule({3: 3, 8: 4}), EdgeExistenceRule())
+        rng = random.Random(0)
+        self.walks = [[rng.randrange(30) for _ in range(rng.randint(0, 15))] for _ in range(300)]
+
+    def test_first_violations_match_prefix_checks(self):
+        for walk in self.walks:
+            broken, first = walk_violation_profile(walk, self.graph, self.rules)
+            self.assertEqual(broken.shape, (len(self.rules), len(walk)))
+            for r, rule in enumerate(self.rules):
+                expected = next((j for j in range(len(walk))
+                                 if not prefix_compliant(walk[:j + 1], self.graph, rule)), -1)
+                self.assertEqual(first[r], expected)
+                if expected >= 0:
+                    self.assertTrue(broken[r, expected])
+                    self.assertFalse(broken[r, :expected].any())
+
+    def test_count_rule_violations_counts_broken_prefixes(self):
+        for walk in self.walks[:100]:
+            expected = sum(not all(prefix_compliant(walk[:i + 1], self.graph, rule) for rule in self.rules)
+                           for i in range(len(walk)))
+            self.assertEqual(count_rule_violations(walk, self.graph, self.rules), expected)
+
+    def test_batch_matches_single_walks(self):
+        lengths = np.array([len(walk) for walk in self.walks])
+        padded = np.full((len(self.walks), lengths.max()), -1)
+        for row, walk in enumerate(self.walks):
+            padded[row, :len(walk)] = walk
+        broken, first = violation_profile(self.graph, padded, lengths, self.rules)
+        for row, walk in enumerate(self.walks):
+            single_broken, single_first = walk_violation_profile(walk, self.graph, self.rules)
+            self.assertTrue(np.array_equal(broken[:, row, :len(walk)], single_broken))
+            self.assertFalse(broken[:, row, len(walk):].any())
+            self.assertEqual(first[:, row].tolist(), single_first.tolist())
+
+    def test_profiler_prepares_rules_once(self):
+        profiler = ViolationProfiler(self.graph, self.rules)
+        self.graph.clear()
+        for walk in self.walks[:50]:
+            broken, first = walk_violation_profile(walk, None, self.rules, profiler)
+            self.assertEqual(broken.shape, (len(self.rules), len(walk)))
+            self.assertEqual(count_rule_violations(walk, None, self.rules, profiler),
+                             len(walk) - min(first[first >= 0], default=len(walk)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+from graphverse.pipeline.cache import ArtifactCache, stage_key
+from graphverse.pipeline.runner import Pipeline
+from graphverse.pipeline.experiment import experiment_pipeline, run_experiment
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.calls = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def stage(self, name, size=10):
+        def build(directory, params, inputs):
+            self.calls.append(name)
+            with open(os.path.join(directory, 'out'), 'w') as f:
+                f.write('x' * size)
+        return build
+
+    def pipeline(self, lr, cache=None):
+        pipeline = Pipeline(cache or self.tmp.name)
+        pipeline.add('graph', self.stage('graph'), {'n': 10, 'seed': 0})
+        pipeline.add('corpus', self.stage('corpus'), {'samples': 5, 'seed': 0}, inputs=('graph',))
+        pipeline.add('model', self.stage('model'), {'lr': lr, 'seed': 0}, inputs=('corpus',))
+        return pipeline
+
+    def test_keys_follow_params_and_inputs(self):
+        self.assertEqual(stage_key('a', {'x': 1, 'y': 2}), stage_key('a', {'y': 2, 'x': 1}))
+        self.assertNotEqual(stage_key('a', {'x': 1}), stage_key('a', {'x': 1}, ['upstream']))
+        first, second = self.pipeline(0.1), self.pipeline(0.2)
+        self.assertEqual(first.key('corpus'), second.key('corpus'))
+        self.assertNotEqual(first.key('model'), second.key('model'))
+
+    def test_changing_training_params_reuses_upstream(self):
+        self.pipeline(0.1).run('model')
+        self.assertEqual(self.calls, ['graph', 'corpus', 'model'])
+        self.pipeline(0.1).run('model')
+        self.pipeline(0.2).run('model')
+        self.assertEqual(self.calls, ['graph', 'corpus', 'model', 'model'])
+
+    def test_lru_eviction_keeps_current_run(self):
+        cache = ArtifactCache(self.tmp.name, max_bytes=35)
+        old = self.pipeline(0.1, cache)
+        old.run('model')
+        old_model = cache.path('model', old.key('model'))
+        self.pipeline(0.2, cache).run('model')
+        self.assertFalse(os.path.exists(old_model))
+        self.assertTrue(self.pipeline(0.2, cache).is_cached('graph'))
+        self.assertEqual(len(cache.entries()), 3)
+
+    def test_failed_build_leaves_no_artifact(self):
+        def broken(directory, params, inputs):
+            raise RuntimeError('boom')
+
+        pipeline = Pipeline(self.tmp.name)
+        pipeline.add('graph', broken, {'seed': 0})
+        with self.assertRaises(RuntimeError):
+            pipeline.run('graph')
+        self.assertFalse(pipeline.is_cached('graph'))
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_experiment(self):
+        params = (
+            {'n': 40, 'in_edges': 4, 'out_edges': 4, 'num_repeaters': 1, 'repeater_min_steps': 3,
+             'repeater_max_steps': 4, 'seed': 0},
+            {'num_samples': 20, 'min_length': 4, 'max_length': 8, 'seed': 0},
+            {'epochs': 1, 'batch_size': 8, 'learning_rate': 0.001, 'causal': True, 'seed': 0},
+            {'num_samples': 4, 'min_start_length': 1, 'max_start_length': 3, 'max_new_tokens': 5, 'seed': 0},
+        )
+        result = run_experiment(self.tmp.name, *params, device='cpu')
+        self.assertEqual(len(result['evaluation_results']), 4)
+        self.assertEqual([type(rule).__name__ for rule in result['rules']], ['RuleIndex'])
+        self.assertEqual(len(result['rules'][0]), 40)
+        self.assertTrue(experiment_pipeline(self.tmp.name, *params).is_cached('evaluation'))
+
+if __name__ == '__main__':
+    unittest.main()